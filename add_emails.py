@@ -2,7 +2,9 @@
 Add email field to employees table with @datamint.app domain.
 """
 
+import time
 import sqlite3
+import argparse
 
 DB_PATH = "employee_database.db"
 
@@ -19,10 +21,24 @@ def add_email_column(conn):
         else:
             raise
 
+def email_local_part(first_name, last_name):
+    """
+    Local part of an employee's address: firstname.lastname, lower-cased.
+
+    Every path builds it here, the set-based ones through the SQL function
+    registered by register_email_functions(), because SQLite's lower() only
+    folds ASCII and would give non-ASCII names a different address.
+    """
+    return f"{first_name.lower()}.{last_name.lower()}"
+
+def register_email_functions(conn):
+    """Expose email_local_part() to SQL on this connection"""
+    conn.create_function("email_local_part", 2, email_local_part, deterministic=True)
+
 def generate_email(first_name, last_name, emp_id):
     """Generate email address based on name"""
     # Format: firstname.lastname@datamint.app
-    email = f"{first_name.lower()}.{last_name.lower()}@datamint.app"
+    email = f"{email_local_part(first_name, last_name)}@datamint.app"
     return email
 
 def populate_emails(conn):
@@ -42,13 +58,119 @@ def populate_emails(conn):
             updated_count += 1
         except sqlite3.IntegrityError:
             # Handle duplicate emails - add employee ID to make unique
-            email = f"{first_name.lower()}.{last_name.lower()}.{emp_id}@datamint.app"
+            email = f"{email_local_part(first_name, last_name)}.{emp_id}@datamint.app"
             cursor.execute("UPDATE employees SET email = ? WHERE id = ?", (email, emp_id))
             updated_count += 1
     
     conn.commit()
     print(f"✅ Added emails for {updated_count} employees")
 
+def populate_emails_bulk(conn):
+    """
+    Populate email addresses for all employees in one pass.
+
+    Uses the same scheme as populate_emails(): the lowest employee id with a
+    given name gets firstname.lastname@datamint.app and later holders get
+    firstname.lastname.{id}@datamint.app. Collisions are resolved up front
+    with ROW_NUMBER() over the local part instead of by catching
+    IntegrityError per row, and only employees whose address changes are
+    written, all in a single transaction.
+    """
+    start = time.perf_counter()
+    register_email_functions(conn)
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS temp.email_targets")
+    cursor.execute("CREATE TEMP TABLE email_targets (id INTEGER PRIMARY KEY, email TEXT NOT NULL)")
+    cursor.execute("""
+        INSERT INTO email_targets (id, email)
+        SELECT id,
+               CASE WHEN name_rank = 1 THEN local_part
+                    ELSE local_part || '.' || id
+               END || '@datamint.app'
+        FROM (
+            SELECT id, local_part,
+                   ROW_NUMBER() OVER (PARTITION BY local_part ORDER BY id) AS name_rank
+            FROM (SELECT id, email_local_part(first_name, last_name) AS local_part FROM employees)
+        )
+    """)
+    total = cursor.rowcount
+
+    # Two passes so no row ever takes an address another row still holds:
+    # park the changing rows on placeholders, then assign the final addresses
+    cursor.execute("""
+        UPDATE employees SET email = '#' || employees.id
+        FROM email_targets t
+        WHERE t.id = employees.id AND employees.email IS NOT t.email
+    """)
+    cursor.execute("""
+        UPDATE employees SET email = t.email
+        FROM email_targets t
+        WHERE t.id = employees.id AND employees.email IS NOT t.email
+    """)
+    changed = cursor.rowcount
+    cursor.execute("DROP TABLE temp.email_targets")
+    conn.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Computed emails for {total:,} employees, updated {changed:,} "
+          f"in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+def populate_new_emails(conn):
+    """
+    Give an address to employees whose email is missing or does not follow
+    the firstname.lastname scheme for their current name, e.g. new hires,
+    renamed employees or seed rows with placeholder addresses.
+
+    Addresses already in use are left alone: a pending employee gets the
+    plain address only if nobody holds it and no lower pending id shares the
+    name, otherwise the .{id} form. Does not commit.
+
+    Returns:
+        Number of employees updated
+    """
+    register_email_functions(conn)
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.email_pending")
+    cursor.execute("CREATE TEMP TABLE email_pending (id INTEGER PRIMARY KEY, local_part TEXT NOT NULL, email TEXT)")
+    cursor.execute("""
+        INSERT INTO email_pending (id, local_part)
+        SELECT id, local_part
+        FROM (SELECT id, email, email_local_part(first_name, last_name) AS local_part FROM employees)
+        WHERE email IS NULL
+           OR email NOT IN (local_part || '@datamint.app', local_part || '.' || id || '@datamint.app')
+    """)
+    pending = cursor.rowcount
+    if pending:
+        # Release the pending rows' current addresses before any are reassigned
+        cursor.execute("""
+            UPDATE employees SET email = '#' || id
+            WHERE id IN (SELECT id FROM email_pending)
+        """)
+        cursor.execute("""
+            UPDATE email_pending
+            SET email = CASE
+                WHEN name_rank = 1 AND NOT EXISTS (
+                    SELECT 1 FROM employees e WHERE e.email = ranked.local_part || '@datamint.app'
+                ) THEN ranked.local_part
+                ELSE ranked.local_part || '.' || ranked.id
+            END || '@datamint.app'
+            FROM (
+                SELECT id, local_part,
+                       ROW_NUMBER() OVER (PARTITION BY local_part ORDER BY id) AS name_rank
+                FROM email_pending
+            ) ranked
+            WHERE ranked.id = email_pending.id
+        """)
+        cursor.execute("""
+            UPDATE employees SET email = p.email
+            FROM email_pending p
+            WHERE p.id = employees.id
+        """)
+    cursor.execute("DROP TABLE temp.email_pending")
+    print(f"✅ Added emails for {pending} new or renamed employees")
+    return pending
+
 def display_sample_emails(conn):
     """Display sample of emails"""
     cursor = conn.cursor()
@@ -127,6 +249,11 @@ def display_email_statistics(conn):
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Add @datamint.app emails to employees")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Compute every address in one pass and apply them in one transaction")
+    args = parser.parse_args()
+    
     print("🚀 Starting email field addition with @datamint.app domain...\n")
     
     conn = sqlite3.connect(DB_PATH)
@@ -136,7 +263,10 @@ def main():
         add_email_column(conn)
         
         # Populate emails
-        populate_emails(conn)
+        if args.bulk:
+            populate_emails_bulk(conn)
+        else:
+            populate_emails(conn)
         
         # Display samples
         display_sample_emails(conn)
@@ -5,8 +5,12 @@ Creates a realistic organizational structure: CEO -> VP -> Director -> Manager -
 
 import sqlite3
 import random
+import argparse
+import time
 from datetime import datetime, timedelta
 
+from add_summaries import refresh_summaries, summaries_exist
+
 DB_PATH = "employee_database.db"
 
 # Salary ranges by level
@@ -26,6 +30,12 @@ DEPARTMENTS = {
     "Marketing": {"Director": 1, "Manager": 3, "IC": 50},
 }
 
+# Guard against manager cycles when walking up the hierarchy
+MAX_HIERARCHY_DEPTH = 64
+
+# Rows per executemany call in the bulk rebuild
+BULK_BATCH_SIZE = 50000
+
 def create_hierarchy_table(conn):
     """Create hierarchy information table"""
     cursor = conn.cursor()
@@ -38,9 +48,133 @@ def create_hierarchy_table(conn):
             FOREIGN KEY (manager_id) REFERENCES employees(id)
         )
     """)
+    create_manager_index(conn)
     conn.commit()
     print("✅ Created employee_hierarchy table")
 
+def create_manager_index(conn):
+    """Index employee_hierarchy.manager_id, which the closure rebuild joins on level by level"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employee_hierarchy_manager_id
+        ON employee_hierarchy (manager_id)
+    """)
+
+def create_closure_table(conn):
+    """Create the org-chart closure table (one row per ancestor/descendant pair)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employee_hierarchy_closure (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id),
+            FOREIGN KEY (ancestor_id) REFERENCES employees(id),
+            FOREIGN KEY (descendant_id) REFERENCES employees(id)
+        ) WITHOUT ROWID
+    """)
+    create_closure_index(conn)
+    conn.commit()
+    print("✅ Created employee_hierarchy_closure table")
+
+def create_closure_index(conn):
+    """Index the closure table by descendant, for "who is above X" lookups"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employee_hierarchy_closure_descendant
+        ON employee_hierarchy_closure (descendant_id, depth)
+    """)
+
+def get_manager_map(conn):
+    """Get {employee_id: manager_id} for the current hierarchy"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT employee_id, manager_id FROM employee_hierarchy")
+    return dict(cursor.fetchall())
+
+def changed_employee_ids(old_map, new_map):
+    """Employees that were added, removed or moved to a different manager"""
+    missing = object()
+    return [
+        employee_id for employee_id in old_map.keys() | new_map.keys()
+        if old_map.get(employee_id, missing) != new_map.get(employee_id, missing)
+    ]
+
+def refresh_closure(conn, changed_ids=None):
+    """
+    Bring employee_hierarchy_closure in line with employee_hierarchy.
+
+    Only the subtrees of changed employees are recomputed: their closure
+    rows are deleted and their ancestor paths are re-walked from the new
+    manager links. Pass changed_ids=None (or start from an empty closure
+    table) to rebuild everything. Does not commit.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM employee_hierarchy_closure)")
+    if changed_ids is None or not cursor.fetchone()[0]:
+        # Without the index every level of the walk is a full scan of employee_hierarchy
+        create_manager_index(conn)
+        # Fill the table in key order and index it afterwards instead of row by row
+        cursor.execute("DROP INDEX IF EXISTS idx_employee_hierarchy_closure_descendant")
+        cursor.execute("DELETE FROM employee_hierarchy_closure")
+        # rowcount is not reported for WITH statements, so count via total_changes
+        changes_before = conn.total_changes
+        cursor.execute("""
+            WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+                SELECT employee_id, employee_id, 0 FROM employee_hierarchy
+                UNION ALL
+                SELECT p.ancestor_id, eh.employee_id, p.depth + 1
+                FROM paths p
+                JOIN employee_hierarchy eh ON eh.manager_id = p.descendant_id
+                WHERE p.depth < ?
+            )
+            INSERT OR IGNORE INTO employee_hierarchy_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, descendant_id, depth FROM paths
+            ORDER BY ancestor_id, descendant_id
+        """, (MAX_HIERARCHY_DEPTH,))
+        paths = conn.total_changes - changes_before
+        create_closure_index(conn)
+        print(f"✅ Rebuilt hierarchy closure ({paths} paths)")
+        return
+
+    if not changed_ids:
+        print("ℹ️  Hierarchy closure already up to date")
+        return
+
+    # Affected = changed employees plus everyone below them in the old tree
+    cursor.execute("DROP TABLE IF EXISTS temp.closure_affected")
+    cursor.execute("CREATE TEMP TABLE closure_affected (employee_id INTEGER PRIMARY KEY)")
+    cursor.executemany("INSERT OR IGNORE INTO closure_affected VALUES (?)", [(i,) for i in changed_ids])
+    cursor.execute("""
+        INSERT OR IGNORE INTO closure_affected
+        SELECT c.descendant_id
+        FROM employee_hierarchy_closure c
+        JOIN closure_affected a ON c.ancestor_id = a.employee_id
+    """)
+    cursor.execute("""
+        DELETE FROM employee_hierarchy_closure
+        WHERE descendant_id IN (SELECT employee_id FROM closure_affected)
+    """)
+    deleted = cursor.rowcount
+    changes_before = conn.total_changes
+
+    # Walk up from each affected employee through the new manager links
+    cursor.execute("""
+        WITH RECURSIVE up(descendant_id, ancestor_id, depth) AS (
+            SELECT eh.employee_id, eh.employee_id, 0
+            FROM employee_hierarchy eh
+            JOIN closure_affected a ON a.employee_id = eh.employee_id
+            UNION ALL
+            SELECT up.descendant_id, eh.manager_id, up.depth + 1
+            FROM up
+            JOIN employee_hierarchy eh ON eh.employee_id = up.ancestor_id
+            WHERE eh.manager_id IS NOT NULL AND up.depth < ?
+        )
+        INSERT OR IGNORE INTO employee_hierarchy_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM up
+    """, (MAX_HIERARCHY_DEPTH,))
+    inserted = conn.total_changes - changes_before
+    cursor.execute("DROP TABLE temp.closure_affected")
+    print(f"✅ Refreshed hierarchy closure for {len(changed_ids)} moved employees "
+          f"(-{deleted}/+{inserted} paths)")
+
 def add_salary_column(conn):
     """Add salary column to employees table if not exists"""
     cursor = conn.cursor()
@@ -68,6 +202,7 @@ def create_hierarchy(conn):
     """Create organizational hierarchy"""
     employees = get_all_employees(conn)
     cursor = conn.cursor()
+    old_managers = get_manager_map(conn)
     
     # Clear existing hierarchy
     cursor.execute("DELETE FROM employee_hierarchy")
@@ -152,19 +287,210 @@ def create_hierarchy(conn):
     
     print(f"  ✅ Created {ic_count} Individual Contributors")
     
+    # Update the closure table for the employees whose manager changed
+    refresh_closure(conn, changed_employee_ids(old_managers, get_manager_map(conn)))
+    
     conn.commit()
     print(f"\n✅ Organizational hierarchy created successfully!")
 
+def random_salary_sql(level_column=None):
+    """SQL expression drawing a salary in the level's range, independently per row"""
+    def draw(low, high):
+        return f"{low} + abs(random() % {high - low + 1})"
+    if level_column is None:
+        return draw(*SALARY_RANGES["IC"])
+    cases = " ".join(f"WHEN '{level}' THEN {draw(*bounds)}" for level, bounds in SALARY_RANGES.items())
+    return f"CASE {level_column} {cases} ELSE {draw(*SALARY_RANGES['IC'])} END"
+
+def plan_hierarchy(employees):
+    """
+    Lay out the org chart in memory.
+
+    Same shape as create_hierarchy: the first employee is the CEO, the next
+    four are VPs, then one Director per VP, 3-4 Managers per Director and
+    the rest are ICs reporting to a random Manager.
+
+    Args:
+        employees: (id, department_id) rows ordered by id
+
+    Returns:
+        List of (employee_id, level, manager_id) rows
+    """
+    dept_count = 4
+    ids = [row[0] for row in employees]
+    if not ids:
+        return []
+    ceo_id = ids[0]
+    rows = [(ceo_id, "CEO", None)]
+
+    vp_ids = ids[1:1 + dept_count]
+    rows.extend((vp_id, "VP", ceo_id) for vp_id in vp_ids)
+
+    director_ids = ids[1 + dept_count:1 + dept_count + len(vp_ids)]
+    rows.extend((director_id, "Director", vp_id) for director_id, vp_id in zip(director_ids, vp_ids))
+
+    position = 1 + dept_count + len(director_ids)
+    manager_ids = []
+    for director_id in director_ids:
+        for manager_id in ids[position:position + random.randint(3, 4)]:
+            rows.append((manager_id, "Manager", director_id))
+            manager_ids.append(manager_id)
+            position += 1
+
+    ic_ids = ids[position:] if manager_ids else []
+    rows.extend(zip(ic_ids, ["IC"] * len(ic_ids), random.choices(manager_ids, k=len(ic_ids))))
+    return rows
+
+def create_hierarchy_bulk(conn):
+    """
+    Rebuild the hierarchy and salaries with set-based statements in one transaction.
+
+    The org chart is computed in memory and written with batched inserts;
+    salaries are then drawn for every employee by one UPDATE ... FROM the
+    new hierarchy. Summary triggers are switched off for the rebuild and the
+    summaries recomputed once at the end, and the closure table is
+    refreshed incrementally, or rebuilt when most managers changed.
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    old_managers = get_manager_map(conn)
+    rows = plan_hierarchy(get_all_employees(conn))
+    print(f"✅ Planned hierarchy for {len(rows):,} employees in {time.perf_counter() - start:.2f}s")
+
+    with_summaries = summaries_exist(conn)
+    if with_summaries:
+        # Not committed: the triggers stay off only inside this transaction
+        cursor.execute("UPDATE summary_control SET enabled = 0 WHERE id = 1")
+
+    cursor.execute("DELETE FROM employee_hierarchy")
+    for i in range(0, len(rows), BULK_BATCH_SIZE):
+        cursor.executemany(
+            "INSERT INTO employee_hierarchy (employee_id, level, manager_id) VALUES (?, ?, ?)",
+            rows[i:i + BULK_BATCH_SIZE],
+        )
+    cursor.execute(f"""
+        UPDATE employees
+        SET salary = {random_salary_sql("eh.level")}
+        FROM employee_hierarchy eh
+        WHERE eh.employee_id = employees.id
+    """)
+    print(f"✅ Wrote {len(rows):,} hierarchy rows and {cursor.rowcount:,} salaries "
+          f"[{time.perf_counter() - start:.2f}s]")
+
+    new_managers = {employee_id: manager_id for employee_id, _, manager_id in rows}
+    changed = changed_employee_ids(old_managers, new_managers)
+    refresh_closure(conn, changed if len(changed) <= len(new_managers) // 2 else None)
+
+    if with_summaries:
+        cursor.execute("UPDATE summary_control SET enabled = 1 WHERE id = 1")
+        refresh_summaries(conn)  # commits the whole rebuild
+    else:
+        conn.commit()
+
+    counts = {}
+    for _, level, _ in rows:
+        counts[level] = counts.get(level, 0) + 1
+    print("  " + ", ".join(f"{counts.get(level, 0):,} {level}" for level in SALARY_RANGES))
+    print(f"\n✅ Organizational hierarchy rebuilt in {time.perf_counter() - start:.2f}s")
+
+def update_hierarchy_incremental(conn):
+    """
+    Bring the hierarchy in line with the employees table without a rebuild.
+
+    Hierarchy rows of deleted employees are removed and their reports move
+    up to the nearest remaining manager. Employees without a hierarchy row
+    join as ICs under a random Manager of their department (any Manager if
+    the department has none), and every placed employee without a salary
+    gets one for their level. Only the closure rows of these employees are
+    refreshed. Does not commit.
+
+    Returns:
+        Number of employees added, removed or moved
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT eh.employee_id, eh.manager_id
+        FROM employee_hierarchy eh
+        WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.id = eh.employee_id)
+    """)
+    removed = dict(cursor.fetchall())
+    moved = []
+    if removed:
+        def surviving_manager(manager_id):
+            depth = 0
+            while manager_id in removed and depth < MAX_HIERARCHY_DEPTH:
+                manager_id = removed[manager_id]
+                depth += 1
+            return manager_id
+
+        cursor.execute("""
+            SELECT eh.employee_id, eh.manager_id
+            FROM employee_hierarchy eh
+            WHERE eh.manager_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM employees e WHERE e.id = eh.manager_id)
+        """)
+        moved = [(surviving_manager(manager_id), employee_id)
+                 for employee_id, manager_id in cursor.fetchall()
+                 if manager_id in removed and employee_id not in removed]
+        cursor.executemany("UPDATE employee_hierarchy SET manager_id = ? WHERE employee_id = ?", moved)
+        cursor.executemany("DELETE FROM employee_hierarchy WHERE employee_id = ?", [(i,) for i in removed])
+
+    cursor.execute("""
+        SELECT eh.employee_id, e.department_id
+        FROM employee_hierarchy eh
+        JOIN employees e ON e.id = eh.employee_id
+        WHERE eh.level = 'Manager'
+    """)
+    managers_by_department = {}
+    for manager_id, department_id in cursor.fetchall():
+        managers_by_department.setdefault(department_id, []).append(manager_id)
+    all_managers = [m for managers in managers_by_department.values() for m in managers]
+
+    cursor.execute("""
+        SELECT e.id, e.department_id
+        FROM employees e
+        WHERE NOT EXISTS (SELECT 1 FROM employee_hierarchy eh WHERE eh.employee_id = e.id)
+        ORDER BY e.id
+    """)
+    new_employees = cursor.fetchall()
+    if new_employees and not all_managers:
+        print(f"⚠️  {len(new_employees)} employees not placed: the hierarchy has no Managers yet")
+        new_employees = []
+    added = [
+        (employee_id, "IC", random.choice(managers_by_department.get(department_id) or all_managers))
+        for employee_id, department_id in new_employees
+    ]
+    for i in range(0, len(added), BULK_BATCH_SIZE):
+        cursor.executemany(
+            "INSERT INTO employee_hierarchy (employee_id, level, manager_id) VALUES (?, ?, ?)",
+            added[i:i + BULK_BATCH_SIZE],
+        )
+
+    cursor.execute(f"""
+        UPDATE employees
+        SET salary = {random_salary_sql("eh.level")}
+        FROM employee_hierarchy eh
+        WHERE eh.employee_id = employees.id AND (employees.salary IS NULL OR employees.salary = 0)
+    """)
+    salaries = cursor.rowcount
+
+    changed = list(removed) + [employee_id for _, employee_id in moved] + [row[0] for row in added]
+    refresh_closure(conn, changed)
+    print(f"✅ Hierarchy: {len(added)} added, {len(removed)} removed, {len(moved)} moved; "
+          f"{salaries} salaries set")
+    return len(changed)
+
 def add_remaining_salaries(conn):
     """Add salaries to employees without hierarchy (if any)"""
     cursor = conn.cursor()
-    cursor.execute("""
+    # random() is evaluated per row, so every employee gets their own salary
+    cursor.execute(f"""
         UPDATE employees 
-        SET salary = ? 
+        SET salary = {random_salary_sql()}
         WHERE salary IS NULL OR salary = 0
-    """, (random.randint(*SALARY_RANGES["IC"]),))
+    """)
     conn.commit()
-    print("✅ Added default salaries to remaining employees")
+    print(f"✅ Added salaries to {cursor.rowcount} remaining employees")
 
 def display_hierarchy_summary(conn):
     """Display hierarchy summary"""
@@ -174,22 +500,42 @@ def display_hierarchy_summary(conn):
     print("📊 ORGANIZATIONAL HIERARCHY SUMMARY")
     print("="*70)
     
-    cursor.execute("""
-        SELECT level, COUNT(*) as count, 
-               ROUND(AVG(e.salary), 0) as avg_salary,
-               MIN(e.salary) as min_salary,
-               MAX(e.salary) as max_salary
-        FROM employee_hierarchy eh
-        JOIN employees e ON eh.employee_id = e.id
-        GROUP BY level
-        ORDER BY CASE level
-            WHEN 'CEO' THEN 1
-            WHEN 'VP' THEN 2
-            WHEN 'Director' THEN 3
-            WHEN 'Manager' THEN 4
-            WHEN 'IC' THEN 5
-        END
-    """)
+    # Read the materialized summaries from add_summaries.py when they exist
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'summary_salary_by_level'")
+    use_summaries = cursor.fetchone() is not None
+    
+    if use_summaries:
+        cursor.execute("""
+            SELECT level, employee_count as count,
+                   ROUND(avg_salary, 0) as avg_salary,
+                   min_salary,
+                   max_salary
+            FROM summary_salary_by_level
+            ORDER BY CASE level
+                WHEN 'CEO' THEN 1
+                WHEN 'VP' THEN 2
+                WHEN 'Director' THEN 3
+                WHEN 'Manager' THEN 4
+                WHEN 'IC' THEN 5
+            END
+        """)
+    else:
+        cursor.execute("""
+            SELECT level, COUNT(*) as count, 
+                   ROUND(AVG(e.salary), 0) as avg_salary,
+                   MIN(e.salary) as min_salary,
+                   MAX(e.salary) as max_salary
+            FROM employee_hierarchy eh
+            JOIN employees e ON eh.employee_id = e.id
+            GROUP BY level
+            ORDER BY CASE level
+                WHEN 'CEO' THEN 1
+                WHEN 'VP' THEN 2
+                WHEN 'Director' THEN 3
+                WHEN 'Manager' THEN 4
+                WHEN 'IC' THEN 5
+            END
+        """)
     
     print(f"\n{'Level':<15} {'Count':<8} {'Avg Salary':<15} {'Min':<15} {'Max':<15}")
     print("-" * 70)
@@ -201,15 +547,25 @@ def display_hierarchy_summary(conn):
     print(f"\n{'Department':<20} {'Avg Salary':<15} {'Total Spend':<15}")
     print("-" * 50)
     
-    cursor.execute("""
-        SELECT d.name, 
-               ROUND(AVG(e.salary), 0) as avg_salary,
-               ROUND(SUM(e.salary), 0) as total_salary
-        FROM employees e
-        JOIN departments d ON e.department_id = d.id
-        GROUP BY d.name
-        ORDER BY total_salary DESC
-    """)
+    if use_summaries:
+        cursor.execute("""
+            SELECT department_name,
+                   ROUND(avg_salary, 0) as avg_salary,
+                   ROUND(total_salary, 0) as total_salary
+            FROM summary_salary_by_department
+            WHERE department_name IS NOT NULL
+            ORDER BY total_salary DESC
+        """)
+    else:
+        cursor.execute("""
+            SELECT d.name, 
+                   ROUND(AVG(e.salary), 0) as avg_salary,
+                   ROUND(SUM(e.salary), 0) as total_salary
+            FROM employees e
+            JOIN departments d ON e.department_id = d.id
+            GROUP BY d.name
+            ORDER BY total_salary DESC
+        """)
     
     for dept, avg_sal, total_sal in cursor.fetchall():
         print(f"{dept:<20} ${avg_sal:>13,.0f} ${total_sal:>13,.0f}")
@@ -231,10 +587,37 @@ def display_hierarchy_summary(conn):
         mgr_name = f"{mgr_fname} {mgr_lname}" if mgr_fname else "None (Root)"
         print(f"  {level:<10} {emp_fname} {emp_lname:<20} → {mgr_name}")
     
+    # Org size under each level, answered from the closure table
+    print(f"\n{'Level':<15} {'Avg Org Size':<15} {'Max Depth Below':<15}")
+    print("-" * 50)
+    
+    cursor.execute("""
+        SELECT eh.level,
+               ROUND(AVG(sub.org_size), 1),
+               MAX(sub.max_depth)
+        FROM employee_hierarchy eh
+        JOIN (
+            SELECT ancestor_id, COUNT(*) - 1 AS org_size, MAX(depth) AS max_depth
+            FROM employee_hierarchy_closure
+            GROUP BY ancestor_id
+        ) sub ON sub.ancestor_id = eh.employee_id
+        WHERE eh.level != 'IC'
+        GROUP BY eh.level
+        ORDER BY MAX(sub.max_depth) DESC
+    """)
+    
+    for level, avg_size, max_depth in cursor.fetchall():
+        print(f"{level:<15} {avg_size:<15} {max_depth:<15}")
+    
     print("\n" + "="*70)
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Add salary data and manager hierarchy")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Rebuild with set-based statements in one transaction (for large databases)")
+    args = parser.parse_args()
+    
     print("🚀 Starting database enhancement with salary and hierarchy data...")
     
     conn = sqlite3.connect(DB_PATH)
@@ -245,9 +628,13 @@ def main():
         
         # Create hierarchy table
         create_hierarchy_table(conn)
+        create_closure_table(conn)
         
         # Create organizational structure
-        create_hierarchy(conn)
+        if args.bulk:
+            create_hierarchy_bulk(conn)
+        else:
+            create_hierarchy(conn)
         
         # Add salaries to any remaining employees
         add_remaining_salaries(conn)
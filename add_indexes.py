@@ -0,0 +1,86 @@
+"""
+Add secondary indexes for the join and filter columns used by the SQL agent.
+"""
+
+import sqlite3
+import time
+
+DB_PATH = "employee_database.db"
+
+# (index name, table, columns)
+INDEXES = [
+    ("idx_employees_department_id", "employees", ["department_id"]),
+    ("idx_employees_manager_id", "employees", ["manager_id"]),
+    ("idx_employee_hierarchy_manager_id", "employee_hierarchy", ["manager_id"]),
+    ("idx_employee_skills_skill_id", "employee_skills", ["skill_id"]),
+    ("idx_employee_projects_project_id", "employee_projects", ["project_id"]),
+]
+
+def table_exists(conn, table):
+    """Check whether a table exists"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+def create_indexes(conn):
+    """Create the secondary indexes if they do not exist yet"""
+    cursor = conn.cursor()
+    created = 0
+    for name, table, columns in INDEXES:
+        if not table_exists(conn, table):
+            print(f"ℹ️  Skipping {name}: table {table} does not exist")
+            continue
+        start = time.perf_counter()
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"✅ {name} on {table}({', '.join(columns)}) [{elapsed:.1f} ms]")
+        created += 1
+
+    # Refresh planner statistics so the new indexes are used
+    cursor.execute("ANALYZE")
+    conn.commit()
+    print(f"✅ Ensured {created} indexes and refreshed planner statistics")
+
+def display_index_summary(conn):
+    """Display all user-defined indexes"""
+    cursor = conn.cursor()
+
+    print("\n" + "="*70)
+    print("📇 SECONDARY INDEXES")
+    print("="*70)
+
+    cursor.execute("""
+        SELECT tbl_name, name
+        FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL
+        ORDER BY tbl_name, name
+    """)
+
+    print(f"\n{'Table':<25} {'Index':<40}")
+    print("-" * 70)
+    for table, name in cursor.fetchall():
+        print(f"{table:<25} {name:<40}")
+
+    print("\n" + "="*70)
+
+def main():
+    """Main function"""
+    print("🚀 Adding secondary indexes...")
+
+    conn = sqlite3.connect(DB_PATH)
+
+    try:
+        create_indexes(conn)
+        display_index_summary(conn)
+
+        print("\n✅ Indexes added successfully!")
+        print(f"📁 Database location: {DB_PATH}")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -50,6 +50,22 @@ def add_job_title_column(conn):
     except sqlite3.OperationalError:
         print("ℹ️  job_title column already exists")
 
+# Fallback titles for departments missing from JOB_TITLES
+DEFAULT_TITLES = {
+    "VP": "Vice President",
+    "Director": "Director",
+    "Manager": "Manager",
+    "IC": "Individual Contributor",
+}
+
+def choose_job_title(level, department):
+    """Pick a random job title for a hierarchy level and department name"""
+    if level == "CEO":
+        return JOB_TITLES["CEO"][0]
+    if level not in DEFAULT_TITLES:
+        level = "IC"
+    return random.choice(JOB_TITLES[level].get(department, [DEFAULT_TITLES[level]]))
+
 def populate_job_titles(conn):
     """Populate job titles based on hierarchy level and department"""
     cursor = conn.cursor()
@@ -66,27 +82,56 @@ def populate_job_titles(conn):
     
     updated_count = 0
     for emp_id, level, department in employees:
-        if level == "CEO":
-            job_title = JOB_TITLES["CEO"][0]
-        elif level == "VP":
-            titles = JOB_TITLES["VP"].get(department, ["Vice President"])
-            job_title = random.choice(titles)
-        elif level == "Director":
-            titles = JOB_TITLES["Director"].get(department, ["Director"])
-            job_title = random.choice(titles)
-        elif level == "Manager":
-            titles = JOB_TITLES["Manager"].get(department, ["Manager"])
-            job_title = random.choice(titles)
-        else:  # IC
-            titles = JOB_TITLES["IC"].get(department, ["Individual Contributor"])
-            job_title = random.choice(titles)
-        
+        job_title = choose_job_title(level, department)
         cursor.execute("UPDATE employees SET job_title = ? WHERE id = ?", (job_title, emp_id))
         updated_count += 1
     
     conn.commit()
     print(f"✅ Updated job titles for {updated_count} employees")
 
+def populate_missing_job_titles(conn):
+    """
+    Give a job title to every employee whose title is missing or no longer
+    matches their level and department, e.g. after being added or moved.
+
+    Valid (level, department, title) combinations are loaded into a temp
+    table so the stale employees are found with one anti-join. Does not commit.
+
+    Returns:
+        Number of employees updated
+    """
+    cursor = conn.cursor()
+    valid = [("CEO", None, JOB_TITLES["CEO"][0])]
+    valid.extend((level, None, title) for level, title in DEFAULT_TITLES.items())
+    valid.extend(
+        (level, department, title)
+        for level, departments in JOB_TITLES.items() if level != "CEO"
+        for department, titles in departments.items()
+        for title in titles
+    )
+    cursor.execute("DROP TABLE IF EXISTS temp.valid_job_titles")
+    cursor.execute("CREATE TEMP TABLE valid_job_titles (level TEXT, department TEXT, title TEXT)")
+    cursor.execute("CREATE INDEX temp.idx_valid_job_titles ON valid_job_titles (title, level)")
+    cursor.executemany("INSERT INTO valid_job_titles VALUES (?, ?, ?)", valid)
+
+    cursor.execute("""
+        SELECT e.id, eh.level, d.name
+        FROM employees e
+        JOIN employee_hierarchy eh ON e.id = eh.employee_id
+        JOIN departments d ON e.department_id = d.id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM valid_job_titles v
+            WHERE v.level = eh.level
+              AND (v.department IS NULL OR v.department = d.name)
+              AND v.title = e.job_title
+        )
+    """)
+    updates = [(choose_job_title(level, department), emp_id) for emp_id, level, department in cursor.fetchall()]
+    cursor.executemany("UPDATE employees SET job_title = ? WHERE id = ?", updates)
+    cursor.execute("DROP TABLE temp.valid_job_titles")
+    print(f"✅ Updated job titles for {len(updates)} new or moved employees")
+    return len(updates)
+
 def display_sample_job_titles(conn):
     """Display sample of job titles by level and department"""
     cursor = conn.cursor()
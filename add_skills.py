@@ -1,50 +1,22 @@
+"""
+Add skills and employee skill assignments to the employee database.
+Employees without any skills get 1-4 random skills with a proficiency level.
+"""
+
 import sqlite3
 import random
+import time
 
-# Connect to SQLite database
-conn = sqlite3.connect('employee_database.db')
-cursor = conn.cursor()
-
-# Create skills table if not exists
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS skills (
-    id INTEGER PRIMARY KEY,
-    name TEXT NOT NULL UNIQUE
-)
-''')
-
-# Create employee_skills table if not exists
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS employee_skills (
-    employee_id INTEGER,
-    skill_id INTEGER,
-    proficiency_level TEXT CHECK(proficiency_level IN ('Beginner', 'Intermediate', 'Advanced', 'Expert')),
-    PRIMARY KEY (employee_id, skill_id),
-    FOREIGN KEY (employee_id) REFERENCES employees (id),
-    FOREIGN KEY (skill_id) REFERENCES skills (id)
-)
-''')
-
-# Insert sample skills
-skills = [
-    ('Python',),
-    ('JavaScript',),
-    ('SQL',),
-    ('Java',),
-    ('C++',),
-    ('Project Management',),
-    ('Data Analysis',),
-    ('Marketing',),
-    ('Sales',),
-    ('UI/UX Design',),
-    ('DevOps',),
-    ('Machine Learning',)
-]
+from add_summaries import refresh_summaries, summaries_exist
 
-cursor.executemany('INSERT OR IGNORE INTO skills (name) VALUES (?)', skills)
+DB_PATH = "employee_database.db"
 
-# Insert employee-skill assignments with proficiency levels for initial employees
-employee_skills = [
+SKILLS = ["Python", "JavaScript", "SQL", "Java", "C++", "Project Management", "Data Analysis",
+          "Marketing", "Sales", "UI/UX Design", "DevOps", "Machine Learning"]
+PROFICIENCY_LEVELS = ["Beginner", "Intermediate", "Advanced", "Expert"]
+
+# Skill assignments for the initial employees: (employee_id, skill_id, proficiency)
+SAMPLE_EMPLOYEE_SKILLS = [
     (1, 1, 'Expert'),  # John Doe - Python
     (1, 3, 'Advanced'),  # John Doe - SQL
     (1, 6, 'Advanced'),  # John Doe - Project Management
@@ -61,33 +33,136 @@ employee_skills = [
     (7, 9, 'Advanced'),  # Eve Miller - Sales
 ]
 
-cursor.executemany('INSERT OR IGNORE INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, ?, ?)', employee_skills)
+# Employees whose assignments are generated and written per executemany call
+BULK_BATCH_SIZE = 50000
+
+def create_skill_tables(conn):
+    """Create skills and employee_skills tables if not exists"""
+    cursor = conn.cursor()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS skills (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS employee_skills (
+        employee_id INTEGER,
+        skill_id INTEGER,
+        proficiency_level TEXT CHECK(proficiency_level IN ('Beginner', 'Intermediate', 'Advanced', 'Expert')),
+        PRIMARY KEY (employee_id, skill_id),
+        FOREIGN KEY (employee_id) REFERENCES employees (id),
+        FOREIGN KEY (skill_id) REFERENCES skills (id)
+    )
+    ''')
+    conn.commit()
+
+def insert_sample_skills(conn):
+    """Insert the skill catalogue and the initial employees' skills"""
+    cursor = conn.cursor()
+    cursor.executemany('INSERT OR IGNORE INTO skills (name) VALUES (?)', [(name,) for name in SKILLS])
+    cursor.executemany(
+        'INSERT OR IGNORE INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, ?, ?)',
+        SAMPLE_EMPLOYEE_SKILLS,
+    )
+    conn.commit()
+
+def employees_without_skills(conn):
+    """Return the ids of employees with no employee_skills rows, in one anti-join"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT e.id
+        FROM employees e
+        WHERE NOT EXISTS (SELECT 1 FROM employee_skills es WHERE es.employee_id = e.id)
+        ORDER BY e.id
+    ''')
+    return [row[0] for row in cursor.fetchall()]
+
+def generate_skill_assignments(employee_ids, skill_ids, rng=random):
+    """
+    Generate 1-4 distinct random skills with a proficiency for every employee.
+
+    Args:
+        employee_ids: Employees to assign skills to
+        skill_ids: Skills to choose from
+        rng: random module or a seeded random.Random
+
+    Returns:
+        List of (employee_id, skill_id, proficiency_level) rows
+    """
+    sample, randint, choice = rng.sample, rng.randint, rng.choice
+    max_skills = min(4, len(skill_ids))
+    return [
+        (emp_id, skill_id, choice(PROFICIENCY_LEVELS))
+        for emp_id in employee_ids
+        for skill_id in sample(skill_ids, randint(1, max_skills))
+    ]
+
+def assign_skills_bulk(conn, rng=random):
+    """
+    Assign random skills to every employee that has none, in one transaction.
+
+    The employees are found with a single anti-join and their assignments
+    generated in memory BULK_BATCH_SIZE employees at a time, each chunk
+    written with one executemany of INSERT OR IGNORE. For loads of more than
+    one batch the summary triggers are switched off and the summaries
+    recomputed once at the end.
+
+    Args:
+        conn: Database connection
+        rng: random module or a seeded random.Random
+
+    Returns:
+        Number of employee_skills rows inserted
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM skills ORDER BY id')
+    skill_ids = [row[0] for row in cursor.fetchall()]
+    employee_ids = employees_without_skills(conn)
+    if not skill_ids or not employee_ids:
+        print(f"ℹ️  No skills to assign ({len(employee_ids):,} employees without skills, {len(skill_ids)} skills)")
+        return 0
+
+    # Small top-ups keep the triggers on; a full refresh only pays off for large loads
+    with_summaries = len(employee_ids) > BULK_BATCH_SIZE and summaries_exist(conn)
+    if with_summaries:
+        # Not committed: the triggers stay off only inside this transaction
+        cursor.execute("UPDATE summary_control SET enabled = 0 WHERE id = 1")
 
-# Generate random skills for all employees
-# Get all skill ids
-cursor.execute('SELECT id FROM skills')
-skill_ids = [row[0] for row in cursor.fetchall()]
+    inserted = 0
+    for i in range(0, len(employee_ids), BULK_BATCH_SIZE):
+        cursor.executemany(
+            'INSERT OR IGNORE INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, ?, ?)',
+            generate_skill_assignments(employee_ids[i:i + BULK_BATCH_SIZE], skill_ids, rng),
+        )
+        inserted += cursor.rowcount
 
-# Get all employee ids
-cursor.execute('SELECT id FROM employees')
-employee_ids = [row[0] for row in cursor.fetchall()]
+    if with_summaries:
+        cursor.execute("UPDATE summary_control SET enabled = 1 WHERE id = 1")
+        refresh_summaries(conn)  # commits the whole load
+    else:
+        conn.commit()
 
-# Assign 1-4 random skills to each employee (skip if already has skills)
-for emp_id in employee_ids:
-    # Check if employee already has skills
-    cursor.execute('SELECT COUNT(*) FROM employee_skills WHERE employee_id = ?', (emp_id,))
-    if cursor.fetchone()[0] > 0:
-        continue  # Skip if already has skills
+    elapsed = time.perf_counter() - start
+    print(f"✅ Assigned {inserted:,} skills to {len(employee_ids):,} employees in {elapsed:.2f}s "
+          f"({inserted / max(elapsed, 1e-9):,.0f} rows/s)")
+    return inserted
 
-    num_skills = random.randint(1, 4)
-    selected_skills = random.sample(skill_ids, num_skills)
-    for skill_id in selected_skills:
-        proficiency = random.choice(['Beginner', 'Intermediate', 'Advanced', 'Expert'])
-        cursor.execute('INSERT INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, ?, ?)',
-                     (emp_id, skill_id, proficiency))
+def main():
+    """Main function"""
+    conn = sqlite3.connect(DB_PATH)
 
-# Commit changes and close connection
-conn.commit()
-conn.close()
+    try:
+        create_skill_tables(conn)
+        insert_sample_skills(conn)
+        assign_skills_bulk(conn)
+        print("Skills added to employee database successfully!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
 
-print("Skills added to employee database successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
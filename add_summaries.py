@@ -0,0 +1,350 @@
+"""
+Add materialized summary tables for common aggregate questions.
+Salary by level, salary by department and skill counts by proficiency are kept
+as small tables and maintained incrementally by triggers on the base tables.
+"""
+
+import sqlite3
+
+DB_PATH = "employee_database.db"
+
+SUMMARY_TABLES = [
+    "summary_salary_by_level",
+    "summary_salary_by_department",
+    "summary_skill_proficiency",
+]
+
+LEVEL_ORDER = """CASE level
+            WHEN 'CEO' THEN 1
+            WHEN 'VP' THEN 2
+            WHEN 'Director' THEN 3
+            WHEN 'Manager' THEN 4
+            WHEN 'IC' THEN 5
+        END"""
+
+# Trigger guard: bulk loads can switch maintenance off and refresh afterwards
+ENABLED = "(SELECT enabled FROM summary_control WHERE id = 1)"
+
+def create_summary_tables(conn):
+    """Create the summary tables and the trigger on/off switch"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_salary_by_level (
+            level TEXT PRIMARY KEY,
+            employee_count INTEGER NOT NULL,
+            salary_count INTEGER NOT NULL,
+            total_salary REAL NOT NULL,
+            min_salary REAL,
+            max_salary REAL,
+            avg_salary REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_salary_by_department (
+            department_id INTEGER PRIMARY KEY,
+            department_name TEXT,
+            employee_count INTEGER NOT NULL,
+            salary_count INTEGER NOT NULL,
+            total_salary REAL NOT NULL,
+            min_salary REAL,
+            max_salary REAL,
+            avg_salary REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_skill_proficiency (
+            skill_id INTEGER NOT NULL,
+            skill_name TEXT,
+            proficiency_level TEXT NOT NULL,
+            employee_count INTEGER NOT NULL,
+            PRIMARY KEY (skill_id, proficiency_level)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_control (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            enabled INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO summary_control (id, enabled) VALUES (1, 1)")
+    conn.commit()
+    print("✅ Created summary tables")
+
+def _salary_add(table, key_column, key, salary, name_column=None, name_query=None):
+    """SQL adding one employee's salary to the group `key` (skipped when key is NULL)"""
+    extra_names = f", {name_column}" if name_column else ""
+    extra_values = f", {name_query}" if name_column else ""
+    return f"""
+        INSERT INTO {table} ({key_column}{extra_names}, employee_count, salary_count,
+                             total_salary, min_salary, max_salary, avg_salary)
+        SELECT g.key{extra_values}, 1, s.salary IS NOT NULL, COALESCE(s.salary, 0),
+               s.salary, s.salary, s.salary
+        FROM (SELECT {key} AS key) g, (SELECT {salary} AS salary) s
+        WHERE g.key IS NOT NULL
+        ON CONFLICT ({key_column}) DO UPDATE SET
+            employee_count = employee_count + 1,
+            salary_count = salary_count + excluded.salary_count,
+            total_salary = total_salary + excluded.total_salary,
+            min_salary = COALESCE(MIN(min_salary, excluded.min_salary), min_salary, excluded.min_salary),
+            max_salary = COALESCE(MAX(max_salary, excluded.max_salary), max_salary, excluded.max_salary),
+            avg_salary = (total_salary + excluded.total_salary)
+                         / NULLIF(salary_count + excluded.salary_count, 0);"""
+
+def _salary_remove(table, key_column, key, salary, extremes_query):
+    """
+    SQL removing one employee's salary from the group `key`.
+
+    min/max are only recomputed from the base tables when the removed
+    salary was the group's current minimum or maximum.
+    """
+    return f"""
+        UPDATE {table} SET
+            employee_count = employee_count - 1,
+            salary_count = salary_count - ({salary} IS NOT NULL),
+            total_salary = total_salary - COALESCE({salary}, 0),
+            avg_salary = (total_salary - COALESCE({salary}, 0))
+                         / NULLIF(salary_count - ({salary} IS NOT NULL), 0)
+        WHERE {key_column} = {key};
+        UPDATE {table} SET
+            (min_salary, max_salary) = ({extremes_query.format(key=key)})
+        WHERE {key_column} = {key} AND ({salary} = min_salary OR {salary} = max_salary);
+        DELETE FROM {table} WHERE {key_column} = {key} AND employee_count <= 0;"""
+
+LEVEL_EXTREMES = """SELECT MIN(e.salary), MAX(e.salary)
+                FROM employees e JOIN employee_hierarchy eh ON eh.employee_id = e.id
+                WHERE eh.level = {key}"""
+DEPARTMENT_EXTREMES = """SELECT MIN(salary), MAX(salary) FROM employees WHERE department_id = {key}"""
+
+def _level_add(level, salary):
+    return _salary_add("summary_salary_by_level", "level", level, salary)
+
+def _level_remove(level, salary):
+    return _salary_remove("summary_salary_by_level", "level", level, salary, LEVEL_EXTREMES)
+
+def _department_add(department_id, salary):
+    return _salary_add(
+        "summary_salary_by_department", "department_id", department_id, salary,
+        name_column="department_name",
+        name_query="(SELECT name FROM departments WHERE id = g.key)",
+    )
+
+def _department_remove(department_id, salary):
+    return _salary_remove("summary_salary_by_department", "department_id", department_id, salary,
+                          DEPARTMENT_EXTREMES)
+
+def _skill_add(skill_id, proficiency):
+    return f"""
+        INSERT INTO summary_skill_proficiency (skill_id, skill_name, proficiency_level, employee_count)
+        SELECT {skill_id}, (SELECT name FROM skills WHERE id = {skill_id}), {proficiency}, 1
+        WHERE {proficiency} IS NOT NULL
+        ON CONFLICT (skill_id, proficiency_level) DO UPDATE SET employee_count = employee_count + 1;"""
+
+def _skill_remove(skill_id, proficiency):
+    return f"""
+        UPDATE summary_skill_proficiency SET employee_count = employee_count - 1
+        WHERE skill_id = {skill_id} AND proficiency_level = {proficiency};
+        DELETE FROM summary_skill_proficiency
+        WHERE skill_id = {skill_id} AND proficiency_level = {proficiency} AND employee_count <= 0;"""
+
+def _level_of(employee_id):
+    return f"(SELECT level FROM employee_hierarchy WHERE employee_id = {employee_id})"
+
+def _salary_of(employee_id):
+    return f"(SELECT salary FROM employees WHERE id = {employee_id})"
+
+def _member_level(level, employee_id):
+    """The level, or NULL once the employee row is gone (matching refresh_summaries' join)"""
+    return f"(SELECT {level} WHERE EXISTS (SELECT 1 FROM employees WHERE id = {employee_id}))"
+
+def summary_triggers():
+    """Return {trigger name: (event, condition, body)} for every maintenance trigger"""
+    return {
+        "trg_summary_employees_insert": (
+            "AFTER INSERT ON employees", "",
+            _department_add("NEW.department_id", "NEW.salary")
+            + _level_add(_level_of("NEW.id"), "NEW.salary"),
+        ),
+        "trg_summary_employees_delete": (
+            "AFTER DELETE ON employees", "",
+            _department_remove("OLD.department_id", "OLD.salary")
+            + _level_remove(_level_of("OLD.id"), "OLD.salary"),
+        ),
+        "trg_summary_employees_update": (
+            "AFTER UPDATE OF salary, department_id ON employees",
+            "AND (OLD.salary IS NOT NEW.salary OR OLD.department_id IS NOT NEW.department_id)",
+            _department_remove("OLD.department_id", "OLD.salary")
+            + _department_add("NEW.department_id", "NEW.salary")
+            + _level_remove(_level_of("NEW.id"), "OLD.salary")
+            + _level_add(_level_of("NEW.id"), "NEW.salary"),
+        ),
+        "trg_summary_hierarchy_insert": (
+            "AFTER INSERT ON employee_hierarchy", "",
+            _level_add(_member_level("NEW.level", "NEW.employee_id"), _salary_of("NEW.employee_id")),
+        ),
+        "trg_summary_hierarchy_delete": (
+            "AFTER DELETE ON employee_hierarchy", "",
+            _level_remove(_member_level("OLD.level", "OLD.employee_id"), _salary_of("OLD.employee_id")),
+        ),
+        "trg_summary_hierarchy_update": (
+            "AFTER UPDATE OF level, employee_id ON employee_hierarchy",
+            "AND (OLD.level IS NOT NEW.level OR OLD.employee_id IS NOT NEW.employee_id)",
+            _level_remove(_member_level("OLD.level", "OLD.employee_id"), _salary_of("OLD.employee_id"))
+            + _level_add(_member_level("NEW.level", "NEW.employee_id"), _salary_of("NEW.employee_id")),
+        ),
+        "trg_summary_skills_insert": (
+            "AFTER INSERT ON employee_skills", "",
+            _skill_add("NEW.skill_id", "NEW.proficiency_level"),
+        ),
+        "trg_summary_skills_delete": (
+            "AFTER DELETE ON employee_skills", "",
+            _skill_remove("OLD.skill_id", "OLD.proficiency_level"),
+        ),
+        "trg_summary_skills_update": (
+            "AFTER UPDATE OF skill_id, proficiency_level ON employee_skills",
+            "AND (OLD.skill_id IS NOT NEW.skill_id OR OLD.proficiency_level IS NOT NEW.proficiency_level)",
+            _skill_remove("OLD.skill_id", "OLD.proficiency_level")
+            + _skill_add("NEW.skill_id", "NEW.proficiency_level"),
+        ),
+    }
+
+def create_summary_triggers(conn):
+    """(Re)create the triggers that keep the summary tables up to date"""
+    cursor = conn.cursor()
+    for name, (event, condition, body) in summary_triggers().items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"""
+            CREATE TRIGGER {name} {event}
+            FOR EACH ROW WHEN {ENABLED} = 1 {condition}
+            BEGIN
+                {body}
+            END
+        """)
+    conn.commit()
+    print(f"✅ Created {len(summary_triggers())} summary maintenance triggers")
+
+def refresh_summaries(conn):
+    """Recompute every summary table from the base tables"""
+    cursor = conn.cursor()
+    for table in SUMMARY_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.execute("""
+        INSERT INTO summary_salary_by_level
+            (level, employee_count, salary_count, total_salary, min_salary, max_salary, avg_salary)
+        SELECT eh.level, COUNT(*), COUNT(e.salary), COALESCE(SUM(e.salary), 0),
+               MIN(e.salary), MAX(e.salary), AVG(e.salary)
+        FROM employee_hierarchy eh
+        JOIN employees e ON eh.employee_id = e.id
+        GROUP BY eh.level
+    """)
+    cursor.execute("""
+        INSERT INTO summary_salary_by_department
+            (department_id, department_name, employee_count, salary_count, total_salary,
+             min_salary, max_salary, avg_salary)
+        SELECT e.department_id, d.name, COUNT(*), COUNT(e.salary), COALESCE(SUM(e.salary), 0),
+               MIN(e.salary), MAX(e.salary), AVG(e.salary)
+        FROM employees e
+        LEFT JOIN departments d ON e.department_id = d.id
+        WHERE e.department_id IS NOT NULL
+        GROUP BY e.department_id
+    """)
+    cursor.execute("""
+        INSERT INTO summary_skill_proficiency (skill_id, skill_name, proficiency_level, employee_count)
+        SELECT es.skill_id, s.name, es.proficiency_level, COUNT(*)
+        FROM employee_skills es
+        LEFT JOIN skills s ON es.skill_id = s.id
+        WHERE es.proficiency_level IS NOT NULL
+        GROUP BY es.skill_id, es.proficiency_level
+    """)
+    conn.commit()
+    print("✅ Refreshed summary tables from base data")
+
+def suspend_summaries(conn):
+    """Switch off trigger maintenance, e.g. before a bulk load"""
+    conn.execute("UPDATE summary_control SET enabled = 0 WHERE id = 1")
+    conn.commit()
+    print("⏸️  Summary maintenance suspended")
+
+def resume_summaries(conn):
+    """Switch trigger maintenance back on and recompute the summaries"""
+    conn.execute("UPDATE summary_control SET enabled = 1 WHERE id = 1")
+    refresh_summaries(conn)
+    print("▶️  Summary maintenance resumed")
+
+def summaries_exist(conn):
+    """Check whether the summary tables have been created"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(SUMMARY_TABLES))})",
+        SUMMARY_TABLES,
+    )
+    return cursor.fetchone()[0] == len(SUMMARY_TABLES)
+
+def display_summaries(conn):
+    """Display the contents of the summary tables"""
+    cursor = conn.cursor()
+
+    print("\n" + "="*70)
+    print("📊 MATERIALIZED SUMMARIES")
+    print("="*70)
+
+    print(f"\n{'Level':<15} {'Count':<8} {'Avg Salary':<15} {'Min':<15} {'Max':<15}")
+    print("-" * 70)
+    cursor.execute(f"""
+        SELECT level, employee_count, avg_salary, min_salary, max_salary
+        FROM summary_salary_by_level
+        ORDER BY {LEVEL_ORDER}
+    """)
+    for level, count, avg_sal, min_sal, max_sal in cursor.fetchall():
+        print(f"{level:<15} {count:<8} ${avg_sal or 0:>12,.0f} ${min_sal or 0:>13,.0f} ${max_sal or 0:>13,.0f}")
+
+    print(f"\n{'Department':<20} {'Employees':<10} {'Avg Salary':<15} {'Total Spend':<15}")
+    print("-" * 62)
+    cursor.execute("""
+        SELECT department_name, employee_count, avg_salary, total_salary
+        FROM summary_salary_by_department
+        ORDER BY total_salary DESC
+    """)
+    for dept, count, avg_sal, total_sal in cursor.fetchall():
+        print(f"{dept or 'Unknown':<20} {count:<10} ${avg_sal or 0:>13,.0f} ${total_sal:>13,.0f}")
+
+    print(f"\n{'Skill':<22} {'Beginner':<10} {'Intermed.':<10} {'Advanced':<10} {'Expert':<10}")
+    print("-" * 62)
+    cursor.execute("""
+        SELECT skill_name,
+               SUM(CASE WHEN proficiency_level = 'Beginner' THEN employee_count ELSE 0 END),
+               SUM(CASE WHEN proficiency_level = 'Intermediate' THEN employee_count ELSE 0 END),
+               SUM(CASE WHEN proficiency_level = 'Advanced' THEN employee_count ELSE 0 END),
+               SUM(CASE WHEN proficiency_level = 'Expert' THEN employee_count ELSE 0 END)
+        FROM summary_skill_proficiency
+        GROUP BY skill_id
+        ORDER BY skill_name
+    """)
+    for skill, beginner, intermediate, advanced, expert in cursor.fetchall():
+        print(f"{skill or 'Unknown':<22} {beginner:<10} {intermediate:<10} {advanced:<10} {expert:<10}")
+
+    print("\n" + "="*70)
+
+def main():
+    """Main function"""
+    print("🚀 Adding materialized summary tables...")
+
+    conn = sqlite3.connect(DB_PATH)
+
+    try:
+        create_summary_tables(conn)
+        create_summary_triggers(conn)
+        refresh_summaries(conn)
+        display_summaries(conn)
+
+        print("\n✅ Summary tables added successfully!")
+        print(f"📁 Database location: {DB_PATH}")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Process-wide registry that builds the LangChain SQL agent stack once and reuses it."""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_community.utilities import SQLDatabase
+from langchain_community.agent_toolkits import create_sql_agent
+
+from cancellation import current_token, run_cancellable
+from database import DB_PATH, create_db_engine, get_schema_version
+from schema_cache import SchemaSnapshot, schema_cache
+from sql_guard import GuardedSQLDatabaseToolkit
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemma-3-27b-it"
+
+
+class DeadlineChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    Gemini chat model whose calls return once the current query is cancelled.
+
+    The client takes no per-request timeout, so when the query being
+    handled has a cancel token, the stock _generate (retries included) runs
+    through run_cancellable: the caller gets QueryCancelled as soon as the
+    token fires or its deadline passes, and the request finishes on the
+    helper thread, which holds its slot until then. Without a token the
+    stock behaviour is kept.
+    """
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        token = current_token()
+        if token is None:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        token.check()
+        return run_cancellable(token, super()._generate, messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def gemini_llm_factory(model: str, api_key: str):
+    """
+    Build the Gemini chat model used by default.
+
+    Args:
+        model: Gemini model name
+        api_key: Google API key for Gemini
+
+    Returns:
+        LangChain chat model
+    """
+    return DeadlineChatGoogleGenerativeAI(model=model, temperature=0, google_api_key=api_key)
+
+
+@dataclass
+class AgentBundle:
+    """Everything needed to answer a query for one (model, API key) pair."""
+    model: str
+    schema_version: int
+    snapshot: SchemaSnapshot
+    db: SQLDatabase
+    llm: Any
+    agent: Any
+
+
+class AgentRegistry:
+    """
+    Cache of SQL agents keyed by model and API key.
+
+    The SQLAlchemy engine is created once per process and shared by every
+    agent. The reflected SQLDatabase, whose table info is served from the
+    cached schema snapshot, is shared by all agents built against the same
+    schema version, and each (model, API key) pair keeps its own LLM
+    client and agent executor. Bundles are rebuilt only when the API key,
+    model or database schema changes. The agent's query tool runs behind
+    the SQL cost guard (see sql_guard).
+
+    The LLM is built by llm_factory(model, api_key), so benchmarks and
+    evaluation runs can swap Gemini for a local stand-in.
+    """
+
+    def __init__(self, db_path: str = DB_PATH,
+                 llm_factory: Callable[[str, str], Any] = gemini_llm_factory):
+        self._db_path = db_path
+        self._llm_factory = llm_factory
+        self._lock = threading.Lock()
+        self._engine = None
+        self._db: Optional[SQLDatabase] = None
+        self._snapshot: Optional[SchemaSnapshot] = None
+        self._db_schema_version: Optional[int] = None
+        self._bundles: Dict[Tuple[str, str], AgentBundle] = {}
+
+    @property
+    def engine(self):
+        """Shared SQLAlchemy engine, created on first use."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_db_engine(self._db_path)
+        return self._engine
+
+    def get(self, api_key: str, model: str = DEFAULT_MODEL) -> AgentBundle:
+        """
+        Return the agent bundle for a model and API key, building it if needed.
+
+        Args:
+            api_key: Google API key for Gemini
+            model: Gemini model name
+
+        Returns:
+            AgentBundle with a ready-to-use agent executor
+        """
+        schema_version = get_schema_version(self.engine)
+        key = (model, api_key)
+
+        bundle = self._bundles.get(key)
+        if bundle is not None and bundle.schema_version == schema_version:
+            return bundle
+
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is not None and bundle.schema_version == schema_version:
+                return bundle
+
+            if self._db is None or self._db_schema_version != schema_version:
+                logger.info(f"📊 Reflecting database schema (schema_version={schema_version})")
+                # Serve table info from the snapshot instead of sampling rows per call
+                with span("schema_reflection"):
+                    self._snapshot = schema_cache.get(self._engine, schema_version, self._db_path)
+                self._db = SQLDatabase(self._engine, custom_table_info=self._snapshot.table_info)
+                self._db_schema_version = schema_version
+                # Agents built against the old schema are stale
+                self._bundles.clear()
+
+            logger.info(f"🤖 Initializing {model} LLM")
+            llm = self._llm_factory(model, api_key)
+
+            logger.info("🔧 Creating SQL Agent")
+            agent = create_sql_agent(
+                llm=llm,
+                toolkit=GuardedSQLDatabaseToolkit(db=self._db, llm=llm),
+                verbose=False,
+                handle_parsing_errors=True,
+                max_iterations=10
+            )
+
+            bundle = AgentBundle(
+                model=model,
+                schema_version=schema_version,
+                snapshot=self._snapshot,
+                db=self._db,
+                llm=llm,
+                agent=agent,
+            )
+            self._bundles[key] = bundle
+            return bundle
+
+    def set_llm_factory(self, llm_factory: Callable[[str, str], Any]):
+        """
+        Replace the function that builds LLMs and drop agents built with the old one.
+
+        Args:
+            llm_factory: Callable taking (model, api_key) and returning a LangChain LLM
+        """
+        with self._lock:
+            self._llm_factory = llm_factory
+            self._bundles.clear()
+        logger.info("♻️ Agent registry LLM factory replaced")
+
+    def invalidate(self, api_key: Optional[str] = None):
+        """
+        Drop cached agents so they are rebuilt on next use.
+
+        Args:
+            api_key: Only drop agents for this key; drop everything if None
+        """
+        with self._lock:
+            if api_key is None:
+                self._bundles.clear()
+                self._db = None
+                self._db_schema_version = None
+                self._snapshot = None
+                schema_cache.invalidate()
+            else:
+                for key in [k for k in self._bundles if k[1] == api_key]:
+                    del self._bundles[key]
+        logger.info("♻️ Agent registry invalidated")
+
+
+registry = AgentRegistry()
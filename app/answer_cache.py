@@ -0,0 +1,109 @@
+"""LRU/TTL cache of final agent answers, invalidated when the database changes."""
+
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 3600
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a natural-language question for cache lookups.
+
+    Lowercases, collapses whitespace and drops surrounding quotes and
+    trailing punctuation, so "Python experts?" and "python  experts"
+    share an entry.
+
+    Args:
+        question: Raw question text from the user
+
+    Returns:
+        Normalized question text
+    """
+    normalized = re.sub(r"\s+", " ", question.strip().lower())
+    return normalized.strip("\"'`").rstrip("?.!;: ").strip()
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and data-version tagging.
+
+    Each entry remembers the database data version it was computed under;
+    a lookup with a different version is treated as a miss and the stale
+    entry is dropped.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 metric_prefix: str = "answer_cache", description: str = "the answer cache"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._hits_metric = f"{metric_prefix}_hits_total"
+        self._misses_metric = f"{metric_prefix}_misses_total"
+        metrics.describe(self._hits_metric, f"Lookups answered from {description}")
+        metrics.describe(self._misses_metric, f"Lookups that missed {description}")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Hashable, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, data_version: Hashable) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key, usually built from the normalized question
+            data_version: Current database data version
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, stored_version, value = entry
+                if stored_version == data_version and now - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    metrics.increment(self._hits_metric)
+                    return value
+                del self._entries[key]
+        metrics.increment(self._misses_metric)
+        return None
+
+    def put(self, key: Hashable, data_version: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key, usually built from the normalized question
+            data_version: Database data version the value was computed under
+            value: Value to cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), data_version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Remove a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+answer_cache = AnswerCache()
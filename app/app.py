@@ -3,8 +3,17 @@
 import os
 import json
 import logging
-from flask import Flask, render_template, request, jsonify
-from sql_agent import query_database
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from sql_agent import ENGINES, query_database
+from streaming import stream_query
+from cancellation import CancelToken, active_requests
+from jobs import QueueFullError, job_manager
+from agent_registry import registry
+from settings_store import SettingsStore
+from result_store import DEFAULT_PAGE_SIZE, ResultSetExpired, result_store
+from database import data_versions
+from index_advisor import report as index_report, sql_log
+import metrics
 from functools import wraps
 
 # Configure logging
@@ -20,27 +29,60 @@ app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 # Settings storage (in production, use database)
 SETTINGS_FILE = 'settings.json'
 
+settings_store = SettingsStore(SETTINGS_FILE)
+
+# Deadline for a query request; clients may ask for a shorter one with "timeout"
+QUERY_TIMEOUT_SECONDS = 90
+
+
+def _on_api_key_change(old_settings, new_settings):
+    """Drop agents built with a replaced API key."""
+    if old_settings.get("api_key"):
+        registry.invalidate(old_settings["api_key"])
+    logger.info("🔑 API key changed, agent registry notified")
+
+
+settings_store.subscribe(_on_api_key_change)
+
 
 def load_settings():
-    """Load settings from file."""
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, 'r') as f:
-            return json.load(f)
-    return {"api_key": ""}
+    """Return the current settings from memory."""
+    return settings_store.get()
 
 
 def save_settings(settings):
-    """Save settings to file."""
-    with open(SETTINGS_FILE, 'w') as f:
-        json.dump(settings, f)
+    """Save settings atomically and update the in-memory copy."""
+    settings_store.update(settings)
+
+
+def request_cancel_token(data):
+    """
+    Build the cancel token for a query request.
+
+    Args:
+        data: Request JSON; "timeout" (seconds) shortens the default deadline
+
+    Returns:
+        CancelToken that fires at the request deadline
+    """
+    try:
+        timeout = float(data.get("timeout") or QUERY_TIMEOUT_SECONDS)
+    except (TypeError, ValueError):
+        timeout = QUERY_TIMEOUT_SECONDS
+    return CancelToken(timeout=min(max(timeout, 1.0), QUERY_TIMEOUT_SECONDS))
+
+
+def request_client_id(data):
+    """Client id from the request JSON or the X-Client-Id header, if any."""
+    client_id = data.get("client_id") or request.headers.get("X-Client-Id")
+    return str(client_id)[:128] if client_id else None
 
 
 def require_api_key(f):
     """Decorator to check if API key is configured."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        settings = load_settings()
-        if not settings.get("api_key"):
+        if not load_settings().get("api_key"):
             return jsonify({"error": "API key not configured. Please configure in settings."}), 400
         return f(*args, **kwargs)
     return decorated_function
@@ -95,24 +137,161 @@ def query():
     
     settings = load_settings()
     api_key = settings.get("api_key")
+    # "format": "json" returns rows as {columns, rows, sql} instead of a markdown table
+    structured = data.get("format") == "json"
+    engine = data.get("engine", "agent")
+    if engine not in ENGINES:
+        return jsonify({"error": f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}"}), 400
+    # "timings": true adds the per-stage latency breakdown to the response
+    timings = bool(data.get("timings"))
+    # A newer query with the same "client_id" cancels this one
+    token = request_cancel_token(data)
+    client_id = request_client_id(data)
     
     logger.info(f"🔐 Using configured API key for query execution")
     
-    # Execute query using SQL agent
-    result = query_database(user_query, api_key)
+    # Execute query using the selected engine
+    with active_requests.track(client_id, token):
+        result = query_database(user_query, api_key, cancel_token=token, structured=structured,
+                                engine=engine, timings=timings)
     
     if result["success"]:
-        logger.info(f"✅ Query executed successfully, formatted={result.get('formatted')}")
-        return jsonify({
+        logger.info(f"✅ Query executed successfully, formatted={result.get('formatted')}, cached={result.get('cached')}")
+        response = {
             "success": True,
-            "result": result["result"]
-        })
+            "result": result["result"],
+            "cached": result.get("cached", False),
+            "route": result.get("route"),
+            "intent": result.get("intent"),
+            "data": result.get("data")
+        }
+        if timings:
+            response["timings"] = result["timings"]
+        return jsonify(response)
     else:
         logger.error(f"❌ Query execution failed: {result['error']}")
-        return jsonify({
+        response = {
             "success": False,
             "error": result["error"]
-        }), 500
+        }
+        if timings:
+            response["timings"] = result["timings"]
+        if result.get("cancelled"):
+            response["cancelled"] = result["cancelled"]
+            return jsonify(response), 504 if result["cancelled"] == "timed out" else 409
+        return jsonify(response), 500
+
+
+@app.route('/api/query/stream', methods=['POST'])
+@require_api_key
+def query_stream():
+    """Stream agent progress and result rows as Server-Sent Events."""
+    data = request.get_json()
+    user_query = data.get("query", "").strip()
+    
+    logger.info(f"📡 Streaming query received from client: '{user_query}'")
+    
+    if not user_query:
+        logger.warning("⚠️ Query validation failed: empty query")
+        return jsonify({"error": "Query cannot be empty"}), 400
+    
+    api_key = load_settings().get("api_key")
+    structured = data.get("format") == "json"
+    engine = data.get("engine", "agent")
+    if engine not in ENGINES:
+        return jsonify({"error": f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}"}), 400
+    
+    return Response(
+        stream_with_context(stream_query(user_query, api_key, structured=structured, engine=engine,
+                                         cancel_token=request_cancel_token(data),
+                                         client_id=request_client_id(data))),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route('/api/query/cancel', methods=['POST'])
+def cancel_query():
+    """Cancel the in-flight query of a client, e.g. when the user navigates away."""
+    data = request.get_json(silent=True) or {}
+    client_id = request_client_id(data)
+    if not client_id:
+        return jsonify({"error": "client_id is required"}), 400
+    return jsonify({"cancelled": active_requests.cancel(client_id)})
+
+
+@app.route('/api/jobs', methods=['POST'])
+@require_api_key
+def create_job():
+    """Enqueue a natural language query for background execution."""
+    data = request.get_json()
+    user_query = data.get("query", "").strip()
+    
+    logger.info(f"📥 Job submission received from client: '{user_query}'")
+    
+    if not user_query:
+        logger.warning("⚠️ Query validation failed: empty query")
+        return jsonify({"error": "Query cannot be empty"}), 400
+    
+    engine = data.get("engine", "agent")
+    if engine not in ENGINES:
+        return jsonify({"error": f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}"}), 400
+    
+    api_key = load_settings().get("api_key")
+    structured = data.get("format") == "json"
+    
+    try:
+        job = job_manager.submit(user_query, api_key, structured=structured, engine=engine)
+    except QueueFullError as e:
+        logger.warning(f"⚠️ Job rejected: {e}")
+        return jsonify({"error": str(e)}), 429
+    
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Return a job's status and result, or cancel it with DELETE."""
+    if request.method == 'DELETE':
+        job = job_manager.cancel(job_id)
+    else:
+        job = job_manager.get(job_id)
+    
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/results/<result_id>', methods=['GET'])
+def result_page(result_id):
+    """Return the next page of a server-side result set."""
+    result_set = result_store.get(result_id)
+    if result_set is None:
+        return jsonify({"error": "Result not found or expired"}), 404
+    
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    
+    try:
+        page = result_store.fetch_page(registry.engine, result_set, after=after, limit=limit,
+                                       data_version=data_versions.current())
+    except ResultSetExpired as e:
+        return jsonify({"error": str(e)}), 410
+    
+    logger.info(f"📄 Served {len(page['rows'])} rows of result {result_id} after key {after}")
+    return jsonify(page)
+
+
+@app.route('/api/advisor/indexes', methods=['GET'])
+def index_advice():
+    """Report full scans in the agent's recorded SQL and the indexes that would remove them."""
+    connection = registry.engine.raw_connection()
+    try:
+        advice = index_report(connection, sql_log.statements())
+    finally:
+        connection.close()
+    logger.info(f"📇 Index advice for {len(advice['statements'])} recorded statements")
+    return jsonify(advice)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -126,5 +305,11 @@ def health():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose counters and latency histograms in Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
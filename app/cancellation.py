@@ -0,0 +1,271 @@
+"""Cooperative cancellation and timeouts for in-flight queries."""
+
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# How often a caller waiting on cancellable work checks its token
+CANCEL_POLL_SECONDS = 0.1
+
+# Helper threads run_cancellable may have alive at once, including ones
+# whose caller already gave up and that are still winding down
+MAX_CANCELLABLE_THREADS = 32
+
+SUPERSEDED = "superseded by a newer request"
+ABANDONED = "abandoned by the client"
+
+metrics.describe("queries_cancelled_total", "Queries stopped before completion, by reason")
+metrics.describe("cancellable_threads_detached_total",
+                 "Helper threads left to wind down after their caller stopped waiting")
+metrics.describe("cancellable_threads_stopped_total", "Detached helper threads that have since finished")
+
+_thread_slots = threading.BoundedSemaphore(MAX_CANCELLABLE_THREADS)
+
+_current: ContextVar[Optional["CancelToken"]] = ContextVar("current_cancel_token", default=None)
+
+
+class QueryCancelled(Exception):
+    """Raised inside an agent run once its cancel token has fired."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(f"Query {reason}")
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    Thread-safe flag that is set by cancel() or by an optional timeout.
+
+    Long-running work checks the token at safe points and stops with
+    QueryCancelled once it has fired.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self, reason: str = "cancelled"):
+        """Fire the token; the first reason given wins."""
+        if self._reason is None:
+            self._reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() was called or the deadline has passed."""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("timed out")
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the token fired, or None if it has not."""
+        return self._reason if self.cancelled else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """
+        Raise if the token has fired.
+
+        Raises:
+            QueryCancelled: If the query was cancelled or timed out
+        """
+        if self.cancelled:
+            raise QueryCancelled(self._reason)
+
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """
+    Stops an agent run once the token fires: before the next LLM or tool
+    call, and right after the one in flight returns.
+    """
+
+    raise_error = True
+
+    def __init__(self, token: CancelToken):
+        self.token = token
+
+    def on_llm_start(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+    def on_llm_end(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+    def on_tool_start(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+    def on_tool_end(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+    def on_agent_action(self, *args: Any, **kwargs: Any):
+        self.token.check()
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the cancel token of the query being handled on this context, if any."""
+    return _current.get()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """
+    Make a token the current one, so code deep in the call stack (e.g. the
+    SQLite progress handler of the SQL cost guard) can stop when it fires.
+
+    Yields:
+        The token
+    """
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def run_cancellable(token: CancelToken, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a function on a helper thread and wait for it only until the token fires.
+
+    The helper thread runs with a copy of the caller's context (trace,
+    current token). Once the token fires the caller returns at once; the
+    helper stops at its next checkpoint: when the in-flight LLM call
+    returns (bounded by the token's deadline), before the next tool call,
+    or inside SQLite.
+
+    At most MAX_CANCELLABLE_THREADS helpers are alive at a time, counting
+    those still winding down after their caller returned, so a burst of
+    timeouts or superseded queries cannot pile up threads. A caller waits
+    for a free slot, or until its own token fires.
+
+    Args:
+        token: Token whose cancellation or deadline ends the wait
+        function: Callable to run
+        *args: Positional arguments for function
+        **kwargs: Keyword arguments for function
+
+    Returns:
+        The function's return value
+
+    Raises:
+        QueryCancelled: If the token fired first
+    """
+    while not _thread_slots.acquire(timeout=CANCEL_POLL_SECONDS):
+        token.check()
+
+    outcome: Dict[str, Any] = {}
+    done = threading.Event()
+    lock = threading.Lock()
+    detached = False
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            outcome["result"] = context.run(function, *args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            _thread_slots.release()
+            with lock:
+                done.set()
+                if detached:
+                    metrics.increment("cancellable_threads_stopped_total")
+
+    try:
+        threading.Thread(target=run, name="cancellable-query", daemon=True).start()
+    except BaseException:
+        _thread_slots.release()
+        raise
+    while not done.wait(CANCEL_POLL_SECONDS):
+        if token.cancelled:
+            with lock:
+                if not done.is_set():
+                    detached = True
+                    metrics.increment("cancellable_threads_detached_total")
+                    logger.info("🧵 Left a cancelled query to stop on its helper thread")
+                    token.check()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class ActiveRequests:
+    """
+    The in-flight query of each client, keyed by a client-chosen id.
+
+    Starting a query for a client cancels the one it already has running,
+    so a user who gives up and searches again stops paying for the old
+    search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, CancelToken] = {}
+
+    @contextmanager
+    def track(self, client_id: Optional[str], token: CancelToken) -> Iterator[CancelToken]:
+        """
+        Register a query as the client's current one for the duration of the block.
+
+        Args:
+            client_id: Id sent by the client; queries without one are not tracked
+            token: Cancel token of the new query
+
+        Yields:
+            The token
+        """
+        if not client_id:
+            yield token
+            return
+        with self._lock:
+            previous = self._tokens.get(client_id)
+            self._tokens[client_id] = token
+        if previous is not None and not previous.cancelled:
+            previous.cancel(SUPERSEDED)
+            logger.info(f"🛑 Cancelled the previous query of client {client_id}")
+        try:
+            yield token
+        finally:
+            with self._lock:
+                if self._tokens.get(client_id) is token:
+                    del self._tokens[client_id]
+
+    def cancel(self, client_id: str, reason: str = ABANDONED) -> bool:
+        """
+        Cancel a client's in-flight query.
+
+        Args:
+            client_id: Id the query was started with
+            reason: Why the query is cancelled
+
+        Returns:
+            True if a running query was cancelled
+        """
+        with self._lock:
+            token = self._tokens.get(client_id)
+        if token is None or token.cancelled:
+            return False
+        token.cancel(reason)
+        logger.info(f"🛑 Query of client {client_id} cancelled: {reason}")
+        return True
+
+
+active_requests = ActiveRequests()
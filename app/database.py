@@ -0,0 +1,155 @@
+"""Shared SQLite database location and engine helpers for the SQL agent."""
+
+import os
+import logging
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# The employee database lives in the repository root, one level above app/
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "employee_database.db")
+
+# Per-connection settings for the agent's read-only pool. temp_store=MEMORY is
+# deliberately left out: benchmarks/engine_latency.py showed it slowing down
+# GROUP BY/ORDER BY queries by ~30% on this database.
+READONLY_PRAGMAS = {
+    "mmap_size": 268435456,   # 256 MB memory-mapped I/O
+    "cache_size": -65536,     # 64 MB page cache (negative means KiB)
+    "query_only": 1,          # reject any write, even if the file is writable
+}
+
+# Connection pool sizing for the read-only engine
+POOL_SIZE = 8
+POOL_MAX_OVERFLOW = 8
+POOL_TIMEOUT_SECONDS = 30
+
+
+def check_journal_mode(db_path: str = DB_PATH) -> str:
+    """
+    Log the database's journal mode without changing it.
+
+    Readers only stop blocking on writers in WAL mode, which migrate.py
+    switches on; any other mode is logged as a warning.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        The journal mode, or "unknown" if the database could not be read
+    """
+    try:
+        connection = connect_readonly(db_path)
+        try:
+            mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Could not read the journal mode: {e}")
+        return "unknown"
+    if mode.lower() == "wal":
+        logger.info(f"📝 SQLite journal_mode={mode}")
+    else:
+        logger.warning(f"⚠️ SQLite journal_mode={mode}; run `python migrate.py` to switch to WAL "
+                       f"so queries do not block while the database is updated")
+    return mode
+
+
+def connect_readonly(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Open a tuned, read-only SQLite connection.
+
+    The file is opened through a `mode=ro` URI and `query_only` is set, so
+    no statement on this connection can modify the database.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        sqlite3 connection usable from any thread
+    """
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    for pragma, value in READONLY_PRAGMAS.items():
+        connection.execute(f"PRAGMA {pragma}={value}")
+    return connection
+
+
+def create_db_engine(db_path: str = DB_PATH, read_only: bool = True):
+    """
+    Create the SQLAlchemy engine used by the SQL agent.
+
+    By default connections are read-only and tuned with READONLY_PRAGMAS,
+    and are pooled with a QueuePool so they are reused across threads.
+
+    Args:
+        db_path: Path to the SQLite database file
+        read_only: Use the tuned read-only pool; False gives a default engine
+
+    Returns:
+        SQLAlchemy engine bound to the database
+    """
+    logger.info(f"🗄️ Creating SQLAlchemy engine for {db_path} (read_only={read_only})")
+    if not read_only:
+        return create_engine(f"sqlite:///{db_path}")
+
+    check_journal_mode(db_path)
+    return create_engine(
+        "sqlite://",
+        creator=lambda: connect_readonly(db_path),
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT_SECONDS,
+    )
+
+
+def get_schema_version(engine) -> int:
+    """
+    Return SQLite's schema cookie, which changes whenever the schema changes.
+
+    Args:
+        engine: SQLAlchemy engine bound to a SQLite database
+
+    Returns:
+        Current value of PRAGMA schema_version
+    """
+    with engine.connect() as connection:
+        return connection.execute(text("PRAGMA schema_version")).scalar()
+
+
+class DataVersionTracker:
+    """
+    Cheap token that changes whenever the database contents change.
+
+    PRAGMA data_version only changes for commits made by *other*
+    connections, so the tracker keeps one long-lived read connection open
+    for it. The file's inode and mtime are mixed in so replacing the
+    database file on disk is detected as well.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def current(self) -> tuple:
+        """
+        Return the current data version token.
+
+        Returns:
+            Tuple of (inode, mtime_ns, data_version) for the database file
+        """
+        stat = os.stat(self._db_path)
+        with self._lock:
+            if self._connection is None:
+                self._connection = connect_readonly(self._db_path)
+            data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        return (stat.st_ino, stat.st_mtime_ns, data_version)
+
+
+data_versions = DataVersionTracker()
@@ -0,0 +1,488 @@
+"""Index advisor: records the SQL the agent generates and suggests indexes that remove full scans."""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from database import DB_PATH, connect_readonly
+
+logger = logging.getLogger(__name__)
+
+# Generated SQL is appended here so the advisor CLI can analyze it offline
+SQL_LOG_PATH = os.path.splitext(DB_PATH)[0] + ".sql_log.jsonl"
+MAX_STATEMENTS = 500
+
+# Timed runs per statement when measuring before/after latency
+TIMING_REPEATS = 3
+
+_TABLE_REF = re.compile(r'^\s*"?(\w+)"?(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+# Table lists: everything after FROM/JOIN up to the next clause, split on commas
+_FROM_CLAUSE = re.compile(
+    r'\b(?:FROM|JOIN)\b(.*?)(?=\b(?:WHERE|GROUP|ORDER|LIMIT|HAVING|UNION|EXCEPT|INTERSECT|ON|USING'
+    r'|JOIN|LEFT|RIGHT|INNER|OUTER|CROSS|NATURAL|WINDOW)\b|\)|$)',
+    re.IGNORECASE | re.DOTALL,
+)
+_SCAN_DETAIL = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+_COMPARISON = r'(?:=|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)'
+_ALIAS_KEYWORDS = {
+    "on", "where", "join", "left", "right", "inner", "outer", "cross", "natural", "using",
+    "group", "order", "limit", "having", "union", "except", "intersect", "window",
+}
+
+
+@dataclass
+class IndexSuggestion:
+    """A single-column index that would turn a full scan into an index search."""
+    table: str
+    column: str
+    statements: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{self.column}"
+
+    @property
+    def ddl(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({self.column})"
+
+
+class SQLLog:
+    """
+    Bounded record of distinct SQL statements generated by the agent.
+
+    Statements are kept in memory in most-recently-seen order, and each
+    new statement is appended to a JSON lines file for the advisor CLI.
+    """
+
+    def __init__(self, path: Optional[str] = SQL_LOG_PATH, max_statements: int = MAX_STATEMENTS):
+        self._path = path
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._statements: "OrderedDict[str, int]" = OrderedDict()
+
+    def record(self, sql: str):
+        """
+        Remember a statement the agent executed successfully.
+
+        Args:
+            sql: Generated SQL statement
+        """
+        statement = sql.strip().rstrip(";").strip()
+        if not statement:
+            return
+        with self._lock:
+            is_new = statement not in self._statements
+            self._statements[statement] = self._statements.get(statement, 0) + 1
+            self._statements.move_to_end(statement)
+            while len(self._statements) > self.max_statements:
+                self._statements.popitem(last=False)
+        if is_new and self._path:
+            try:
+                with open(self._path, "a") as f:
+                    f.write(json.dumps({"sql": statement, "recorded_at": time.time()}) + "\n")
+            except OSError as e:
+                logger.warning(f"⚠️ Could not append to SQL log: {e}")
+
+    def statements(self) -> List[str]:
+        """Return the recorded statements, most recent last."""
+        with self._lock:
+            return list(self._statements)
+
+
+def load_sql_log(path: str = SQL_LOG_PATH, max_statements: int = MAX_STATEMENTS) -> List[str]:
+    """
+    Read distinct statements from a SQL log file.
+
+    Args:
+        path: JSON lines file written by SQLLog
+        max_statements: Keep only this many of the most recent statements
+
+    Returns:
+        List of SQL statements, most recent last
+    """
+    statements: "OrderedDict[str, None]" = OrderedDict()
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        for line in f:
+            try:
+                sql = json.loads(line)["sql"]
+            except (ValueError, KeyError):
+                continue
+            statements.pop(sql, None)
+            statements[sql] = None
+    return list(statements)[-max_statements:]
+
+
+def _fetchall(connection, sql: str, params: tuple = ()) -> list:
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _table_columns(connection) -> Dict[str, Set[str]]:
+    tables = [row[0] for row in _fetchall(
+        connection, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    columns = {}
+    for table in tables:
+        # Skip the INTEGER PRIMARY KEY, which is the rowid and already indexed
+        columns[table] = {row[1] for row in _fetchall(connection, f'PRAGMA table_info("{table}")')
+                          if not (row[5] and row[2].upper() == "INTEGER")}
+    return columns
+
+
+def _indexed_columns(connection, table: str) -> Set[str]:
+    """Columns that already lead an index on the table."""
+    leading = set()
+    for index in _fetchall(connection, f'PRAGMA index_list("{table}")'):
+        info = _fetchall(connection, f'PRAGMA index_info("{index[1]}")')
+        if info:
+            leading.add(info[0][2])
+    return leading
+
+
+def table_aliases(sql: str, tables: Iterable[str]) -> Dict[str, str]:
+    """Map every name a query uses for a table (alias or table name) to the table."""
+    known = {table.lower(): table for table in tables}
+    aliases = {}
+    for clause in _FROM_CLAUSE.findall(sql):
+        for item in clause.split(","):
+            match = _TABLE_REF.match(item)
+            table = known.get(match.group(1).lower()) if match else None
+            if table is None:
+                continue
+            aliases[table.lower()] = table
+            alias = match.group(2)
+            if alias and alias.lower() not in _ALIAS_KEYWORDS:
+                aliases[alias.lower()] = table
+    return aliases
+
+
+def find_full_scans(connection, sql: str) -> List[str]:
+    """
+    Return the tables that a statement reads with a full table scan.
+
+    Args:
+        connection: DB-API connection to the SQLite database
+        sql: SELECT statement to explain
+
+    Returns:
+        Names of the tables scanned without an index
+    """
+    aliases = table_aliases(sql, _table_columns(connection))
+    scanned = []
+    for row in _fetchall(connection, f"EXPLAIN QUERY PLAN {sql}"):
+        match = _SCAN_DETAIL.match(row[-1])
+        if match is None or "INDEX" in match.group(3):
+            continue
+        name = (match.group(2) or match.group(1)).lower()
+        table = aliases.get(name)
+        if table is not None and table not in scanned:
+            scanned.append(table)
+    return scanned
+
+
+def _filter_columns(sql: str, table: str, aliases: Dict[str, str], columns: Set[str]) -> List[str]:
+    """Columns of a table that a statement compares in a join or filter predicate."""
+    names = [name for name, target in aliases.items() if target == table]
+    found = []
+    for name in names:
+        prefix = rf'\b{re.escape(name)}\.(\w+)'
+        for pattern in (rf'{prefix}\s*{_COMPARISON}', rf'{_COMPARISON}\s*{prefix}'):
+            for column in re.findall(pattern, sql, re.IGNORECASE):
+                if column in columns and column not in found:
+                    found.append(column)
+
+    # Unqualified column names are unambiguous when only one table is referenced
+    if len(set(aliases.values())) == 1:
+        for column in re.findall(rf'\b(\w+)\s*{_COMPARISON}', sql, re.IGNORECASE):
+            if column in columns and column not in found:
+                found.append(column)
+    return found
+
+
+def suggest_indexes(connection, statements: Iterable[str]) -> List[IndexSuggestion]:
+    """
+    Suggest indexes for the join/filter columns of fully scanned tables.
+
+    Args:
+        connection: DB-API connection to the SQLite database
+        statements: SQL statements to analyze
+
+    Returns:
+        One suggestion per (table, column), listing the statements it helps
+    """
+    table_columns = _table_columns(connection)
+    suggestions: "OrderedDict[Tuple[str, str], IndexSuggestion]" = OrderedDict()
+    for sql in statements:
+        try:
+            scanned = find_full_scans(connection, sql)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not explain statement, skipping: {e}")
+            continue
+        aliases = table_aliases(sql, table_columns)
+        for table in scanned:
+            candidates = set(table_columns[table]) - _indexed_columns(connection, table)
+            for column in _filter_columns(sql, table, aliases, candidates):
+                suggestion = suggestions.setdefault((table, column), IndexSuggestion(table, column))
+                suggestion.statements.append(sql)
+    return list(suggestions.values())
+
+
+def _time_statement(guard, connection, sql: str, repeats: int = TIMING_REPEATS) -> Optional[float]:
+    """
+    Best-of-N wall time of a statement in milliseconds.
+
+    The statement runs with the agent's row limit under the guard's
+    deadline; None means it was stopped by the deadline.
+    """
+    from sql_guard import AGENT_MAX_ROWS, SQLGuardError, limit_rows
+
+    statement = limit_rows(sql, AGENT_MAX_ROWS)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            with guard.deadline(connection):
+                for _row in connection.exec_driver_sql(statement):
+                    pass
+        except SQLGuardError:
+            return None
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _round_ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+def _guarded_statements(guard, connection, statements: Iterable[str]) -> List[str]:
+    """Keep the queries the cost guard accepts; anything else is never replayed."""
+    from sql_guard import SQLGuardError, is_query
+
+    accepted = []
+    for sql in statements:
+        if not is_query(sql):
+            logger.warning(f"⚠️ Skipping statement that is not a query: {sql[:80]}")
+            continue
+        try:
+            guard.check_plan(connection, sql)
+        except SQLGuardError as e:
+            logger.warning(f"⚠️ Skipping statement rejected by the cost guard ({e.reason}): {sql[:80]}")
+            continue
+        except Exception as e:
+            logger.warning(f"⚠️ Could not explain statement, skipping: {e}")
+            continue
+        accepted.append(sql)
+    return accepted
+
+
+def _copy_database(db_path: str, target_path: str):
+    """Copy a database through the backup API, reading it read-only."""
+    source = connect_readonly(db_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def _replay_engine(db_path: str):
+    """
+    Engine that opens a new read-only connection every time.
+
+    An open connection keeps using the plans of the EXPLAIN statements it
+    has cached, so it would not see indexes created by another connection.
+    """
+    return create_engine("sqlite://", creator=lambda: connect_readonly(db_path), poolclass=NullPool)
+
+
+def evaluate_indexes(db_path: str, statements: List[str], apply: bool = False,
+                     repeats: int = TIMING_REPEATS) -> List[dict]:
+    """
+    Try each suggested index and measure the affected statements before and after.
+
+    The database is copied to a scratch file. Recorded statements are only
+    ever replayed on a read-only connection to the copy: each one must pass
+    the cost guard and is timed under its deadline. Indexes are created and
+    dropped on the copy through a separate connection that runs nothing but
+    DDL. An index that does not remove a full scan from any statement is
+    dropped again; if `apply` is set, the rest are created on db_path in one
+    transaction, followed by ANALYZE.
+
+    Args:
+        db_path: Path to the SQLite database file (must be writable with `apply`)
+        statements: SQL statements to analyze
+        apply: Create the useful indexes on db_path
+        repeats: Timed runs per statement
+
+    Returns:
+        One report dict per suggestion with timings and whether it was kept
+    """
+    # Imported here: sql_guard imports this module for table_aliases
+    from sql_guard import SQLGuard
+
+    # A private guard, so table stats cached for the copy stay out of the app's guard
+    guard = SQLGuard()
+    reports = []
+    kept: List[IndexSuggestion] = []
+    with tempfile.TemporaryDirectory(prefix="index_advisor_") as scratch_dir:
+        scratch_path = os.path.join(scratch_dir, os.path.basename(db_path))
+        _copy_database(db_path, scratch_path)
+
+        engine = _replay_engine(scratch_path)
+        ddl = sqlite3.connect(scratch_path, isolation_level=None)
+        try:
+            with engine.connect() as connection:
+                accepted = _guarded_statements(guard, connection, statements)
+                suggestions = suggest_indexes(connection.connection.dbapi_connection, accepted)
+
+            for suggestion in suggestions:
+                with engine.connect() as connection:
+                    before = {sql: _time_statement(guard, connection, sql, repeats)
+                              for sql in suggestion.statements}
+
+                start = time.perf_counter()
+                ddl.execute(suggestion.ddl)
+                build_ms = (time.perf_counter() - start) * 1000
+
+                with engine.connect() as connection:
+                    raw = connection.connection.dbapi_connection
+                    removed = [sql for sql in suggestion.statements
+                               if suggestion.table not in find_full_scans(raw, sql)]
+                    after = {sql: _time_statement(guard, connection, sql, repeats)
+                             for sql in suggestion.statements}
+
+                keep = bool(removed)
+                if keep:
+                    kept.append(suggestion)
+                else:
+                    ddl.execute(f"DROP INDEX IF EXISTS {suggestion.name}")
+
+                reports.append({
+                    "index": suggestion.name,
+                    "ddl": suggestion.ddl,
+                    "build_ms": round(build_ms, 2),
+                    "removes_scan": keep,
+                    "applied": keep and apply,
+                    "statements": [
+                        {
+                            "sql": sql,
+                            "before_ms": _round_ms(before[sql]),
+                            "after_ms": _round_ms(after[sql]),
+                            "scan_removed": sql in removed,
+                        }
+                        for sql in suggestion.statements
+                    ],
+                })
+        finally:
+            ddl.close()
+            engine.dispose()
+
+    if apply and kept:
+        _apply_indexes(db_path, kept)
+    return reports
+
+
+def _apply_indexes(db_path: str, suggestions: List[IndexSuggestion]):
+    """Create indexes and refresh the planner statistics in one transaction."""
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        connection.execute("BEGIN")
+        for suggestion in suggestions:
+            logger.info(f"📇 {suggestion.ddl}")
+            connection.execute(suggestion.ddl)
+        connection.execute("ANALYZE")
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+
+def report(connection, statements: List[str]) -> dict:
+    """
+    Summarize full scans and suggested indexes without touching the database.
+
+    Args:
+        connection: DB-API connection to the SQLite database
+        statements: SQL statements to analyze
+
+    Returns:
+        Dictionary with per-statement scans and the suggested indexes
+    """
+    scans = []
+    for sql in statements:
+        try:
+            scans.append({"sql": sql, "full_scans": find_full_scans(connection, sql)})
+        except Exception as e:
+            scans.append({"sql": sql, "error": str(e)})
+    suggestions = suggest_indexes(connection, statements)
+    return {
+        "statements": scans,
+        "suggestions": [
+            {"index": s.name, "ddl": s.ddl, "table": s.table, "column": s.column,
+             "statement_count": len(s.statements)}
+            for s in suggestions
+        ],
+    }
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{'timed out':>12}" if value is None else f"{value:9.3f} ms"
+
+
+def _print_reports(reports: List[dict], apply: bool):
+    print("\n" + "="*70)
+    print("📇 INDEX ADVISOR")
+    print("="*70)
+    if not reports:
+        print("\nNo full scans with indexable predicates found.")
+    for item in reports:
+        status = "applied" if item["applied"] else ("would help" if item["removes_scan"] else "no effect")
+        print(f"\n{item['ddl']}  [{status}, built in {item['build_ms']:.1f} ms]")
+        for stmt in item["statements"]:
+            marker = "✅" if stmt["scan_removed"] else "➖"
+            print(f"  {marker} {_format_ms(stmt['before_ms'])} → {_format_ms(stmt['after_ms'])}  {stmt['sql'][:80]}")
+    if not apply and any(item["removes_scan"] for item in reports):
+        print("\nRe-run with --apply to create the indexes marked 'would help'.")
+    print("\n" + "="*70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest or create indexes for the SQL the agent generated.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--log", default=SQL_LOG_PATH, help="SQL log written by the app")
+    parser.add_argument("--apply", action="store_true", help="Create the indexes that remove full scans")
+    parser.add_argument("--repeats", type=int, default=TIMING_REPEATS, help="Timed runs per statement")
+    args = parser.parse_args()
+
+    statements = load_sql_log(args.log)
+    print(f"🔎 Analyzing {len(statements)} recorded statements from {args.log}")
+    reports = evaluate_indexes(args.db, statements, apply=args.apply, repeats=args.repeats)
+    _print_reports(reports, args.apply)
+
+
+sql_log = SQLLog()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""Rule-based fast path that answers common question shapes with SQL templates, without the LLM."""
+
+import re
+import calendar
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFICIENCY_LEVELS = ["Beginner", "Intermediate", "Advanced", "Expert"]
+
+# Plural/role words that select an employee_hierarchy.level
+LEVEL_WORDS = {
+    "ceo": "CEO",
+    "vps": "VP",
+    "vice presidents": "VP",
+    "directors": "Director",
+    "managers": "Manager",
+    "individual contributors": "IC",
+    "ics": "IC",
+}
+
+# Common short names, used only when the full department name exists
+DEPARTMENT_ALIASES = {
+    "hr": "human resources",
+    "eng": "engineering",
+}
+
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Words that may appear around the recognised slots without changing the meaning.
+# A question containing any other word is left to the agent.
+FILLER_WORDS = {
+    "show", "me", "list", "find", "get", "give", "display", "all", "the", "every", "everyone",
+    "employees", "employee", "people", "staff", "who", "are", "is", "with", "have", "has",
+    "having", "in", "from", "of", "and", "their", "plus", "skill", "skills", "skilled",
+    "proficiency", "proficient", "level", "levels", "department", "departments", "dept", "team",
+    "what", "which", "whose", "a", "an", "any", "that", "work", "works", "working", "for",
+    "along", "including", "include", "salary", "salaries", "pay", "name", "names", "hire",
+    "date", "dates", "also", "or", "details", "please", "at", "there",
+}
+
+# Extra columns requested just by mentioning them
+COLUMN_WORDS = {
+    "salary": "salary", "salaries": "salary", "pay": "salary",
+    "department": "department", "departments": "department", "dept": "department",
+    "hire": "hire_date",
+}
+
+# Upper bound on the manager names kept for "reports to X" questions
+MAX_MANAGER_NAMES = 50_000
+
+_WORD = re.compile(r"[a-z0-9+#/'$.,-]+")
+
+
+@dataclass
+class Vocabulary:
+    """Entity values the router can resolve, loaded from the database."""
+    departments: Dict[str, Tuple[int, str]]
+    skills: Dict[str, Tuple[int, str]]
+    employees: Dict[str, int]
+    levels: Dict[str, str]
+    has_hierarchy: bool
+
+
+@dataclass
+class RoutedQuery:
+    """A question answered by a parameterized SQL template."""
+    intent: str
+    title: str
+    sql: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Slots:
+    skill: Optional[Tuple[int, str]] = None
+    proficiencies: List[str] = field(default_factory=list)
+    departments: List[Tuple[int, str]] = field(default_factory=list)
+    hired_from: Optional[str] = None
+    hired_to: Optional[str] = None
+    hired_label: Optional[str] = None
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    salary_inclusive: bool = False
+    manager: Optional[Tuple[int, str]] = None
+    level: Optional[str] = None
+    columns: set = field(default_factory=set)
+
+
+def load_vocabulary(engine, employees: Optional[Dict[str, int]] = None) -> Vocabulary:
+    """
+    Read departments, skills and hierarchy levels.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        employees: Manager names from load_manager_names, or None for none
+
+    Returns:
+        Vocabulary keyed by lowercase name
+    """
+    with engine.connect() as connection:
+        tables = {row[0] for row in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        departments = {name.lower(): (id_, name) for id_, name in connection.execute(
+            text("SELECT id, name FROM departments"))}
+        for alias, name in DEPARTMENT_ALIASES.items():
+            if name in departments and alias not in departments:
+                departments[alias] = departments[name]
+        skills = {name.lower(): (id_, name) for id_, name in connection.execute(
+            text("SELECT id, name FROM skills"))} if "skills" in tables else {}
+
+        has_hierarchy = "employee_hierarchy" in tables
+        levels = {level.lower(): level for (level,) in connection.execute(
+            text("SELECT DISTINCT level FROM employee_hierarchy"))} if has_hierarchy else {}
+
+    return Vocabulary(
+        departments=departments,
+        skills=skills,
+        employees=employees or {},
+        levels=levels,
+        has_hierarchy=has_hierarchy,
+    )
+
+
+def load_manager_names(engine) -> Dict[str, int]:
+    """
+    Read the names of employees who manage someone, for "reports to X" questions.
+
+    Only names held by a single employee are returned, so the result is
+    bounded by the number of managers (at most MAX_MANAGER_NAMES) rather
+    than the size of the employees table.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+
+    Returns:
+        Dictionary of lowercase "first last" name to employee id
+    """
+    with engine.connect() as connection:
+        has_hierarchy = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employee_hierarchy'")).first()
+        managers = ("SELECT manager_id FROM employee_hierarchy" if has_hierarchy
+                    else "SELECT manager_id FROM employees")
+        rows = connection.execute(text(f"""
+            SELECT MIN(e.id), lower(e.first_name) || ' ' || lower(e.last_name) AS name
+            FROM employees e
+            WHERE lower(e.first_name) || ' ' || lower(e.last_name) IN (
+                SELECT lower(m.first_name) || ' ' || lower(m.last_name)
+                FROM employees m
+                WHERE m.id IN ({managers})
+            )
+            GROUP BY name
+            HAVING COUNT(*) = 1
+            LIMIT :limit
+        """), {"limit": MAX_MANAGER_NAMES})
+        return {name: id_ for id_, name in rows}
+
+
+def _name_pattern(name: str) -> str:
+    """Regex for an entity name as a whole word ("c++" and "ui/ux design" included)."""
+    return rf"(?<![\w+#]){re.escape(name)}(?![\w+#])"
+
+
+def _parse_amount(number: str, suffix: str) -> float:
+    value = float(number.replace(",", ""))
+    return value * {"k": 1_000, "m": 1_000_000}.get(suffix, 1)
+
+
+def _months_ago(today: date, months: int) -> date:
+    month_index = today.year * 12 + today.month - 1 - months
+    year, month = divmod(month_index, 12)
+    day = min(today.day, 28)
+    return date(year, month + 1, day)
+
+
+def _parse_date(value: str, end: bool = False) -> str:
+    """Expand YYYY / YYYY-MM / YYYY-MM-DD to a date string (start or end of the period)."""
+    parts = value.split("-")
+    if len(parts) == 1:
+        return f"{parts[0]}-12-31" if end else f"{parts[0]}-01-01"
+    if len(parts) == 2:
+        last_day = calendar.monthrange(int(parts[0]), int(parts[1]))[1] if end else 1
+        return f"{parts[0]}-{parts[1]}-{last_day:02d}"
+    return value
+
+
+def _shift_date(value: str, days: int) -> str:
+    return (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+
+
+class IntentRouter:
+    """
+    Matches skill, proficiency, department, hire-date, salary, manager and
+    level questions and turns them into one parameterized SELECT.
+
+    Every word of the question must be consumed by a recognised slot or be
+    a known filler word; otherwise (and for anything ambiguous, such as two
+    skills or an unknown manager name) the question falls through to the
+    agent. Entity values are resolved against a vocabulary that is reloaded
+    whenever the database data version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocabulary: Optional[Vocabulary] = None
+        self._vocabulary_version: Optional[Hashable] = None
+        self._manager_names: Dict[str, int] = {}
+        self._manager_names_version: Optional[Hashable] = None
+        self._manager_names_loading = False
+        metrics.describe("router_matches_total", "Questions answered by the intent router")
+        metrics.describe("router_fallthrough_total", "Questions the intent router passed to the agent")
+
+    def vocabulary(self, engine, data_version: Hashable) -> Vocabulary:
+        """
+        Return the entity vocabulary for the current data version.
+
+        Departments, skills and levels are small and reloaded in place. Manager
+        names are refreshed on a background thread; until the first load
+        finishes, "reports to X" questions fall through to the agent, and
+        after that the previous names are used while a refresh runs.
+        """
+        with self._lock:
+            if self._manager_names_version != data_version and not self._manager_names_loading:
+                self._manager_names_loading = True
+                threading.Thread(target=self._load_manager_names, args=(engine, data_version),
+                                 name="router-vocabulary", daemon=True).start()
+            if self._vocabulary is None or self._vocabulary_version != data_version:
+                self._vocabulary = load_vocabulary(engine, self._manager_names)
+                self._vocabulary_version = data_version
+                logger.info(f"🧭 Loaded router vocabulary ({len(self._vocabulary.departments)} departments, "
+                            f"{len(self._vocabulary.skills)} skills)")
+            return self._vocabulary
+
+    def _load_manager_names(self, engine, data_version: Hashable):
+        """Load the manager names for data_version and swap them into the vocabulary."""
+        try:
+            names = load_manager_names(engine)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load router manager names: {e}")
+            names = None
+        with self._lock:
+            self._manager_names_loading = False
+            if names is None:
+                return
+            self._manager_names = names
+            self._manager_names_version = data_version
+            if self._vocabulary is not None:
+                self._vocabulary.employees = names
+        logger.info(f"🧭 Loaded {len(names)} router manager names")
+
+    def route(self, question: str, engine, data_version: Hashable,
+              today: Optional[date] = None) -> Optional[RoutedQuery]:
+        """
+        Try to answer a question with a SQL template.
+
+        Args:
+            question: Natural language question
+            engine: SQLAlchemy engine bound to the SQLite database
+            data_version: Current database data version
+            today: Reference date for relative hire-date ranges
+
+        Returns:
+            RoutedQuery, or None if the question should go to the agent
+        """
+        vocabulary = self.vocabulary(engine, data_version)
+        slots = self._match(question.lower(), vocabulary, today or date.today())
+        if slots is None:
+            metrics.increment("router_fallthrough_total")
+            return None
+        metrics.increment("router_matches_total")
+        routed = self._build(slots, vocabulary)
+        logger.info(f"🧭 Routed to template '{routed.intent}'")
+        return routed
+
+    def _match(self, q: str, vocabulary: Vocabulary, today: date) -> Optional[_Slots]:
+        slots = _Slots()
+        q = " " + re.sub(r"[?!;:\"`]", " ", q) + " "
+
+        def consume(pattern: str, handler) -> bool:
+            """Apply handler to every match and blank the matched text. False aborts routing."""
+            nonlocal q
+            for match in list(re.finditer(pattern, q)):
+                if handler(match) is False:
+                    return False
+                q = q[:match.start()] + " " * (match.end() - match.start()) + q[match.end():]
+            return True
+
+        def set_skill(entity):
+            if slots.skill is not None and slots.skill != entity:
+                return False  # "Python and SQL" is ambiguous (both? either?)
+            slots.skill = entity
+
+        def add_department(entity):
+            if entity not in slots.departments:
+                slots.departments.append(entity)
+
+        shared = set(vocabulary.skills) & set(vocabulary.departments)
+
+        # Skills: names shared with departments (e.g. "Sales") need an explicit "skill(s)" after them
+        for name, entity in sorted(vocabulary.skills.items(), key=lambda item: -len(item[0])):
+            pattern = _name_pattern(name) + (r"\s+skills?\b" if name in shared else "")
+            if not consume(pattern, lambda m, e=entity: set_skill(e)):
+                return None
+
+        # Departments, optionally introduced by in/from and followed by department/team
+        for name, entity in sorted(vocabulary.departments.items(), key=lambda item: -len(item[0])):
+            pattern = (r"\b(?:in|from|of)\s+(?:the\s+)?" + _name_pattern(name)
+                       + r"(?:\s+(?:department|dept|team))?"
+                       + "|" + _name_pattern(name) + r"\s+(?:department|dept|team)\b")
+            if name not in shared:
+                pattern += "|" + _name_pattern(name)
+            consume(pattern, lambda m, e=entity: add_department(e))
+
+        # Proficiency: "advanced or expert", "at least advanced"
+        def at_least(match):
+            start = PROFICIENCY_LEVELS.index(match.group(1).capitalize())
+            slots.proficiencies.extend(PROFICIENCY_LEVELS[start:])
+        consume(r"\bat\s+least\s+(beginner|intermediate|advanced|expert)\b", at_least)
+        consume(r"\b(beginner|intermediate|advanced|expert)s?\b",
+                lambda m: slots.proficiencies.append(m.group(1).capitalize()))
+        slots.proficiencies = list(dict.fromkeys(slots.proficiencies))
+
+        # Hire-date ranges
+        def hired_recent(match):
+            count = match.group(1)
+            amount = int(count) if count and count.isdigit() else NUMBER_WORDS.get(count, 1)
+            unit = match.group(2)
+            if unit == "year":
+                start = _months_ago(today, 12 * amount)
+            elif unit == "month":
+                start = _months_ago(today, amount)
+            else:
+                start = today - timedelta(days=amount * (7 if unit == "week" else 1))
+            slots.hired_from = start.isoformat()
+            slots.hired_label = f"in the last {unit}" if amount == 1 else f"in the last {amount} {unit}s"
+
+        def hired_between(match):
+            slots.hired_from = _parse_date(match.group(1))
+            slots.hired_to = _parse_date(match.group(2), end=True)
+            slots.hired_label = f"between {match.group(1)} and {match.group(2)}"
+
+        def hired_in(match):
+            slots.hired_from = _parse_date(match.group(1))
+            slots.hired_to = _parse_date(match.group(1), end=True)
+            slots.hired_label = f"in {match.group(1)}"
+
+        def hired_relative(match):
+            # "after 2020" starts once 2020 is over; "since 2020" includes it
+            if match.group(1) == "before":
+                slots.hired_to = _shift_date(_parse_date(match.group(2)), -1)
+            elif match.group(1) == "after":
+                slots.hired_from = _shift_date(_parse_date(match.group(2), end=True), 1)
+            else:
+                slots.hired_from = _parse_date(match.group(2))
+            slots.hired_label = f"{match.group(1)} {match.group(2)}"
+
+        date_value = r"(\d{4}(?:-\d{2}(?:-\d{2})?)?)"
+        units = r"(day|week|month|year)s?"
+        number = r"(?:(\d+|" + "|".join(NUMBER_WORDS) + r")\s+)?"
+        for pattern, handler in [
+            (r"\b(?:hired|joined|started)\s+(?:in|within|during|over)\s+(?:the\s+)?(?:last|past)\s+"
+             + number + units + r"\b", hired_recent),
+            (r"\b(?:hired|joined|started)\s+between\s+" + date_value + r"\s+and\s+" + date_value + r"\b",
+             hired_between),
+            (r"\b(?:hired|joined|started)\s+(?:in|during)\s+" + date_value + r"\b", hired_in),
+            (r"\b(?:hired|joined|started)\s+(after|since|before)\s+" + date_value + r"\b", hired_relative),
+        ]:
+            try:
+                consume(pattern, handler)
+            except ValueError:
+                return None  # not a real date, e.g. "2020-13"
+        if slots.hired_label:
+            slots.columns.add("hire_date")
+
+        # Salary bounds
+        amount = r"\$?(\d[\d,]*(?:\.\d+)?)\s*(k|m)?\b"
+        salary_word = r"(?:salary|salaries|earning|earns?|making|makes|paid|pay)\s+(?:is\s+|of\s+)?"
+
+        def salary_bound(match):
+            value = _parse_amount(match.group(2), match.group(3) or "")
+            slots.salary_inclusive = match.group(1) in ("at least", "at most", ">=", "<=")
+            if match.group(1) in ("above", "over", "more than", "greater than", "at least", ">", ">="):
+                slots.salary_min = value
+            else:
+                slots.salary_max = value
+
+        def salary_between(match):
+            slots.salary_min = _parse_amount(match.group(1), match.group(2) or "")
+            slots.salary_max = _parse_amount(match.group(3), match.group(4) or "")
+            slots.salary_inclusive = True
+
+        consume(r"\b" + salary_word + r"between\s+" + amount + r"\s+and\s+" + amount, salary_between)
+        consume(r"\b" + salary_word
+                + r"(above|over|more than|greater than|at least|below|under|less than|at most|>=|<=|>|<)\s*"
+                + amount, salary_bound)
+        if slots.salary_min is not None or slots.salary_max is not None:
+            slots.columns.add("salary")
+
+        # Manager: "reports to Jane Smith", "managed by Jane Smith"
+        def set_manager(match):
+            name = re.sub(r"\s+", " ", match.group(1).strip())
+            manager_id = vocabulary.employees.get(name)
+            if manager_id is None:
+                return False
+            slots.manager = (manager_id, name.title())
+            slots.columns.add("manager")
+
+        if not consume(r"\b(?:(?:who\s+)?reports?\s+(?:directly\s+)?to|reporting\s+to|managed\s+by|"
+                       r"direct\s+reports\s+of|works?\s+for)\s+([a-z][a-z'-]*\s+[a-z][a-z'-]*)", set_manager):
+            return None
+
+        # Hierarchy levels: "managers", "directors", "vps"
+        if vocabulary.has_hierarchy:
+            def set_level(match):
+                level = LEVEL_WORDS[match.group(1)]
+                if level.lower() not in vocabulary.levels or (slots.level and slots.level != level):
+                    return False
+                slots.level = level
+            if not consume(r"\b(" + "|".join(sorted(LEVEL_WORDS, key=len, reverse=True)) + r")\b", set_level):
+                return None
+
+        # Every remaining word must be filler
+        for word in _WORD.findall(q):
+            word = word.strip(".,'")
+            if not word:
+                continue
+            if word not in FILLER_WORDS:
+                return None
+            if word in COLUMN_WORDS:
+                slots.columns.add(COLUMN_WORDS[word])
+
+        has_filter = (slots.skill or slots.proficiencies or slots.departments or slots.hired_label
+                      or slots.salary_min is not None or slots.salary_max is not None
+                      or slots.manager or slots.level)
+        return slots if has_filter else None
+
+    def _build(self, slots: _Slots, vocabulary: Vocabulary) -> RoutedQuery:
+        select = ["e.first_name", "e.last_name"]
+        joins = []
+        where = []
+        params: Dict[str, Any] = {}
+        intents = []
+        title = ["Employees"]
+
+        if slots.level:
+            intents.append("level")
+            joins.append("JOIN employee_hierarchy lvl ON lvl.employee_id = e.id")
+            where.append("lvl.level = :level")
+            select.append("lvl.level AS level")
+            params["level"] = slots.level
+            title = [{"CEO": "CEO", "IC": "Individual contributors"}.get(slots.level, f"{slots.level}s")]
+
+        if slots.skill or slots.proficiencies:
+            intents.append("skill")
+            joins.append("JOIN employee_skills es ON es.employee_id = e.id")
+            joins.append("JOIN skills s ON s.id = es.skill_id")
+            select += ["s.name AS skill", "es.proficiency_level AS proficiency"]
+            if slots.skill:
+                where.append("es.skill_id = :skill_id")
+                params["skill_id"] = slots.skill[0]
+            if slots.proficiencies:
+                names = []
+                for i, level in enumerate(slots.proficiencies):
+                    params[f"proficiency{i}"] = level
+                    names.append(f":proficiency{i}")
+                where.append(f"es.proficiency_level IN ({', '.join(names)})")
+            label = slots.skill[1] if slots.skill else "any"
+            levels = f" ({', '.join(slots.proficiencies)})" if slots.proficiencies else ""
+            title.append(f"with {label} skills{levels}")
+
+        if slots.hired_label:
+            intents.append("hire_date")
+        if "hire_date" in slots.columns:
+            select.append("e.hire_date")
+        if slots.hired_from:
+            where.append("e.hire_date >= :hired_from")
+            params["hired_from"] = slots.hired_from
+        if slots.hired_to:
+            where.append("e.hire_date <= :hired_to")
+            params["hired_to"] = slots.hired_to
+        if slots.hired_label:
+            title.append(f"hired {slots.hired_label}")
+
+        if slots.departments or "department" in slots.columns:
+            joins.append("LEFT JOIN departments d ON d.id = e.department_id")
+            select.append("d.name AS department_name")
+        if slots.departments:
+            intents.append("department")
+            names = []
+            for i, (department_id, _) in enumerate(slots.departments):
+                params[f"department{i}"] = department_id
+                names.append(f":department{i}")
+            where.append(f"e.department_id IN ({', '.join(names)})")
+            title.append("in " + " or ".join(name for _, name in slots.departments))
+
+        if "salary" in slots.columns:
+            select.append("e.salary")
+        equal = "=" if slots.salary_inclusive else ""
+        if slots.salary_min is not None:
+            where.append(f"e.salary >{equal} :salary_min")
+            params["salary_min"] = slots.salary_min
+        if slots.salary_max is not None:
+            where.append(f"e.salary <{equal} :salary_max")
+            params["salary_max"] = slots.salary_max
+        if slots.salary_min is not None or slots.salary_max is not None:
+            intents.append("salary")
+            bounds = []
+            if slots.salary_min is not None:
+                bounds.append(f"{'at least' if slots.salary_inclusive else 'above'} {slots.salary_min:,.0f}")
+            if slots.salary_max is not None:
+                bounds.append(f"{'at most' if slots.salary_inclusive else 'below'} {slots.salary_max:,.0f}")
+            title.append("with salary " + " and ".join(bounds))
+
+        if slots.manager:
+            intents.append("manager")
+            manager_link = "mh.manager_id" if vocabulary.has_hierarchy else "e.manager_id"
+            if vocabulary.has_hierarchy:
+                joins.append("JOIN employee_hierarchy mh ON mh.employee_id = e.id")
+            joins.append(f"JOIN employees m ON m.id = {manager_link}")
+            select.append("m.first_name || ' ' || m.last_name AS manager")
+            where.append(f"{manager_link} = :manager_id")
+            params["manager_id"] = slots.manager[0]
+            title.append(f"reporting to {slots.manager[1]}")
+
+        sql = (
+            f"SELECT {', '.join(select)}\n"
+            f"FROM employees e\n"
+            + "".join(f"{join}\n" for join in joins)
+            + (f"WHERE {' AND '.join(where)}\n" if where else "")
+            + "ORDER BY e.last_name, e.first_name"
+        )
+        return RoutedQuery(intent="+".join(intents), title=" ".join(title), sql=sql, params=params)
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,207 @@
+"""Asynchronous query jobs executed by a bounded worker pool."""
+
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from cancellation import CancelToken
+from sql_agent import AGENT_ENGINE, query_database
+
+logger = logging.getLogger(__name__)
+
+# Worker pool sizing and limits
+JOB_WORKERS = 4
+JOB_MAX_QUEUED = 32
+JOB_TIMEOUT_SECONDS = 120
+JOB_RETENTION_SECONDS = 900
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED, TIMED_OUT}
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached its depth limit."""
+
+
+@dataclass
+class Job:
+    """A natural language query submitted for background execution."""
+    id: str
+    query: str
+    token: CancelToken
+    structured: bool = False
+    engine: str = AGENT_ENGINE
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public JSON representation of the job."""
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "query": self.query,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result["result"]
+            data["cached"] = self.result.get("cached", False)
+            data["route"] = self.result.get("route")
+            data["data"] = self.result.get("data")
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Runs query_database on a fixed-size thread pool.
+
+    At most `max_queued` jobs may wait for a worker; further submissions
+    are rejected with QueueFullError. Each job gets a CancelToken with a
+    timeout that starts when a worker picks the job up, and cancel()
+    fires the token so the agent stops when its LLM call in flight returns
+    or before its next tool call, and running SQL is interrupted. A worker
+    is released only once the job's work has stopped, so cancelled jobs
+    never run beyond the pool size.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED,
+                 job_timeout: float = JOB_TIMEOUT_SECONDS, retention: float = JOB_RETENTION_SECONDS):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_timeout = job_timeout
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, query: str, api_key: str, structured: bool = False, engine: str = AGENT_ENGINE) -> Job:
+        """
+        Enqueue a query.
+
+        Args:
+            query: Natural language query
+            api_key: Google API key for Gemini
+            structured: Return the rows as {columns, rows, sql} JSON in the job's "data"
+            engine: "agent" or "single_shot", as for query_database
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFullError: If too many jobs are already waiting
+        """
+        with self._lock:
+            self._evict_finished()
+            if self._queued() >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} waiting)")
+            job = Job(id=uuid.uuid4().hex, query=query, token=CancelToken(), structured=structured,
+                      engine=engine)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, api_key)
+        logger.info(f"📥 Job {job.id} queued")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job.
+
+        Args:
+            job_id: Id returned by submit()
+
+        Returns:
+            The job, or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == QUEUED:
+                # The worker will skip it when it is picked up
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        job.token.cancel()
+        logger.info(f"🛑 Job {job_id} cancellation requested")
+        return job
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._lock:
+            return self._queued()
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status plus pool limits."""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        counts["workers"] = self.max_workers
+        counts["max_queued"] = self.max_queued
+        return counts
+
+    def _run(self, job: Job, api_key: str):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        # The timeout covers execution only, not time spent waiting in the queue
+        job.token.deadline = time.monotonic() + self.job_timeout
+
+        logger.info(f"⚙️ Job {job.id} started")
+        try:
+            result = query_database(job.query, api_key, cancel_token=job.token, structured=job.structured,
+                                    engine=job.engine, detach=False)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        with self._lock:
+            job.finished_at = time.time()
+            if result["success"]:
+                # Kept even if the deadline passed or a DELETE arrived as it finished
+                job.status = SUCCEEDED
+                job.result = result
+            elif result.get("cancelled") or job.token.cancelled:
+                reason = result.get("cancelled") or job.token.reason
+                job.status = TIMED_OUT if reason == "timed out" else CANCELLED
+                job.error = f"Query {reason}"
+            else:
+                job.status = FAILED
+                job.error = result["error"]
+        logger.info(f"🏁 Job {job.id} finished with status {job.status}")
+
+    def _queued(self) -> int:
+        """Number of queued jobs; the caller holds the lock."""
+        return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def _evict_finished(self):
+        """Forget finished jobs older than the retention period; the caller holds the lock."""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
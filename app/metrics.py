@@ -0,0 +1,145 @@
+"""In-process metrics exported in Prometheus text format."""
+
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+# Default histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], "_Histogram"] = {}
+_buckets: Dict[str, Tuple[float, ...]] = {}
+_help: Dict[str, str] = {}
+
+
+class _Histogram:
+    """Per-bucket counts plus sum and count of observed values."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def describe(name: str, help_text: str, buckets: Sequence[float] = None):
+    """
+    Register the HELP text shown for a metric.
+
+    Args:
+        name: Metric name
+        help_text: Description shown in the exposition output
+        buckets: Upper bounds for a histogram (LATENCY_BUCKETS if not given)
+    """
+    _help[name] = help_text
+    if buckets is not None:
+        _buckets[name] = tuple(sorted(buckets))
+
+
+def increment(name: str, value: float = 1, **labels):
+    """
+    Increase a counter.
+
+    Args:
+        name: Metric name, e.g. answer_cache_hits_total
+        value: Amount to add
+        **labels: Optional label values
+    """
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] += value
+
+
+def get_counter(name: str, **labels) -> float:
+    """Return the current value of a counter."""
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        return _counters.get(key, 0.0)
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Record a value in a histogram.
+
+    Args:
+        name: Metric name, e.g. llm_call_duration_seconds
+        value: Observed value (seconds for latencies)
+        **labels: Optional label values
+    """
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(_buckets.get(name, LATENCY_BUCKETS))
+        histogram.observe(value)
+
+
+def get_histogram(name: str, **labels) -> Tuple[int, float]:
+    """Return (count, sum) of a histogram."""
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        return (histogram.count, histogram.sum) if histogram else (0, 0.0)
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value as the text exposition format requires."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape_label_value(str(v))}"' for k, v in labels)
+    return "{" + pairs + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+def render_prometheus() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        Metrics text suitable for a /metrics scrape
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in _histograms.items()
+        )
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            bucket_labels = labels + (("le", _format_bound(bound)),)
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
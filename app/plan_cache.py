@@ -0,0 +1,62 @@
+"""Cache of the SQL the agent ran for each question, so repeats skip the LLM."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from answer_cache import AnswerCache
+
+logger = logging.getLogger(__name__)
+
+QUERY_TOOL_NAME = "sql_db_query"
+
+
+@dataclass
+class CachedPlan:
+    """SQL captured from a successful agent run."""
+    sql: str
+    columns: Optional[List[str]] = None
+    title: Optional[str] = None
+
+
+class SQLCaptureHandler(BaseCallbackHandler):
+    """
+    Callback handler that records the SQL passed to the sql_db_query tool.
+
+    Only executions whose output is not an error are kept, so after the
+    run `last_sql` holds the last statement that actually succeeded.
+    """
+
+    def __init__(self):
+        self._pending: Dict[UUID, str] = {}
+        self.executed: List[str] = []
+
+    @property
+    def last_sql(self) -> Optional[str]:
+        """Last successfully executed SQL statement, if any."""
+        return self.executed[-1] if self.executed else None
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        if serialized.get("name") == QUERY_TOOL_NAME:
+            self._pending[run_id] = input_str
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        sql = self._pending.pop(run_id, None)
+        if sql is not None and not str(output).startswith("Error:"):
+            self.executed.append(sql.strip())
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._pending.pop(run_id, None)
+
+
+# Plans are keyed by normalized question and tagged with the schema version,
+# so they survive data changes but not schema changes
+plan_cache = AnswerCache(
+    max_entries=1024,
+    ttl_seconds=24 * 3600,
+    metric_prefix="plan_cache",
+    description="the generated-SQL plan cache",
+)
@@ -0,0 +1,231 @@
+"""Server-side result sets paged with a row-number key instead of shipping every row."""
+
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+from sqlalchemy import text
+
+from sql_guard import MAX_RESULT_ROWS, limit_rows, sql_guard
+from sql_runner import project_columns
+from tracing import record_sql_rows, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+RESULT_TTL_SECONDS = 900
+MAX_RESULT_SETS = 512
+
+# Rows copied into the store per fetch while a result set is materialized
+MATERIALIZE_CHUNK_SIZE = 1000
+
+
+class ResultSetExpired(Exception):
+    """Raised when a result set's data changed since it was created, or it was evicted."""
+
+
+@dataclass
+class ResultSet:
+    """A query whose rows are fetched page by page on demand."""
+    id: str
+    sql: str
+    columns: Optional[List[str]]
+    data_version: Hashable
+    params: Optional[Dict[str, Any]] = None
+    last_access: float = field(default_factory=time.monotonic)
+    # Set once the rows have been copied into the store
+    source_columns: Optional[List[str]] = None
+    row_count: int = 0
+    truncated: bool = False
+    dropped: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def table(self) -> str:
+        """Name of the store table holding the rows, keyed by row number."""
+        return f"result_{self.id}"
+
+
+def _paged_sql(table: str) -> str:
+    """Keyset page over a materialized result: rows after a row number, in row-number order."""
+    return f"SELECT rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?"
+
+
+class ResultStore:
+    """
+    Holds result-set definitions (not rows) under an id.
+
+    The first page request runs the SQL once, under the SQL cost guard, and
+    copies up to MAX_RESULT_ROWS rows into a table keyed by row number in a
+    private temporary SQLite file, so memory use does not depend on result
+    size. Every page is then `WHERE rowid > after ORDER BY rowid LIMIT n`
+    on that table: its cost does not grow with the page number and the row
+    order cannot change between pages. Result sets expire after a period
+    without access, the least recently used are evicted beyond
+    `max_entries` (dropping their rows), and a page request after the data
+    changed raises ResultSetExpired.
+    """
+
+    def __init__(self, ttl_seconds: float = RESULT_TTL_SECONDS, max_entries: int = MAX_RESULT_SETS,
+                 max_rows: int = MAX_RESULT_ROWS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, ResultSet]" = OrderedDict()
+        # An empty file name opens a temporary on-disk database, deleted on close
+        self._storage = sqlite3.connect("", check_same_thread=False, isolation_level=None)
+        self._storage_lock = threading.Lock()
+
+    def create(self, sql: str, columns: Optional[List[str]], data_version: Hashable,
+               params: Optional[Dict[str, Any]] = None) -> ResultSet:
+        """
+        Register a result set, reusing the existing one for identical input.
+
+        Args:
+            sql: Underlying SELECT statement
+            columns: Display columns to project onto, or None for all
+            data_version: Database data version the result belongs to
+            params: Values for the statement's named parameters
+
+        Returns:
+            The registered ResultSet
+        """
+        key = (sql, columns, data_version, sorted((params or {}).items()))
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        with self._lock:
+            self._evict_expired()
+            result_set = self._results.get(digest)
+            if result_set is None:
+                result_set = ResultSet(id=digest, sql=sql, columns=columns, data_version=data_version,
+                                       params=params)
+                self._results[digest] = result_set
+                while len(self._results) > self.max_entries:
+                    self._drop(self._results.popitem(last=False)[1])
+            result_set.last_access = time.monotonic()
+            self._results.move_to_end(digest)
+            return result_set
+
+    def get(self, result_id: str) -> Optional[ResultSet]:
+        """Return a live result set by id, or None if unknown or expired."""
+        with self._lock:
+            self._evict_expired()
+            result_set = self._results.get(result_id)
+            if result_set is not None:
+                result_set.last_access = time.monotonic()
+                self._results.move_to_end(result_id)
+            return result_set
+
+    def fetch_page(self, engine, result_set: ResultSet, after: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                   data_version: Optional[Hashable] = None) -> Dict[str, Any]:
+        """
+        Fetch the rows following a key.
+
+        Args:
+            engine: SQLAlchemy engine bound to the SQLite database
+            result_set: Result set to page through
+            after: Key of the last row already seen (0 for the first page)
+            limit: Maximum number of rows to return
+            data_version: Current data version, checked against the result set's
+
+        Returns:
+            Dictionary with result_id, columns, rows, next_after, has_more,
+            row_count (rows stored for the whole result) and truncated (True if
+            rows past MAX_RESULT_ROWS were dropped), the last two on every page
+
+        Raises:
+            ResultSetExpired: If the data changed since the result set was created
+            SQLGuardError: If the query timed out while being materialized
+        """
+        if data_version is not None and data_version != result_set.data_version:
+            raise ResultSetExpired("The data changed since this result was produced")
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        self._materialize(engine, result_set)
+        with span("sql", metric="sql_execution_duration_seconds", operation="page") as sql_span, \
+                self._storage_lock:
+            if result_set.dropped:
+                raise ResultSetExpired("This result is no longer available")
+            # Fetch one extra row to learn whether another page exists
+            fetched = self._storage.execute(_paged_sql(result_set.table), (after, limit + 1)).fetchall()
+            record_sql_rows(sql_span, len(fetched))
+
+        has_more = len(fetched) > limit
+        fetched = fetched[:limit]
+        next_after = fetched[-1][0] if fetched else after
+        columns, rows = project_columns(result_set.source_columns, [tuple(row[1:]) for row in fetched],
+                                        result_set.columns)
+        return {
+            "result_id": result_set.id,
+            "columns": columns,
+            "rows": [list(row) for row in rows],
+            "next_after": next_after,
+            "has_more": has_more,
+            "row_count": result_set.row_count,
+            "truncated": result_set.truncated
+        }
+
+    def _materialize(self, engine, result_set: ResultSet):
+        """Run the result set's SQL once and copy its rows into the store, numbered from 1."""
+        with result_set.lock:
+            if result_set.source_columns is not None:
+                return
+            with span("sql", metric="sql_execution_duration_seconds", operation="materialize") as sql_span, \
+                    engine.connect() as connection, sql_guard.deadline(connection):
+                result = connection.execute(text(limit_rows(result_set.sql, self.max_rows)),
+                                            result_set.params or {})
+                columns = list(result.keys())
+                self._store_rows(result_set, f"CREATE TABLE {result_set.table} "
+                                             f"({', '.join(f'c{i}' for i in range(len(columns)))})")
+                insert = f"INSERT INTO {result_set.table} VALUES ({', '.join('?' * len(columns))})"
+                count = 0
+                while count <= self.max_rows:
+                    chunk = result.fetchmany(MATERIALIZE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    kept = [tuple(row) for row in chunk[:self.max_rows - count]]
+                    count += len(chunk)
+                    if kept:
+                        self._store_rows(result_set, insert, kept)
+                result.close()
+                record_sql_rows(sql_span, count)
+
+            result_set.truncated = count > self.max_rows
+            result_set.row_count = min(count, self.max_rows)
+            result_set.source_columns = columns
+            logger.info(f"📦 Materialized result {result_set.id} ({result_set.row_count} rows"
+                        f"{', truncated' if result_set.truncated else ''})")
+
+    def _store_rows(self, result_set: ResultSet, sql: str, rows: Optional[List[tuple]] = None):
+        """
+        Create a result set's table (rows None; any old copy is dropped first)
+        or insert rows into it, unless the result set was evicted meanwhile.
+        """
+        with self._storage_lock:
+            if result_set.dropped:
+                raise ResultSetExpired("This result is no longer available")
+            if rows is None:
+                self._storage.execute(f"DROP TABLE IF EXISTS {result_set.table}")
+                self._storage.execute(sql)
+            else:
+                self._storage.executemany(sql, rows)
+
+    def _drop(self, result_set: ResultSet):
+        """Delete a result set's rows from the store."""
+        with self._storage_lock:
+            result_set.dropped = True
+            self._storage.execute(f"DROP TABLE IF EXISTS {result_set.table}")
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for result_id in [rid for rid, rs in self._results.items() if rs.last_access < cutoff]:
+            self._drop(self._results.pop(result_id))
+
+
+result_store = ResultStore()
@@ -0,0 +1,225 @@
+"""Versioned in-memory snapshot of table DDL and sample rows for the SQL toolkit."""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from database import DB_PATH, get_schema_version
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file sits next to employee_database.db
+SNAPSHOT_PATH = os.path.splitext(DB_PATH)[0] + ".schema.json"
+
+# Same number of sample rows LangChain's SQLDatabase uses by default
+SAMPLE_ROWS = 3
+
+# Usage hints appended to the table info of derived tables, shown to the agent
+# only when the table exists
+TABLE_NOTES = {
+    "employee_hierarchy_closure": (
+        "One row per (ancestor, descendant) pair in the org chart, including depth 0 "
+        "for the employee itself. Use it instead of recursive CTEs: everyone under X is "
+        "WHERE ancestor_id = X AND depth > 0, X's management chain is WHERE descendant_id = X "
+        "AND depth > 0, and MAX(depth) gives org depth."
+    ),
+    "summary_salary_by_level": (
+        "Precomputed salary statistics per employee_hierarchy.level, kept current by triggers. "
+        "Use it for headcount and average/min/max/total salary by level instead of aggregating employees."
+    ),
+    "summary_salary_by_department": (
+        "Precomputed headcount and salary statistics per department, kept current by triggers. "
+        "Use it for headcount, average salary or total spend by department instead of aggregating employees."
+    ),
+    "summary_skill_proficiency": (
+        "Precomputed number of employees per (skill, proficiency_level), kept current by triggers. "
+        "Use it for skill counts and proficiency distributions instead of aggregating employee_skills."
+    ),
+}
+
+
+@dataclass
+class SchemaSnapshot:
+    """
+    Precomputed schema description, valid for a single PRAGMA schema_version
+    of one database.
+
+    db_path and schema_hash identify the database, since schema_version
+    alone matches any database that went through the same number of
+    schema changes.
+    """
+    schema_version: int
+    table_info: Dict[str, str]
+    columns: Dict[str, List[str]]
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    db_path: str = ""
+    schema_hash: str = ""
+
+    @property
+    def table_names(self) -> List[str]:
+        """Names of the tables in the snapshot, sorted."""
+        return sorted(self.table_info)
+
+
+def _format_sample_rows(table: str, columns: List[str], rows) -> str:
+    """Format sample rows the same way LangChain's SQLDatabase does."""
+    columns_str = "\t".join(columns)
+    rows_str = "\n".join("\t".join(str(value)[:100] for value in row) for row in rows)
+    return f"{SAMPLE_ROWS} rows from {table} table:\n{columns_str}\n{rows_str}"
+
+
+def schema_hash(connection) -> str:
+    """
+    Hash the definitions of every table, index, view and trigger.
+
+    Args:
+        connection: SQLAlchemy connection to the SQLite database
+
+    Returns:
+        Hex SHA-256 digest of sqlite_master
+    """
+    digest = hashlib.sha256()
+    for row in connection.execute(text(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name")):
+        digest.update(json.dumps(list(row)).encode())
+    return digest.hexdigest()
+
+
+def build_snapshot(engine, db_path: Optional[str] = None) -> SchemaSnapshot:
+    """
+    Compute DDL and sample rows for every user table in the database.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        db_path: Path to the database file, recorded in the snapshot
+
+    Returns:
+        Freshly computed SchemaSnapshot
+    """
+    table_info = {}
+    columns = {}
+    with engine.connect() as connection:
+        schema_version = connection.execute(text("PRAGMA schema_version")).scalar()
+        fingerprint = schema_hash(connection)
+        tables = connection.execute(text(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )).fetchall()
+
+        for name, ddl in tables:
+            table_columns = [row[1] for row in connection.execute(text(f'PRAGMA table_info("{name}")'))]
+            rows = connection.execute(text(f'SELECT * FROM "{name}" LIMIT {SAMPLE_ROWS}')).fetchall()
+            columns[name] = table_columns
+            table_info[name] = (
+                f"{ddl.rstrip()}\n\n/*\n"
+                f"{_format_sample_rows(name, table_columns, rows)}\n*/"
+            )
+            if name in TABLE_NOTES:
+                table_info[name] += f"\n/* {TABLE_NOTES[name]} */"
+
+    logger.info(f"📸 Built schema snapshot for {len(table_info)} tables (schema_version={schema_version})")
+    return SchemaSnapshot(schema_version=schema_version, table_info=table_info, columns=columns,
+                          db_path=os.path.abspath(db_path) if db_path else "", schema_hash=fingerprint)
+
+
+class SchemaCache:
+    """
+    Holds the current SchemaSnapshot in memory and optionally on disk.
+
+    The snapshot is reused until SQLite's PRAGMA schema_version changes, so
+    reflection and sample-row queries run once per schema instead of once
+    per agent run. A persisted snapshot is only loaded if it was built from
+    the same database file and its hash of sqlite_master still matches.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = SNAPSHOT_PATH, persist: bool = True):
+        self._snapshot_path = snapshot_path
+        self._persist = persist and snapshot_path is not None
+        self._lock = threading.Lock()
+        self._snapshot: Optional[SchemaSnapshot] = None
+
+    def get(self, engine, schema_version: Optional[int] = None, db_path: str = DB_PATH) -> SchemaSnapshot:
+        """
+        Return a snapshot matching the database's current schema version.
+
+        Args:
+            engine: SQLAlchemy engine bound to the SQLite database
+            schema_version: Current schema version, if the caller already read it
+            db_path: Path to the database file the engine is bound to
+
+        Returns:
+            SchemaSnapshot for the current schema
+        """
+        if schema_version is None:
+            schema_version = get_schema_version(engine)
+        db_path = os.path.abspath(db_path)
+
+        snapshot = self._snapshot
+        if self._matches(snapshot, schema_version, db_path):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if self._matches(snapshot, schema_version, db_path):
+                return snapshot
+
+            snapshot = self._load(engine, schema_version, db_path)
+            if snapshot is None:
+                snapshot = build_snapshot(engine, db_path)
+                self._save(snapshot)
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        """Forget the in-memory snapshot so it is reloaded on next use."""
+        with self._lock:
+            self._snapshot = None
+
+    @staticmethod
+    def _matches(snapshot: Optional[SchemaSnapshot], schema_version: int, db_path: str) -> bool:
+        return (snapshot is not None and snapshot.schema_version == schema_version
+                and snapshot.db_path == db_path)
+
+    def _load(self, engine, schema_version: int, db_path: str) -> Optional[SchemaSnapshot]:
+        """Load a persisted snapshot if it matches the database and its schema."""
+        if not self._persist or not os.path.exists(self._snapshot_path):
+            return None
+        try:
+            with open(self._snapshot_path, 'r') as f:
+                data = json.load(f)
+            snapshot = SchemaSnapshot(**data)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable schema snapshot: {e}")
+            return None
+        if not self._matches(snapshot, schema_version, db_path):
+            logger.info("♻️ Persisted schema snapshot is stale, rebuilding")
+            return None
+        with engine.connect() as connection:
+            fingerprint = schema_hash(connection)
+        if snapshot.schema_hash != fingerprint:
+            logger.info("♻️ Persisted schema snapshot was built from a different schema, rebuilding")
+            return None
+        logger.info(f"📸 Loaded schema snapshot from {self._snapshot_path}")
+        return snapshot
+
+    def _save(self, snapshot: SchemaSnapshot):
+        """Persist the snapshot next to the database, ignoring write failures."""
+        if not self._persist:
+            return
+        tmp_path = f"{self._snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(asdict(snapshot), f)
+            os.replace(tmp_path, self._snapshot_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not persist schema snapshot: {e}")
+
+
+schema_cache = SchemaCache()
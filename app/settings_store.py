@@ -0,0 +1,119 @@
+"""In-memory settings store backed by an atomically written JSON file."""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {"api_key": ""}
+
+# How often, at most, the settings file is stat()ed for external edits
+CHECK_INTERVAL_SECONDS = 2.0
+
+
+class SettingsStore:
+    """
+    Keeps settings in memory and reloads them only when the file changes.
+
+    Reads never touch the filesystem more than once per check interval,
+    and then only to stat() the file; it is re-parsed only when its mtime
+    or size differs. Writes go to a temporary file that atomically
+    replaces the original. Listeners are called with (old, new) settings
+    whenever the API key changes, whether through update() or an
+    external edit.
+    """
+
+    def __init__(self, path: str, check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._settings: Dict = dict(DEFAULT_SETTINGS)
+        self._signature: Optional[tuple] = None
+        self._next_check = 0.0
+        self._listeners: List[Callable[[Dict, Dict], None]] = []
+        self._reload()
+
+    def subscribe(self, listener: Callable[[Dict, Dict], None]):
+        """Register a callback invoked with (old, new) when the API key changes."""
+        self._listeners.append(listener)
+
+    def get(self) -> Dict:
+        """
+        Return a copy of the current settings.
+
+        Returns:
+            Settings dictionary
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    if self._file_signature() != self._signature:
+                        self._reload_locked()
+        return dict(self._settings)
+
+    def update(self, settings: Dict):
+        """
+        Replace the settings and write them to disk atomically.
+
+        Args:
+            settings: New settings dictionary
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".json")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(settings, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._apply(dict(settings))
+            self._signature = self._file_signature()
+
+    def _file_signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _reload(self):
+        with self._lock:
+            self._reload_locked()
+
+    def _reload_locked(self):
+        signature = self._file_signature()
+        if signature is None:
+            settings = dict(DEFAULT_SETTINGS)
+        else:
+            try:
+                with open(self.path, 'r') as f:
+                    settings = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep serving the last good settings if the file is mid-edit or corrupt
+                logger.warning(f"⚠️ Could not read {self.path}: {e}")
+                return
+            logger.info("⚙️ Settings loaded from disk")
+        self._signature = signature
+        self._apply(settings)
+
+    def _apply(self, settings: Dict):
+        old = self._settings
+        self._settings = settings
+        if old.get("api_key") != settings.get("api_key"):
+            for listener in self._listeners:
+                try:
+                    listener(old, settings)
+                except Exception as e:
+                    logger.error(f"❌ Settings listener failed: {e}", exc_info=True)
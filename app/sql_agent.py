@@ -1,13 +1,24 @@
 """LangChain SQL Agent for querying employee database."""
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import create_sql_agent
-from sqlalchemy import create_engine, text
 import os
 import json
 import logging
+import time
 from datetime import datetime
+from typing import Any, List, Optional
+
+import metrics
+from agent_registry import registry
+from answer_cache import answer_cache, normalize_question
+from cancellation import CancelToken, CancellationCallbackHandler, QueryCancelled, cancel_scope, run_cancellable
+from database import data_versions, get_schema_version
+from index_advisor import sql_log
+from intent_router import intent_router
+from plan_cache import CachedPlan, SQLCaptureHandler, plan_cache
+from result_store import result_store
+from sql_runner import execute_sql, markdown_table_headers, project_columns, rows_to_markdown, validate_sql
+from text_to_sql import generate_sql
+from tracing import TracingCallbackHandler, span, trace_request
 
 # Configure logging
 logging.basicConfig(
@@ -16,10 +27,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Custom prompt to ensure markdown table output with smart field selection
-CUSTOM_AGENT_PROMPT = """You are an SQL expert assistant. When answering questions about data, you MUST format your response as a markdown table.
+# Engines that can answer a query once the caches and the router miss
+AGENT_ENGINE = "agent"
+SINGLE_SHOT_ENGINE = "single_shot"
+ENGINES = (AGENT_ENGINE, SINGLE_SHOT_ENGINE)
 
-FIELD SELECTION RULES - SMART CONTEXT-AWARE FIELDS:
+# Field selection rules shared by the markdown and structured prompts
+FIELD_SELECTION_RULES = """FIELD SELECTION RULES - SMART CONTEXT-AWARE FIELDS:
 1. ALWAYS include: first_name, last_name (employee identity is essential)
 2. IF query mentions SKILLS or PROFICIENCY: Include skill name and proficiency level
 3. IF query mentions HIRE DATE, DATE RANGE, or TIMING: Include hire_date column
@@ -27,7 +41,12 @@ FIELD SELECTION RULES - SMART CONTEXT-AWARE FIELDS:
 5. IF query mentions SALARY, PAY, or COMPENSATION: Include salary column
 6. IF query mentions PROJECTS or WORK: Include project names/details
 7. IF query mentions MANAGER or REPORTS: Include manager information
-8. IF query mentions EXPERIENCE, LEVEL, or SENIORITY: Include any relevant proficiency/level data
+8. IF query mentions EXPERIENCE, LEVEL, or SENIORITY: Include any relevant proficiency/level data"""
+
+# Custom prompt to ensure markdown table output with smart field selection
+CUSTOM_AGENT_PROMPT = f"""You are an SQL expert assistant. When answering questions about data, you MUST format your response as a markdown table.
+
+{FIELD_SELECTION_RULES}
 
 GENERAL RULES:
 - Always format query results as a markdown table with pipe delimiters (|)
@@ -44,12 +63,30 @@ EXAMPLE SMART RESPONSES:
 - Query: "engineers hired in last 2 years" → Return: first_name | last_name | hire_date | department_name
 - Query: "senior managers and their salary" → Return: first_name | last_name | department_name | salary
 
-Always use SELECT * to get all available data, then extract only the relevant columns for the table."""
+Select only the columns the table needs and join every table on its key columns; never list tables without a join condition.
+If sql_db_query returns a query_rejected error, rewrite the query as its hint says instead of retrying it unchanged."""
+
+# Prompt for structured mode: the server returns the rows of the last query,
+# so the LLM only chooses the columns and writes a title
+STRUCTURED_AGENT_PROMPT = f"""You are an SQL expert assistant. The server will show the user the rows returned by the LAST SQL query you execute with sql_db_query, so that query must return exactly the table the user should see.
+
+{FIELD_SELECTION_RULES}
+
+GENERAL RULES:
+- Select only the columns the user should see, with readable aliases (e.g. d.name AS department_name)
+- Do NOT add a LIMIT unless the user asks for a specific number of results
+- Join every table on its key columns; never list tables without a join condition
+- If sql_db_query returns a query_rejected error, rewrite the query as its hint says
+- Do NOT repeat the rows or format a table in your answer
+- Your Final Answer must be a short one-line title describing the result, nothing else"""
 
 
 def get_sql_agent(api_key: str):
     """
-    Create and return a SQL agent configured with Gemini API.
+    Return a SQL agent configured with Gemini API.
+    
+    The agent is built once per process by the agent registry and reused
+    until the API key or database schema changes.
     
     Args:
         api_key: Google API key for Gemini
@@ -57,79 +94,266 @@ def get_sql_agent(api_key: str):
     Returns:
         SQL agent ready to query the database
     """
-    # Set the API key
-    os.environ["GOOGLE_API_KEY"] = api_key
-    
-    # Create SQLAlchemy engine for the SQLite database
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "employee_database.db")
-    engine = create_engine(f"sqlite:///{db_path}")
-    
-    # Create SQLDatabase instance
-    db = SQLDatabase(engine)
-    
-    # Create LLM instance
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0)
+    return registry.get(api_key, model="gemini-2.5-flash-lite").agent
+
+
+def _run_cached_plan(plan: CachedPlan):
+    """
+    Re-execute a cached plan directly against SQLite.
     
-    # Create SQL agent
-    agent = create_sql_agent(
-        llm=llm,
-        db=db,
-        verbose=False,
-        handle_parsing_errors=True,
-        max_iterations=10
-    )
+    Args:
+        plan: SQL and display columns captured from an earlier agent run
+        
+    Returns:
+        Tuple of (column names, rows) with the current data
+    """
+    validate_sql(registry.engine, plan.sql)
+    columns, rows = execute_sql(registry.engine, plan.sql)
+    return project_columns(columns, rows, plan.columns)
+
+
+def _structured_data(sql: str, columns: Optional[List[str]], title: Optional[str], data_version,
+                     params: Optional[dict] = None) -> dict:
+    """
+    Build the structured JSON result returned instead of a markdown table.
     
-    return agent
+    Only the first page of rows is included; the rest stay on the server
+    and are fetched through /api/results/<result_id>.
+    """
+    with span("result_store"):
+        result_set = result_store.create(sql, columns, data_version, params=params)
+        page = result_store.fetch_page(registry.engine, result_set)
+    return {
+        "title": title,
+        "columns": page["columns"],
+        "rows": page["rows"],
+        "sql": sql,
+        "result_id": page["result_id"],
+        "next_after": page["next_after"],
+        "has_more": page["has_more"],
+        "row_count": page["row_count"],
+        "truncated": page["truncated"]
+    }
 
 
-def query_database(query: str, api_key: str) -> dict:
+def query_database(query: str, api_key: str, callbacks: Optional[List[Any]] = None,
+                   cancel_token: Optional[CancelToken] = None, structured: bool = False,
+                   engine: str = AGENT_ENGINE, timings: bool = False, detach: bool = True) -> dict:
     """
     Execute a natural language query against the employee database.
     
+    Every query is traced: stage, LLM, tool and SQL latencies plus token
+    counts are exported as histograms and counters at /api/metrics.
+    
+    With a cancel token the query stops once the token fires (cancelled,
+    superseded or past its deadline): LLM requests are bounded by the
+    token's deadline, the agent stops when the call in flight returns or
+    before its next tool call, and running SQL is interrupted through the
+    SQL cost guard. By default the query runs on a helper thread and this
+    call returns as soon as the token fires, leaving the work to wind down.
+    
     Args:
         query: Natural language query
         api_key: Google API key for Gemini
+        callbacks: Extra LangChain callback handlers for the agent run
+        cancel_token: Optional token that stops the query once fired
+        structured: Return the rows of the final SQL as {columns, rows, sql} JSON
+            and ask the LLM only for a title, instead of a markdown table
+        engine: "agent" for the ReAct SQL agent, or "single_shot" for one LLM call
+            that writes the SQL from a compact schema
+        timings: Include the per-request timing breakdown under "timings"
+        detach: With a cancel token, return as soon as it fires instead of
+            once the work has stopped; pass False to hold e.g. a pool slot
         
     Returns:
         Dictionary with result and status
     """
+    with trace_request() as trace, cancel_scope(cancel_token):
+        start = time.perf_counter()
+        try:
+            if cancel_token is None or not detach:
+                response = _run_query(query, api_key, callbacks, cancel_token, structured, engine)
+            else:
+                response = run_cancellable(cancel_token, _run_query, query, api_key, callbacks, cancel_token,
+                                           structured, engine)
+        except QueryCancelled as e:
+            response = _cancelled_response(e)
+        route = response.get("route", "error")
+        metrics.observe("query_duration_seconds", time.perf_counter() - start, route=route)
+        metrics.increment("queries_total", route=route, status="ok" if response["success"] else "error")
+        if timings:
+            response["timings"] = trace.summary()
+        return response
+
+
+def _cancelled_response(error: QueryCancelled) -> dict:
+    """Response for a query stopped by its cancel token."""
+    logger.info(f"🛑 {str(error)}")
+    metrics.increment("queries_cancelled_total", reason=error.reason)
+    return {
+        "success": False,
+        "result": None,
+        "error": str(error),
+        "cancelled": error.reason,
+        "formatted": False,
+        "cached": False
+    }
+
+
+def _run_query(query: str, api_key: str, callbacks: Optional[List[Any]], cancel_token: Optional[CancelToken],
+               structured: bool, engine: str) -> dict:
+    """Answer a query from the caches, the router or an LLM engine; see query_database."""
     logger.info("=" * 80)
     logger.info("NEW QUERY RECEIVED")
     logger.info(f"Query: {query}")
     logger.info("=" * 80)
     
     try:
-        # Set the API key
-        os.environ["GOOGLE_API_KEY"] = api_key
-        
-        # Create SQLAlchemy engine for the SQLite database
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "employee_database.db")
-        engine = create_engine(f"sqlite:///{db_path}")
-        
-        # Create SQLDatabase instance
-        logger.info("📊 Initializing SQLDatabase connection")
-        db = SQLDatabase(engine)
-        
-        # Create LLM instance
-        logger.info("🤖 Initializing Gemma-3-27b-it LLM")
-        llm = ChatGoogleGenerativeAI(model="gemma-3-27b-it", temperature=0)
-        
-        # Create SQL agent
-        logger.info("🔧 Creating SQL Agent")
-        agent = create_sql_agent(
-            llm=llm,
-            db=db,
-            verbose=False,
-            handle_parsing_errors=True,
-            max_iterations=10
-        )
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        
+        # Answer repeat questions from the cache while the data is unchanged
+        plan_key = (normalize_question(query),)
+        cache_key = plan_key + ("structured" if structured else "markdown",)
+        data_version = data_versions.current()
+        with span("answer_cache"):
+            cached_answer = answer_cache.get(cache_key, data_version)
+        if cached_answer is not None:
+            logger.info("⚡ Answer cache hit")
+            if cached_answer["data"] is not None:
+                # Keep the server-side result set alive for further pages
+                with span("result_store"):
+                    result_store.create(cached_answer["data"]["sql"], cached_answer["columns"], data_version)
+            return {
+                "success": True,
+                "result": cached_answer["result"],
+                "error": None,
+                "formatted": cached_answer["data"] is not None,
+                "cached": True,
+                "route": "answer_cache",
+                "sql": cached_answer["sql"],
+                "columns": cached_answer["columns"],
+                "data": cached_answer["data"]
+            }
+        
+        # Answer common question shapes from SQL templates, without any LLM calls
+        with span("router"):
+            routed = intent_router.route(query, registry.engine, data_version)
+        if routed is not None:
+            if structured:
+                data = _structured_data(routed.sql, None, routed.title, data_version, params=routed.params)
+                output = routed.title
+            else:
+                data = None
+                columns, rows = execute_sql(registry.engine, routed.sql, params=routed.params)
+                output = f"{routed.title}\n\n{rows_to_markdown(columns, rows)}"
+            return {
+                "success": True,
+                "result": output,
+                "error": None,
+                "formatted": True,
+                "cached": False,
+                "route": "router",
+                "intent": routed.intent,
+                "sql": routed.sql,
+                "params": routed.params,
+                "columns": None,
+                "data": data
+            }
+        
+        # Re-run the SQL the agent generated last time, without any LLM calls
+        with span("plan_cache"):
+            schema_version = get_schema_version(registry.engine)
+            plan = plan_cache.get(plan_key, schema_version)
+        if plan is not None:
+            try:
+                if structured:
+                    validate_sql(registry.engine, plan.sql)
+                    data = _structured_data(plan.sql, plan.columns, plan.title, data_version)
+                    output = plan.title or ""
+                else:
+                    data = None
+                    output = rows_to_markdown(*_run_cached_plan(plan))
+                logger.info("⚡ Plan cache hit, answered without the LLM")
+                answer_cache.put(cache_key, data_version,
+                                 {"result": output, "sql": plan.sql, "columns": plan.columns, "data": data})
+                return {
+                    "success": True,
+                    "result": output,
+                    "error": None,
+                    "formatted": True,
+                    "cached": False,
+                    "route": "plan_cache",
+                    "sql": plan.sql,
+                    "columns": plan.columns,
+                    "data": data
+                }
+            except Exception as plan_error:
+                logger.warning(f"⚠️ Cached plan failed, falling back to agent: {plan_error}")
+                plan_cache.discard(plan_key)
+        
+        # Reuse the process-wide agent for this API key
+        with span("agent_registry"):
+            bundle = registry.get(api_key)
+        agent = bundle.agent
+        tracing_handler = TracingCallbackHandler()
+        
+        if engine == SINGLE_SHOT_ENGINE:
+            logger.info("🎯 Generating SQL with a single LLM call")
+            run_callbacks = [tracing_handler] + list(callbacks or [])
+            if cancel_token is not None:
+                run_callbacks.append(CancellationCallbackHandler(cancel_token))
+            
+            def run_generated(sql: str, title: Optional[str]):
+                # Runs inside generate_sql, so a timeout or SQLite error gets the repair round
+                if structured:
+                    return _structured_data(sql, None, title or query, data_version)
+                return execute_sql(registry.engine, sql)
+            
+            with span("single_shot") as generation_span:
+                generated = generate_sql(bundle.llm, registry.engine, bundle.snapshot, query,
+                                         rules=FIELD_SELECTION_RULES, callbacks=run_callbacks,
+                                         cancel_token=cancel_token, execute=run_generated)
+                generation_span.set(llm_calls=generated.llm_calls)
+            sql_log.record(generated.sql)
+            
+            sql = generated.sql
+            title = generated.title or query
+            if structured:
+                data = generated.result
+                output = title
+            else:
+                data = None
+                output = f"{title}\n\n{rows_to_markdown(*generated.result)}"
+            
+            answer_cache.put(cache_key, data_version,
+                             {"result": output, "sql": sql, "columns": None, "data": data})
+            plan_cache.put(plan_key, schema_version, CachedPlan(sql=sql, title=title))
+            return {
+                "success": True,
+                "result": output,
+                "error": None,
+                "formatted": True,
+                "cached": False,
+                "route": SINGLE_SHOT_ENGINE,
+                "sql": sql,
+                "columns": None,
+                "data": data
+            }
         
         logger.info("🚀 Executing agent with natural language query")
-        # Add custom prompt to encourage markdown table output
-        enhanced_query = f"{CUSTOM_AGENT_PROMPT}\n\nUser query: {query}"
+        # Add custom prompt to encourage markdown table output, or only a title in structured mode
+        prompt = STRUCTURED_AGENT_PROMPT if structured else CUSTOM_AGENT_PROMPT
+        enhanced_query = f"{prompt}\n\nUser query: {query}"
+        sql_capture = SQLCaptureHandler()
+        run_callbacks = [sql_capture, tracing_handler] + list(callbacks or [])
+        if cancel_token is not None:
+            cancel_token.check()
+            run_callbacks.append(CancellationCallbackHandler(cancel_token))
         
         try:
-            result = agent.invoke({"input": enhanced_query})
+            with span("agent"):
+                result = agent.invoke({"input": enhanced_query}, config={"callbacks": run_callbacks})
             output = result.get("output", str(result))
         except Exception as agent_error:
             # Extract markdown table from error message if present
@@ -137,33 +361,66 @@ def query_database(query: str, api_key: str) -> dict:
             logger.info(f"🔍 Agent parsing error detected, attempting markdown extraction")
             
             # Try to extract markdown table from the error message
-            if "Could not parse LLM output:" in error_str:
-                # Extract the markdown content between backticks
-                import re
-                match = re.search(r"Could not parse LLM output:\s*`([^`]*)`", error_str, re.DOTALL)
-                if match:
-                    output = match.group(1).strip()
-                    logger.info(f"✅ Successfully extracted markdown from error (length: {len(output)} chars)")
+            with span("markdown_extraction"):
+                if "Could not parse LLM output:" in error_str:
+                    # Extract the markdown content between backticks
+                    import re
+                    match = re.search(r"Could not parse LLM output:\s*`([^`]*)`", error_str, re.DOTALL)
+                    if match:
+                        output = match.group(1).strip()
+                        logger.info(f"✅ Successfully extracted markdown from error (length: {len(output)} chars)")
+                    else:
+                        raise agent_error
                 else:
                     raise agent_error
-            else:
-                raise agent_error
         
         logger.info(f"✅ Agent output received (length: {len(output)} chars)")
         logger.info(f"📄 Output preview: {output[:300]}...")
         
+        # Record every statement the agent ran for the index advisor
+        for executed_sql in sql_capture.executed:
+            sql_log.record(executed_sql)
+        
+        sql = sql_capture.last_sql
+        data = None
+        if structured:
+            # The rows come straight from SQLite; the LLM output is only the title
+            title = output.strip().splitlines()[0] if output.strip() else None
+            columns = None
+            if sql:
+                data = _structured_data(sql, None, title, data_version)
+        else:
+            title = None
+            columns = markdown_table_headers(output)
+        
+        answer_cache.put(cache_key, data_version,
+                         {"result": output, "sql": sql, "columns": columns, "data": data})
+        if sql:
+            logger.info(f"💾 Caching generated SQL: {sql}")
+            plan_cache.put(plan_key, schema_version, CachedPlan(sql=sql, columns=columns, title=title))
+        
         return {
             "success": True,
             "result": output,
             "error": None,
-            "formatted": False
+            "formatted": data is not None,
+            "cached": False,
+            "route": AGENT_ENGINE,
+            "sql": sql,
+            "columns": columns,
+            "data": data
         }
         
+    except QueryCancelled:
+        # Answered by query_database, once, even if the caller stopped waiting
+        raise
+        
     except Exception as e:
         logger.error(f"❌ ERROR occurred: {str(e)}", exc_info=True)
         return {
             "success": False,
             "result": None,
             "error": str(e),
-            "formatted": False
+            "formatted": False,
+            "cached": False
         }
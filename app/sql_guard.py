@@ -0,0 +1,551 @@
+"""SQL cost guard: plan-cost checks, row caps and statement timeouts for generated SQL."""
+
+import re
+import json
+import time
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from langchain_community.agent_toolkits import SQLDatabaseToolkit
+from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
+from langchain_community.utilities.sql_database import truncate_word
+
+import metrics
+from cancellation import CancelToken, QueryCancelled, current_token
+from index_advisor import table_aliases
+from plan_cache import QUERY_TOOL_NAME
+
+logger = logging.getLogger(__name__)
+
+# Estimated rows visited above which a statement is rejected before it runs
+MAX_PLAN_COST = 100_000_000
+# A full scan nested inside another loop that yields more row combinations
+# than this is treated as a missing join condition
+MAX_CARTESIAN_ROWS = 1_000_000
+# Wall-clock limit for one statement
+STATEMENT_TIMEOUT_SECONDS = 10.0
+
+# Rows returned to the agent per sql_db_query call, and by direct execution
+AGENT_MAX_ROWS = 200
+MAX_RESULT_ROWS = 10_000
+
+# SQLite VM instructions between two deadline checks of the progress handler
+PROGRESS_HANDLER_STEPS = 10_000
+# The watchdog interrupt()s statements this long past their deadline, for
+# work the progress handler does not see (e.g. one large sort step)
+INTERRUPT_GRACE_SECONDS = 1.0
+WATCHDOG_INTERVAL_SECONDS = 0.25
+
+# Table and index statistics are re-read at most this often
+TABLE_STATS_TTL_SECONDS = 60.0
+# Rows per lookup for equality searches without sqlite_stat1 data and for
+# automatic indexes, as SQLite itself assumes
+DEFAULT_SEARCH_ROWS = 10
+# Rows assumed for subqueries, CTEs and views read in a loop
+UNKNOWN_SOURCE_ROWS = 100
+# Plan lines included in a rejection
+MAX_PLAN_LINES = 8
+
+CARTESIAN_HINT = ("Join every table to the others on a key column (e.g. es.employee_id = e.id) "
+                  "instead of listing tables without a join condition.")
+COST_HINT = ("Filter on an indexed column (id, department_id, manager_id, employee_id, skill_id, project_id), "
+             "aggregate with GROUP BY, or join fewer tables.")
+TIMEOUT_HINT = ("Make the query cheaper: add selective WHERE filters, join tables on key columns "
+                "and aggregate instead of returning every row.")
+
+metrics.describe("sql_guard_rejections_total", "Statements stopped by the SQL cost guard, by reason")
+metrics.describe("sql_guard_truncations_total", "Results cut off at the SQL cost guard's row cap, by source")
+
+_LOOP = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$')
+_INDEX = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+_CONSTRAINTS = re.compile(r'\(([^()]*)\)')
+_EQUALITY = re.compile(r'\w+=\?')
+_RANGE = re.compile(r'[<>]')
+# Literals, identifiers, comments and parentheses, so LIMIT is only found outside them
+_LIMIT_TOKENS = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\[[^\]]*\]|`[^`]*`|--[^\n]*|/\*.*?(?:\*/|$)|[()]|\blimit\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class SQLGuardError(Exception):
+    """
+    A statement was stopped by the cost guard.
+
+    Carries a machine-readable reason and a hint, so the agent gets a
+    structured error it can act on with one cheaper retry.
+    """
+
+    def __init__(self, reason: str, message: str, hint: str, **details: Any):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+        self.hint = hint
+        self.details = details
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Structured form of the error."""
+        return {"error": "query_rejected", "reason": self.reason, "message": self.message,
+                "hint": self.hint, **self.details}
+
+    def tool_message(self) -> str:
+        """Tool output for the agent; the "Error:" prefix marks it as a failed call."""
+        return "Error: " + json.dumps(self.to_dict())
+
+
+@dataclass
+class PlanEstimate:
+    """Estimated cost of a statement, from its EXPLAIN QUERY PLAN."""
+    cost: float = 0.0
+    plan: List[str] = field(default_factory=list)
+    cartesian: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _TableStats:
+    rows: Dict[str, float]
+    index_rows: Dict[str, List[float]]
+    loaded_at: float
+
+
+class StatementDeadline:
+    """
+    Wall-clock deadline for the statements run on one SQLite connection.
+
+    The progress handler aborts the running statement once the deadline
+    has passed or the query's cancel token has fired; the watchdog
+    interrupt()s it if the handler is not reached.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, timeout: float, token: Optional[CancelToken] = None):
+        self._connection = connection
+        self.timeout = timeout
+        self.token = token
+        self.expired = False
+        self.restart()
+
+    def restart(self):
+        """Grant a fresh timeout, e.g. before fetching the next streamed chunk."""
+        self.expires_at = time.monotonic() + self.timeout
+
+    def pause(self):
+        """Stop the clock while no SQLite work is pending, e.g. while a chunk is consumed."""
+        self.expires_at = float("inf")
+
+    @property
+    def cancelled(self) -> bool:
+        """True once the query's cancel token has fired."""
+        return self.token is not None and self.token.cancelled
+
+    def progress(self) -> int:
+        """SQLite progress handler; a non-zero return aborts the statement."""
+        if self.cancelled:
+            return 1
+        if time.monotonic() >= self.expires_at:
+            self.expired = True
+            return 1
+        return 0
+
+    def interrupt(self):
+        """Abort the running statement from another thread."""
+        self.expired = True
+        self._connection.interrupt()
+
+
+class _Watchdog:
+    """
+    Background thread that interrupt()s connections whose query was
+    cancelled, or that are INTERRUPT_GRACE_SECONDS past their deadline.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._deadlines = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, deadline: StatementDeadline):
+        with self._condition:
+            self._deadlines.add(deadline)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sql-guard-watchdog", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def remove(self, deadline: StatementDeadline):
+        # Under the lock, so a connection is never interrupted after its statement is done
+        with self._condition:
+            self._deadlines.discard(deadline)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+                cutoff = time.monotonic() - INTERRUPT_GRACE_SECONDS
+                for deadline in self._deadlines:
+                    if deadline.expired:
+                        continue
+                    if deadline.cancelled:
+                        deadline.interrupt()
+                    elif deadline.expires_at <= cutoff:
+                        logger.warning(f"⏱️ Interrupting SQLite statement {deadline.timeout:g}s past its deadline")
+                        deadline.interrupt()
+                self._condition.wait(WATCHDOG_INTERVAL_SECONDS)
+
+
+_watchdog = _Watchdog()
+
+
+def is_query(sql: str) -> bool:
+    """True for SELECT/WITH statements, the only ones the guard estimates and limits."""
+    return sql.lstrip().lower().startswith(("select", "with"))
+
+
+def has_top_level_limit(sql: str) -> bool:
+    """
+    Check whether a statement ends in its own LIMIT clause.
+
+    LIMITs inside subqueries, string literals, quoted identifiers and
+    comments are ignored.
+    """
+    depth = 0
+    for match in _LIMIT_TOKENS.finditer(sql):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.lower() == "limit":
+            return True
+    return False
+
+
+def limit_rows(sql: str, max_rows: int) -> str:
+    """
+    Add a LIMIT of max_rows + 1 to a query that has none.
+
+    The extra row tells the caller that the result was cut off. With the
+    LIMIT in the statement, SQLite stops early and keeps only the top rows
+    of an ORDER BY instead of sorting everything.
+
+    Args:
+        sql: SELECT/WITH statement
+        max_rows: Rows the caller will return
+
+    Returns:
+        The statement with a LIMIT, or unchanged if it has one or is not a query
+    """
+    statement = sql.strip().rstrip(";").rstrip()
+    if not is_query(statement) or has_top_level_limit(statement):
+        return statement
+    # On its own line, so a trailing -- comment cannot swallow it
+    return f"{statement}\nLIMIT {max_rows + 1}"
+
+
+class SQLGuard:
+    """
+    Cost guard for SQL written by an LLM.
+
+    Before a query runs, its EXPLAIN QUERY PLAN is turned into an estimate
+    of the rows SQLite will visit, using sqlite_stat1 where available and
+    table sizes otherwise. Nested full scans that multiply large tables
+    (a missing join condition) and plans above max_cost are rejected with
+    a SQLGuardError. Queries without a LIMIT get one, and every statement
+    runs under a wall-clock deadline enforced with SQLite's progress
+    handler, backed by interrupt() from a watchdog thread.
+    """
+
+    def __init__(self, max_cost: float = MAX_PLAN_COST, max_cartesian_rows: float = MAX_CARTESIAN_ROWS,
+                 timeout: float = STATEMENT_TIMEOUT_SECONDS):
+        self.max_cost = max_cost
+        self.max_cartesian_rows = max_cartesian_rows
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats: Optional[_TableStats] = None
+
+    def _table_stats(self, connection) -> _TableStats:
+        """Row counts per table and rows per index key prefix, cached for TABLE_STATS_TTL_SECONDS."""
+        stats = self._stats
+        if stats is not None and time.monotonic() - stats.loaded_at < TABLE_STATS_TTL_SECONDS:
+            return stats
+
+        tables = {name: sql or "" for name, sql in connection.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"))}
+        rows: Dict[str, float] = {}
+        index_rows: Dict[str, List[float]] = {}
+        if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first():
+            for table, index, stat in connection.execute(text("SELECT tbl, idx, stat FROM sqlite_stat1")):
+                numbers = []
+                for value in (stat or "").split():
+                    if not value.isdigit():
+                        break
+                    numbers.append(float(value))
+                if not numbers:
+                    continue
+                rows[table] = numbers[0]
+                if index is not None:
+                    index_rows[index] = numbers[1:]
+        for table, ddl in tables.items():
+            if table in rows:
+                continue
+            # MAX(rowid) is a B-tree seek; WITHOUT ROWID tables have to be counted
+            count_sql = (f'SELECT COUNT(*) FROM "{table}"' if "WITHOUT ROWID" in ddl.upper()
+                         else f'SELECT MAX(rowid) FROM "{table}"')
+            rows[table] = float(connection.execute(text(count_sql)).scalar() or 0)
+
+        stats = _TableStats(rows=rows, index_rows=index_rows, loaded_at=time.monotonic())
+        with self._lock:
+            self._stats = stats
+        return stats
+
+    def _search_rows(self, stats: _TableStats, table: Optional[str], rest: str) -> float:
+        """Rows one index search returns per outer row."""
+        table_rows = stats.rows.get(table, UNKNOWN_SOURCE_ROWS) if table else UNKNOWN_SOURCE_ROWS
+        constraints = _CONSTRAINTS.search(rest)
+        constraints = constraints.group(1) if constraints else ""
+        if "rowid=" in constraints:
+            return 1.0
+        if "AUTOMATIC" in rest:
+            return DEFAULT_SEARCH_ROWS
+        equalities = len(_EQUALITY.findall(constraints))
+        if equalities:
+            index = _INDEX.search(rest)
+            per_key = stats.index_rows.get(index.group(1)) if index else None
+            rows = per_key[min(equalities, len(per_key)) - 1] if per_key else DEFAULT_SEARCH_ROWS
+            rows = min(rows, table_rows)
+        else:
+            rows = table_rows
+        if _RANGE.search(constraints):
+            # SQLite's own guess for a range constraint
+            rows /= 4
+        return max(rows, 1.0)
+
+    def _loop(self, stats: _TableStats, aliases: Dict[str, str],
+              detail: str) -> Optional[Tuple[str, Optional[str], float, float]]:
+        """Parse a SCAN/SEARCH step into (name, table, rows per outer row, one-off cost)."""
+        match = _LOOP.match(detail)
+        if match is None:
+            return None
+        kind, name, alias, rest = match.groups()
+        name = alias or name
+        if name == "CONSTANT":
+            return name, None, 1.0, 0.0
+        table = aliases.get(name.lower())
+        if kind == "SCAN":
+            rows = stats.rows.get(table, UNKNOWN_SOURCE_ROWS) if table else UNKNOWN_SOURCE_ROWS
+            return name, table, max(rows, 1.0), 0.0
+        # An automatic index is built with one pass over the table
+        build = stats.rows.get(table, 0.0) if table and "AUTOMATIC" in rest else 0.0
+        return name, table, self._search_rows(stats, table, rest), build
+
+    def _estimate(self, children: Dict[int, List[Tuple[int, str]]], parent: int, stats: _TableStats,
+                  aliases: Dict[str, str], estimate: PlanEstimate) -> float:
+        """Cost of the steps under one plan node; nested loops multiply, subqueries add."""
+        cost = 0.0
+        rows = 1.0
+        outer: List[str] = []
+        for node, detail in children.get(parent, []):
+            loop = self._loop(stats, aliases, detail)
+            if loop is not None:
+                name, table, loop_rows, build = loop
+                if (detail.startswith("SCAN") and table is not None and rows > 1
+                        and rows * loop_rows > self.max_cartesian_rows):
+                    estimate.cartesian.append(f"{' × '.join(outer)} × {name}")
+                rows *= loop_rows
+                cost += build + rows
+                outer.append(name)
+            elif detail.startswith("MULTI-INDEX OR"):
+                # One index search per OR branch for every outer row
+                branch_rows = sum(
+                    branch[2] for branch in (self._loop(stats, aliases, d) for d in _subtree(children, node)) if branch
+                )
+                rows *= max(branch_rows, 1.0)
+                cost += rows
+            elif detail.startswith("USE TEMP B-TREE"):
+                cost += rows
+            elif detail.startswith("CORRELATED"):
+                cost += rows * self._estimate(children, node, stats, aliases, estimate)
+            else:
+                # MATERIALIZE, CO-ROUTINE, compound parts and uncorrelated subqueries run once
+                cost += self._estimate(children, node, stats, aliases, estimate)
+        return cost
+
+    def estimate(self, connection, sql: str, params: Optional[Dict[str, Any]] = None) -> PlanEstimate:
+        """
+        Estimate the rows SQLite will visit for a query.
+
+        Args:
+            connection: SQLAlchemy connection to the SQLite database
+            sql: SELECT/WITH statement
+            params: Values for the statement's named parameters
+
+        Returns:
+            PlanEstimate with the cost, the plan lines and any cartesian joins
+        """
+        stats = self._table_stats(connection)
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params or {}).fetchall()
+        children: Dict[int, List[Tuple[int, str]]] = {}
+        for node, parent, _, detail in plan:
+            children.setdefault(parent, []).append((node, detail))
+        estimate = PlanEstimate(plan=[row[3] for row in plan])
+        estimate.cost = self._estimate(children, 0, stats, table_aliases(sql, stats.rows), estimate)
+        return estimate
+
+    def check_plan(self, connection, sql: str, params: Optional[Dict[str, Any]] = None) -> PlanEstimate:
+        """
+        Reject a query whose plan is a cartesian join or costs more than max_cost.
+
+        Args:
+            connection: SQLAlchemy connection to the SQLite database
+            sql: SQL statement; anything but SELECT/WITH is not estimated
+            params: Values for the statement's named parameters
+
+        Returns:
+            PlanEstimate of the accepted statement
+
+        Raises:
+            SQLGuardError: If the plan is over budget
+            sqlalchemy.exc.SQLAlchemyError: If SQLite cannot prepare the statement
+        """
+        if not is_query(sql):
+            return PlanEstimate()
+        estimate = self.estimate(connection, sql, params)
+        details = {"estimated_cost": int(estimate.cost), "plan": estimate.plan[:MAX_PLAN_LINES]}
+        if estimate.cartesian:
+            metrics.increment("sql_guard_rejections_total", reason="cartesian_join")
+            logger.warning(f"🚧 Rejected cartesian join ({'; '.join(estimate.cartesian)}): {sql}")
+            raise SQLGuardError(
+                "cartesian_join",
+                f"Query reads a whole table again for every row before it ({'; '.join(estimate.cartesian)}), "
+                "most likely a missing join condition",
+                CARTESIAN_HINT, **details)
+        if estimate.cost > self.max_cost:
+            metrics.increment("sql_guard_rejections_total", reason="too_expensive")
+            logger.warning(f"🚧 Rejected query with estimated cost {estimate.cost:,.0f}: {sql}")
+            raise SQLGuardError(
+                "too_expensive",
+                f"Query would visit about {estimate.cost:,.0f} rows, over the budget of {self.max_cost:,.0f}",
+                COST_HINT, budget=int(self.max_cost), **details)
+        return estimate
+
+    @contextmanager
+    def deadline(self, connection, timeout: Optional[float] = None,
+                 cancel_token: Optional[CancelToken] = None) -> Iterator[StatementDeadline]:
+        """
+        Abort the statements run on a connection once a timeout has passed
+        or the query is cancelled.
+
+        Args:
+            connection: SQLAlchemy connection to the SQLite database
+            timeout: Seconds allowed (the guard's timeout if not given)
+            cancel_token: Token of the query (the current one if not given)
+
+        Yields:
+            StatementDeadline, which can be restarted or paused for streaming
+
+        Raises:
+            SQLGuardError: If a statement was stopped by the deadline
+            QueryCancelled: If a statement was stopped because the query was cancelled
+        """
+        timeout = self.timeout if timeout is None else timeout
+        cancel_token = cancel_token or current_token()
+        raw = connection.connection.dbapi_connection
+        watch = StatementDeadline(raw, timeout, cancel_token)
+        raw.set_progress_handler(watch.progress, PROGRESS_HANDLER_STEPS)
+        _watchdog.add(watch)
+        try:
+            yield watch
+        except (sqlite3.OperationalError, OperationalError) as e:
+            if watch.cancelled:
+                raise QueryCancelled(cancel_token.reason) from e
+            if not watch.expired:
+                raise
+            metrics.increment("sql_guard_rejections_total", reason="timeout")
+            logger.warning(f"⏱️ Statement stopped after {timeout:g}s")
+            raise SQLGuardError("timeout", f"Query exceeded the {timeout:g}s time limit and was stopped",
+                                TIMEOUT_HINT, timeout_seconds=timeout) from e
+        finally:
+            _watchdog.remove(watch)
+            raw.set_progress_handler(None, 0)
+
+    def run(self, engine, sql: str, max_rows: int = AGENT_MAX_ROWS) -> Tuple[List[str], List[Tuple[Any, ...]], bool]:
+        """
+        Check, limit and run one statement under the deadline.
+
+        Args:
+            engine: SQLAlchemy engine bound to the SQLite database
+            sql: SQL statement
+            max_rows: Maximum number of rows to return
+
+        Returns:
+            Tuple of (column names, row tuples, whether rows were cut off)
+
+        Raises:
+            SQLGuardError: If the plan is over budget or the statement timed out
+            sqlalchemy.exc.SQLAlchemyError: If the statement fails
+        """
+        statement = sql.strip().rstrip(";").rstrip()
+        with engine.connect() as connection:
+            self.check_plan(connection, statement)
+            with self.deadline(connection):
+                result = connection.execute(text(limit_rows(statement, max_rows)))
+                if not result.returns_rows:
+                    return [], [], False
+                columns = list(result.keys())
+                rows = [tuple(row) for row in result.fetchmany(max_rows + 1)]
+        truncated = len(rows) > max_rows
+        if truncated:
+            metrics.increment("sql_guard_truncations_total", source="agent")
+        return columns, rows[:max_rows], truncated
+
+
+def _subtree(children: Dict[int, List[Tuple[int, str]]], parent: int) -> Iterator[str]:
+    for node, detail in children.get(parent, []):
+        yield detail
+        yield from _subtree(children, node)
+
+
+class GuardedQuerySQLDataBaseTool(QuerySQLDataBaseTool):
+    """sql_db_query behind the cost guard; rejections come back as a JSON error with a hint."""
+
+    def _run(self, query: str, run_manager: Any = None) -> str:
+        try:
+            _, rows, truncated = sql_guard.run(self.db._engine, query)
+        except SQLGuardError as e:
+            return e.tool_message()
+        except SQLAlchemyError as e:
+            return f"Error: {e}"
+        if not rows:
+            return ""
+        # Same output format as SQLDatabase.run
+        output = str([tuple(truncate_word(value, length=self.db._max_string_length) for value in row)
+                      for row in rows])
+        if truncated:
+            output += f"\n(Only the first {len(rows)} rows are shown; aggregate or filter the query if you need the rest.)"
+        return output
+
+
+class GuardedSQLDatabaseToolkit(SQLDatabaseToolkit):
+    """SQLDatabaseToolkit whose sql_db_query tool runs behind the cost guard."""
+
+    def get_tools(self) -> list:
+        tools = []
+        for tool in super().get_tools():
+            if tool.name == QUERY_TOOL_NAME:
+                tool = GuardedQuerySQLDataBaseTool(
+                    db=self.db,
+                    description=(f"{tool.description} Results are capped at {AGENT_MAX_ROWS} rows. "
+                                 "Queries that join tables without a join condition, are too expensive "
+                                 "or run too long are rejected with a JSON error whose hint says how to fix them."),
+                )
+            tools.append(tool)
+        return tools
+
+
+sql_guard = SQLGuard()
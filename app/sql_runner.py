@@ -0,0 +1,208 @@
+"""Direct SQL execution and result formatting, bypassing the LLM."""
+
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+import metrics
+from cancellation import CancelToken
+from sql_guard import MAX_RESULT_ROWS, limit_rows, sql_guard
+from tracing import record_sql_rows, span
+
+logger = logging.getLogger(__name__)
+
+
+def validate_sql(engine, sql: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Check that a statement is a single read query that compiles against the
+    current schema and whose plan is within the SQL cost guard's budget.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        sql: SQL statement to validate
+        params: Values for the statement's named parameters
+
+    Raises:
+        ValueError: If the statement is not a SELECT/WITH query
+        SQLGuardError: If the plan is a cartesian join or over the cost budget
+        sqlalchemy.exc.SQLAlchemyError: If SQLite cannot prepare the statement
+    """
+    statement = sql.strip().rstrip(";").strip()
+    if not statement.lower().startswith(("select", "with")):
+        raise ValueError("Only SELECT queries can be executed directly")
+    if ";" in statement:
+        raise ValueError("Only a single SQL statement can be executed directly")
+    with span("sql_validate", metric="sql_execution_duration_seconds", operation="validate"), \
+            engine.connect() as connection:
+        # EXPLAIN QUERY PLAN prepares the statement without running it
+        sql_guard.check_plan(connection, statement, params)
+
+
+def execute_sql(engine, sql: str, params: Optional[Dict[str, Any]] = None,
+                max_rows: int = MAX_RESULT_ROWS) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """
+    Execute a read query and return its columns and rows.
+
+    The statement runs under the SQL cost guard's timeout and at most
+    max_rows rows are returned.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        sql: SQL statement to execute
+        params: Values for the statement's named parameters
+        max_rows: Maximum number of rows to return
+
+    Returns:
+        Tuple of (column names, row tuples)
+
+    Raises:
+        SQLGuardError: If the statement timed out
+    """
+    with span("sql", metric="sql_execution_duration_seconds", operation="execute") as sql_span, \
+            engine.connect() as connection, sql_guard.deadline(connection):
+        result = connection.execute(text(limit_rows(sql, max_rows)), params or {})
+        columns = list(result.keys())
+        rows = [tuple(row) for row in result.fetchmany(max_rows + 1)]
+        record_sql_rows(sql_span, len(rows))
+    if len(rows) > max_rows:
+        rows = rows[:max_rows]
+        metrics.increment("sql_guard_truncations_total", source="direct")
+        logger.warning(f"✂️ Result cut off at {max_rows} rows")
+    logger.info(f"🗃️ Executed SQL directly ({len(rows)} rows)")
+    return columns, rows
+
+
+def iter_sql(engine, sql: str, chunk_size: int = 100, params: Optional[Dict[str, Any]] = None,
+             cancel_token: Optional[CancelToken] = None,
+             max_rows: int = MAX_RESULT_ROWS) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+    """
+    Execute a read query and yield its rows in chunks as SQLite produces them.
+
+    The statement must pass the SQL cost guard's plan check and gets a
+    LIMIT of max_rows + 1 (see limit_rows): at most max_rows + 1 rows are
+    yielded, the extra one telling the caller the result was cut off.
+    Fetching each chunk gets the guard's full timeout; the clock is stopped
+    while the consumer handles a chunk.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        sql: SQL statement to execute
+        chunk_size: Maximum number of rows per chunk
+        params: Values for the statement's named parameters
+        cancel_token: Token that stops the statement once fired
+        max_rows: Rows the caller will return
+
+    Yields:
+        Tuples of (column names, row tuples)
+
+    Raises:
+        SQLGuardError: If the plan is over budget or fetching a chunk timed out
+        QueryCancelled: If the token fired
+    """
+    with span("sql", metric="sql_execution_duration_seconds", operation="stream") as sql_span, \
+            engine.connect() as connection, sql_guard.deadline(connection, cancel_token=cancel_token) as deadline:
+        statement = sql.strip().rstrip(";").strip()
+        sql_guard.check_plan(connection, statement, params)
+        result = connection.execute(text(limit_rows(statement, max_rows)), params or {})
+        columns = list(result.keys())
+        produced = 0
+        try:
+            while produced <= max_rows:
+                deadline.restart()
+                rows = result.fetchmany(min(chunk_size, max_rows + 1 - produced))
+                if not rows:
+                    break
+                produced += len(rows)
+                deadline.pause()
+                yield columns, [tuple(row) for row in rows]
+        finally:
+            result.close()
+            record_sql_rows(sql_span, produced)
+        if not produced:
+            # Still report the columns of an empty result
+            yield columns, []
+
+
+def result_columns(engine, sql: str, params: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Return the column names of a read query without producing any rows.
+
+    Args:
+        engine: SQLAlchemy engine bound to the SQLite database
+        sql: SELECT/WITH statement
+        params: Values for the statement's named parameters
+
+    Returns:
+        Column names
+    """
+    statement = sql.strip().rstrip(";").strip()
+    with engine.connect() as connection, sql_guard.deadline(connection):
+        result = connection.execute(text(f"SELECT * FROM ({statement}) LIMIT 0"), params or {})
+        return list(result.keys())
+
+
+def project_columns(columns: List[str], rows: Sequence[Sequence[Any]],
+                    wanted: Optional[List[str]]) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """
+    Keep only the wanted columns, if every one of them is present.
+
+    Args:
+        columns: Column names of the result
+        rows: Result rows
+        wanted: Column names to keep, matched case-insensitively
+
+    Returns:
+        Tuple of (column names, row tuples), unchanged if projection is not possible
+    """
+    if not wanted:
+        return columns, [tuple(row) for row in rows]
+    lookup = {name.lower(): idx for idx, name in enumerate(columns)}
+    indexes = [lookup.get(name.lower()) for name in wanted]
+    if any(idx is None for idx in indexes):
+        return columns, [tuple(row) for row in rows]
+    return [columns[idx] for idx in indexes], [tuple(row[idx] for idx in indexes) for row in rows]
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def rows_to_markdown(columns: List[str], rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Render a result set as a markdown table like the agent's final answer.
+
+    Args:
+        columns: Column names
+        rows: Result rows
+
+    Returns:
+        Markdown table text
+    """
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(_format_cell(value) for value in row) + " |")
+    return "\n".join(lines)
+
+
+def markdown_table_headers(markdown: str) -> Optional[List[str]]:
+    """
+    Return the header cells of the first markdown table in a text, if any.
+
+    Args:
+        markdown: Agent output text
+
+    Returns:
+        List of header names, or None if no table is found
+    """
+    for line in markdown.splitlines():
+        if "|" in line:
+            headers = [cell.strip() for cell in line.strip().strip("|").split("|")]
+            headers = [header for header in headers if header]
+            return headers or None
+    return None
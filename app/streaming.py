@@ -0,0 +1,235 @@
+"""Server-Sent Events streaming of agent progress and result rows."""
+
+import ast
+import json
+import queue
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+from agent_registry import registry
+from cancellation import ABANDONED, CancelToken, QueryCancelled, active_requests
+from plan_cache import QUERY_TOOL_NAME
+from sql_agent import query_database
+from sql_guard import MAX_RESULT_ROWS
+from sql_runner import iter_sql, project_columns, result_columns
+
+logger = logging.getLogger(__name__)
+
+ROW_CHUNK_SIZE = 50
+
+# Seconds between keep-alive comments while the agent works; writing one is
+# how a disconnected client is noticed
+HEARTBEAT_SECONDS = 2.0
+
+# Marker put on the event queue once query_database has returned
+_DONE = object()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format one Server-Sent Events message.
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        SSE message text
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _parse_rows(output: Any) -> Optional[List[Any]]:
+    """Best-effort rows from the sql_db_query tool's string output, None if unparseable."""
+    if not output:
+        return []
+    try:
+        # A row-cap note may follow the rows on a line of its own
+        rows = ast.literal_eval(str(output).split("\n", 1)[0])
+    except (ValueError, SyntaxError):
+        return None
+    return rows if isinstance(rows, list) else None
+
+
+class AgentEventHandler(BaseCallbackHandler):
+    """
+    Callback handler that turns agent activity into stream events.
+
+    Besides tool choices and SQL, every LLM call is reported as a step, and
+    the first rows of each query the agent runs are sent as a preview right
+    away, so the client sees data before the agent has written its answer.
+    """
+
+    def __init__(self, events: "queue.Queue", engine=None):
+        self._events = events
+        self._engine = engine
+        self._tools: Dict[UUID, Tuple[str, str]] = {}
+        self._steps = 0
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any):
+        self._step()
+
+    def on_llm_start(self, *args: Any, **kwargs: Any):
+        self._step()
+
+    def on_agent_action(self, action: Any, **kwargs: Any):
+        self._events.put(("tool", {"tool": action.tool}))
+        if action.tool == QUERY_TOOL_NAME:
+            self._events.put(("sql_generated", {"sql": str(action.tool_input).strip()}))
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._tools[run_id] = (serialized.get("name"), input_str)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        name, sql = self._tools.pop(run_id, (None, None))
+        if name != QUERY_TOOL_NAME:
+            return
+        if str(output).startswith("Error:"):
+            self._events.put(("sql_error", {"error": str(output)}))
+            return
+        rows = _parse_rows(output)
+        self._events.put(("sql_executed", {"row_count": None if rows is None else len(rows)}))
+        if rows and self._engine is not None:
+            self._preview(sql, rows)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._tools.pop(run_id, None)
+
+    def _step(self):
+        self._steps += 1
+        self._events.put(("status", {"message": "thinking", "step": self._steps}))
+
+    def _preview(self, sql: str, rows: List[Any]):
+        """Send the first rows of an agent query with its column names."""
+        try:
+            columns = result_columns(self._engine, sql)
+        except Exception as e:
+            logger.debug(f"No preview for agent SQL: {e}")
+            return
+        self._events.put(("preview", {"columns": columns, "rows": [list(row) for row in rows[:ROW_CHUNK_SIZE]]}))
+
+
+def stream_query(query: str, api_key: str, structured: bool = False, engine: str = "agent",
+                 cancel_token: Optional[CancelToken] = None, client_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Run a query and yield SSE messages as the agent makes progress.
+
+    The agent runs on a background thread and reports its steps, tool
+    choices, SQL and a preview of each query's first rows through
+    AgentEventHandler. Once it finishes, the answer is sent and the result
+    rows are streamed in chunks: the first page of the structured result
+    when there is one (further pages come from /api/results), or otherwise
+    the rows of the re-executed final SQL, which goes through the SQL cost
+    guard again and is cut off after MAX_RESULT_ROWS rows.
+
+    The query is cancelled when the client disconnects (noticed when the
+    next message or keep-alive cannot be written and the generator is
+    closed) or starts another query with the same client id.
+
+    Args:
+        query: Natural language query
+        api_key: Google API key for Gemini
+        structured: Ask the agent only for a title and return rows from SQLite
+        engine: "agent" or "single_shot", see query_database
+        cancel_token: Token carrying the request deadline; one without a deadline is created if not given
+        client_id: Id of the client, so a newer query from it supersedes this one
+
+    Yields:
+        SSE message strings
+    """
+    token = cancel_token or CancelToken()
+    with active_requests.track(client_id, token):
+        try:
+            yield from _stream_events(query, api_key, structured, engine, token)
+        except GeneratorExit:
+            if not token.cancelled:
+                token.cancel(ABANDONED)
+                logger.info("🔌 Client disconnected, query cancelled")
+            raise
+
+
+def _stream_events(query: str, api_key: str, structured: bool, engine: str, token: CancelToken) -> Iterator[str]:
+    """SSE messages for one query; see stream_query."""
+    events: "queue.Queue" = queue.Queue()
+    outcome: Dict[str, Any] = {}
+
+    def run():
+        try:
+            outcome["result"] = query_database(query, api_key, callbacks=[AgentEventHandler(events, registry.engine)],
+                                               cancel_token=token, structured=structured, engine=engine)
+        finally:
+            events.put(_DONE)
+
+    yield format_sse("status", {"message": "started"})
+    threading.Thread(target=run, name="stream-query", daemon=True).start()
+
+    while True:
+        try:
+            item = events.get(timeout=HEARTBEAT_SECONDS)
+        except queue.Empty:
+            # SSE comment, ignored by clients
+            yield ": keep-alive\n\n"
+            continue
+        if item is _DONE:
+            break
+        event, data = item
+        yield format_sse(event, data)
+
+    result = outcome.get("result") or {"success": False, "error": "Query did not complete"}
+    if not result["success"]:
+        yield format_sse("error", {"error": result["error"]})
+        return
+
+    yield format_sse("answer", {
+        "result": result["result"],
+        "route": result.get("route"),
+        "cached": result.get("cached", False),
+        "sql": result.get("sql"),
+    })
+
+    data = result.get("data")
+    if data is not None:
+        yield format_sse("columns", {"columns": data["columns"]})
+        for start in range(0, len(data["rows"]), ROW_CHUNK_SIZE):
+            yield format_sse("rows", {"rows": data["rows"][start:start + ROW_CHUNK_SIZE]})
+        yield format_sse("done", {
+            "row_count": len(data["rows"]),
+            "result_id": data.get("result_id"),
+            "next_after": data.get("next_after"),
+            "has_more": data.get("has_more", False),
+            "total_rows": data.get("row_count"),
+            "truncated": data.get("truncated", False),
+        })
+    elif result.get("sql"):
+        row_count = 0
+        truncated = False
+        try:
+            for index, (columns, rows) in enumerate(iter_sql(registry.engine, result["sql"], ROW_CHUNK_SIZE,
+                                                                     params=result.get("params"),
+                                                                     cancel_token=token)):
+                columns, rows = project_columns(columns, rows, result.get("columns"))
+                if index == 0:
+                    yield format_sse("columns", {"columns": columns})
+                if row_count + len(rows) > MAX_RESULT_ROWS:
+                    rows = rows[:MAX_RESULT_ROWS - row_count]
+                    truncated = True
+                    metrics.increment("sql_guard_truncations_total", source="stream")
+                    logger.warning(f"✂️ Streamed result cut off at {MAX_RESULT_ROWS} rows")
+                if rows:
+                    row_count += len(rows)
+                    yield format_sse("rows", {"rows": rows})
+        except QueryCancelled as e:
+            metrics.increment("queries_cancelled_total", reason=e.reason)
+            yield format_sse("error", {"error": str(e)})
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Could not stream result rows: {e}")
+            yield format_sse("rows_error", {"error": str(e)})
+        yield format_sse("done", {"row_count": row_count, "truncated": truncated})
+    else:
+        yield format_sse("done", {"row_count": None})
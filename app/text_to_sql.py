@@ -0,0 +1,212 @@
+"""Single-shot text-to-SQL: one LLM call with a compact schema, local validation, one repair round."""
+
+import re
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from cancellation import CancelToken
+from schema_cache import TABLE_NOTES, SchemaSnapshot
+from sql_guard import SQLGuardError
+from sql_runner import validate_sql
+
+logger = logging.getLogger(__name__)
+
+# LLM calls allowed after the first one when the generated SQL does not validate or run
+MAX_REPAIR_ROUNDS = 1
+
+_FOREIGN_KEY = re.compile(r"FOREIGN KEY\s*\((\w+)\)\s*REFERENCES\s+(\w+)\s*\((\w+)\)", re.IGNORECASE)
+_SQL_FENCE = re.compile(r"```(?:sql|sqlite)?\s*(.*?)```", re.IGNORECASE | re.DOTALL)
+
+SINGLE_SHOT_PROMPT = """You are an SQLite expert. Write ONE SQLite SELECT statement that answers the user's question.
+
+DATABASE SCHEMA (table(columns), -> marks foreign keys):
+{schema}
+
+{rules}
+
+RULES:
+- Use only the tables and columns listed above
+- Select only the columns the user should see, with readable aliases (e.g. d.name AS department_name)
+- Do NOT add a LIMIT unless the user asks for a specific number of results
+- Respond in exactly this format and nothing else:
+TITLE: <short one-line title describing the result>
+SQL:
+<the SELECT statement>
+
+User query: {question}"""
+
+REPAIR_PROMPT = """The SQL you wrote failed against the database.
+
+SQL:
+{sql}
+
+Error: {error}
+
+Fix the statement. Respond in the same format:
+TITLE: <short one-line title>
+SQL:
+<the corrected SELECT statement>"""
+
+
+class SQLGenerationError(Exception):
+    """Raised when the LLM did not produce a working statement within the repair budget."""
+
+
+@dataclass
+class GeneratedSQL:
+    """SQL produced by the single-shot engine, and what executing it returned."""
+    sql: str
+    title: Optional[str]
+    llm_calls: int
+    result: Any = None
+
+
+# Keyed on the snapshot's database and schema, like the snapshot cache itself
+_compact_cache: Dict[Tuple[str, str, int], str] = {}
+_compact_lock = threading.Lock()
+
+
+def compact_schema(snapshot: SchemaSnapshot) -> str:
+    """
+    Render the schema as one line per table with foreign-key arrows.
+
+    Much shorter than the DDL plus sample rows the ReAct agent reads, and
+    computed once per database schema.
+
+    Args:
+        snapshot: Current schema snapshot
+
+    Returns:
+        Compact schema text, e.g. "employees(id, first_name, department_id -> departments.id)"
+    """
+    key = (snapshot.db_path, snapshot.schema_hash, snapshot.schema_version)
+    with _compact_lock:
+        cached = _compact_cache.get(key)
+        if cached is not None:
+            return cached
+
+        lines = []
+        for table in snapshot.table_names:
+            references = {column: f"{target}.{target_column}"
+                          for column, target, target_column in _FOREIGN_KEY.findall(snapshot.table_info[table])}
+            columns = [f"{column} -> {references[column]}" if column in references else column
+                       for column in snapshot.columns.get(table, [])]
+            line = f"{table}({', '.join(columns)})"
+            if table in TABLE_NOTES:
+                line += f"  -- {TABLE_NOTES[table]}"
+            lines.append(line)
+        schema = "\n".join(lines)
+
+        _compact_cache.clear()
+        _compact_cache[key] = schema
+        return schema
+
+
+def parse_response(text: str) -> Dict[str, Optional[str]]:
+    """
+    Extract the title and SQL statement from the model's response.
+
+    Args:
+        text: Raw LLM response
+
+    Returns:
+        Dictionary with "title" and "sql" (either may be None)
+    """
+    title_match = re.search(r"^\s*TITLE:\s*(.+)$", text, re.IGNORECASE | re.MULTILINE)
+    title = title_match.group(1).strip() if title_match else None
+
+    fenced = _SQL_FENCE.search(text)
+    if fenced:
+        sql = fenced.group(1)
+    else:
+        sql_match = re.search(r"^\s*SQL:\s*(.*)$", text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+        sql = sql_match.group(1) if sql_match else text
+        if not sql_match and title_match:
+            sql = text[title_match.end():]
+    sql = sql.strip().rstrip(";").strip()
+    return {"title": title, "sql": sql or None}
+
+
+def _invoke(llm, prompt: str, callbacks: List[Any]) -> str:
+    response = llm.invoke(prompt, config={"callbacks": callbacks})
+    # Chat models return a message, plain LLMs a string
+    return str(getattr(response, "content", response))
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, SQLGuardError):
+        return f"{error.message}. {error.hint}"
+    return str(error).splitlines()[0]
+
+
+def generate_sql(llm, engine, snapshot: SchemaSnapshot, question: str, rules: str = "",
+                 callbacks: Optional[List[Any]] = None,
+                 cancel_token: Optional[CancelToken] = None,
+                 execute: Optional[Callable[[str, Optional[str]], Any]] = None) -> GeneratedSQL:
+    """
+    Ask the LLM for one SELECT statement, validate it locally and run it.
+
+    The statement must be a single SELECT/WITH query that SQLite can prepare
+    (checked with EXPLAIN, without running it). It is then passed to
+    `execute`, if given. When validation fails, or execution fails with a
+    SQL guard error (e.g. the timeout) or an SQLite error, the model gets
+    the error back for up to MAX_REPAIR_ROUNDS corrections.
+
+    Args:
+        llm: LangChain chat model or LLM
+        engine: SQLAlchemy engine bound to the SQLite database
+        snapshot: Current schema snapshot
+        question: Natural language question
+        rules: Extra prompt rules (field selection)
+        callbacks: LangChain callback handlers for the LLM calls
+        cancel_token: Optional token checked before every LLM call
+        execute: Called with (sql, title) once the statement validates; its
+            return value becomes GeneratedSQL.result
+
+    Returns:
+        GeneratedSQL with the validated (and executed) statement
+
+    Raises:
+        SQLGenerationError: If no valid statement was produced
+    """
+    callbacks = list(callbacks or [])
+    prompt = SINGLE_SHOT_PROMPT.format(schema=compact_schema(snapshot), rules=rules, question=question)
+    llm_calls = 0
+    last_error = None
+
+    for _ in range(1 + MAX_REPAIR_ROUNDS):
+        if cancel_token is not None:
+            cancel_token.check()
+        response = _invoke(llm, prompt, callbacks)
+        llm_calls += 1
+        parsed = parse_response(response)
+        sql = parsed["sql"]
+
+        try:
+            if not sql:
+                raise ValueError("No SQL statement found in the response")
+            validate_sql(engine, sql)
+        except Exception as e:
+            last_error = _error_text(e)
+            logger.info(f"🔧 Generated SQL failed validation ({last_error}), asking for a repair")
+            prompt = f"{prompt}\n\n{response}\n\n" + REPAIR_PROMPT.format(sql=sql or "", error=last_error)
+            continue
+
+        logger.info(f"🎯 Single-shot SQL validated after {llm_calls} LLM call(s): {sql}")
+        result = None
+        if execute is not None:
+            try:
+                result = execute(sql, parsed["title"])
+            except (SQLGuardError, OperationalError, sqlite3.OperationalError) as e:
+                last_error = _error_text(e)
+                logger.info(f"🔧 Generated SQL failed to run ({last_error}), asking for a repair")
+                prompt = f"{prompt}\n\n{response}\n\n" + REPAIR_PROMPT.format(sql=sql, error=last_error)
+                continue
+        return GeneratedSQL(sql=sql, title=parsed["title"], llm_calls=llm_calls, result=result)
+
+    raise SQLGenerationError(f"Could not generate working SQL: {last_error}")
@@ -0,0 +1,275 @@
+"""Per-request span tracing of pipeline stages, LLM calls and tool calls."""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio, used only when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+metrics.describe("query_duration_seconds", "End-to-end query_database latency by route")
+metrics.describe("queries_total", "Queries handled, by route and outcome")
+metrics.describe("stage_duration_seconds", "Latency of pipeline stages (caches, router, schema, agent, ...)")
+metrics.describe("llm_call_duration_seconds", "Latency of individual LLM calls")
+metrics.describe("llm_calls_total", "LLM calls made")
+metrics.describe("llm_tokens_total", "LLM tokens by direction; source=estimated when the provider reports none")
+metrics.describe("tool_call_duration_seconds", "Latency of agent tool calls by tool")
+metrics.describe("sql_execution_duration_seconds", "Latency of SQL executed directly against SQLite")
+metrics.describe("sql_rows_returned", "Rows returned per direct SQL execution",
+                 buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000))
+metrics.describe("sql_rows_returned_total", "Rows returned by direct SQL execution")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+@dataclass
+class Span:
+    """One timed stage of a request."""
+    name: str
+    start_ms: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        """Attach attributes, e.g. row counts, to the span."""
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """Spans and token counts collected while handling one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.tokens = {"input": 0, "output": 0}
+        self.tokens_estimated = False
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the trace started."""
+        return time.perf_counter() - self.started
+
+    def add(self, name: str, start: float, duration: float, **attributes) -> Span:
+        """
+        Record a finished span.
+
+        Args:
+            name: Stage name, e.g. "llm" or "tool:sql_db_query"
+            start: time.perf_counter() value when the stage began
+            duration: Stage duration in seconds
+            **attributes: Extra span attributes
+
+        Returns:
+            The recorded Span
+        """
+        span = Span(name=name, start_ms=round((start - self.started) * 1000, 3),
+                    duration_ms=round(duration * 1000, 3), attributes=attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def add_tokens(self, input_tokens: int, output_tokens: int, estimated: bool):
+        with self._lock:
+            self.tokens["input"] += input_tokens
+            self.tokens["output"] += output_tokens
+            self.tokens_estimated = self.tokens_estimated or estimated
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the per-request timing breakdown.
+
+        Returns:
+            Dictionary with total_ms, per-stage totals, the individual spans and token counts
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] = round(stage["total_ms"] + span.duration_ms, 3)
+        return {
+            "total_ms": round(self.elapsed * 1000, 3),
+            "stages": stages,
+            "spans": [
+                {"name": s.name, "start_ms": s.start_ms, "duration_ms": s.duration_ms, **s.attributes}
+                for s in sorted(spans, key=lambda s: s.start_ms)
+            ],
+            "tokens": dict(self.tokens, estimated=self.tokens_estimated),
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace of the request being handled on this context, if any."""
+    return _current.get()
+
+
+@contextmanager
+def trace_request() -> Iterator[Trace]:
+    """
+    Start a trace for a request, or join the one already active.
+
+    Yields:
+        The active Trace
+    """
+    trace = _current.get()
+    if trace is not None:
+        yield trace
+        return
+    trace = Trace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, metric: str = "stage_duration_seconds", **labels) -> Iterator[Span]:
+    """
+    Time a block as a stage of the current request.
+
+    The duration is always exported as a histogram; the span is added to
+    the current trace only when one is active.
+
+    Args:
+        name: Stage name
+        metric: Histogram to record the duration in
+        **labels: Histogram labels (defaults to stage=name)
+
+    Yields:
+        Span whose attributes can be set inside the block
+    """
+    start = time.perf_counter()
+    current = Span(name=name, start_ms=0.0)
+    try:
+        yield current
+    finally:
+        duration = time.perf_counter() - start
+        metrics.observe(metric, duration, **(labels or {"stage": name}))
+        trace = _current.get()
+        if trace is not None:
+            trace.add(name, start, duration, **current.attributes)
+
+
+def record_sql_rows(span_: Span, rows: int):
+    """Attach a row count to a SQL span and export it."""
+    span_.set(rows=rows)
+    metrics.observe("sql_rows_returned", rows)
+    metrics.increment("sql_rows_returned_total", rows)
+
+
+def _reported_usage(response: Any) -> Optional[Dict[str, int]]:
+    """Token usage reported by the provider, if any, from an LLMResult."""
+    candidates = [getattr(response, "llm_output", None) or {}]
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            candidates.append(generation.generation_info or {})
+            message = getattr(generation, "message", None)
+            if message is not None:
+                candidates.append(getattr(message, "usage_metadata", None) or {})
+                candidates.append(getattr(message, "response_metadata", None) or {})
+    for candidate in candidates:
+        usage = candidate.get("token_usage") or candidate.get("usage_metadata") or candidate.get("usage") or candidate
+        if not isinstance(usage, dict):
+            continue
+        input_tokens = usage.get("prompt_tokens", usage.get("input_tokens", usage.get("prompt_token_count")))
+        output_tokens = usage.get("completion_tokens",
+                                  usage.get("output_tokens", usage.get("candidates_token_count")))
+        if input_tokens is not None or output_tokens is not None:
+            return {"input": int(input_tokens or 0), "output": int(output_tokens or 0)}
+    return None
+
+
+def _response_text(response: Any) -> str:
+    texts = []
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            texts.append(getattr(generation, "text", "") or "")
+    return "".join(texts)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that times LLM and tool calls and counts tokens.
+
+    It holds the request's Trace directly, so it also works when LangChain
+    runs callbacks on another thread.
+    """
+
+    def __init__(self, trace: Optional[Trace] = None):
+        self._trace = trace or current_trace()
+        self._llm_runs: Dict[UUID, tuple] = {}
+        self._tool_runs: Dict[UUID, tuple] = {}
+
+    def _start_llm(self, serialized: Dict[str, Any], prompt_chars: int, run_id: UUID):
+        kwargs = (serialized or {}).get("kwargs", {})
+        model = kwargs.get("model") or kwargs.get("model_name") or (serialized or {}).get("name") or "unknown"
+        self._llm_runs[run_id] = (time.perf_counter(), model, prompt_chars)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._start_llm(serialized, sum(len(p) for p in prompts), run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            **kwargs: Any):
+        chars = sum(len(str(getattr(m, "content", m))) for batch in messages for m in batch)
+        self._start_llm(serialized, chars, run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        start, model, prompt_chars = run
+        duration = time.perf_counter() - start
+
+        usage = _reported_usage(response)
+        estimated = usage is None
+        if estimated:
+            usage = {"input": prompt_chars // CHARS_PER_TOKEN,
+                     "output": len(_response_text(response)) // CHARS_PER_TOKEN}
+        source = "estimated" if estimated else "reported"
+
+        metrics.observe("llm_call_duration_seconds", duration, model=model)
+        metrics.increment("llm_calls_total", model=model)
+        metrics.increment("llm_tokens_total", usage["input"], direction="input", source=source)
+        metrics.increment("llm_tokens_total", usage["output"], direction="output", source=source)
+        if self._trace is not None:
+            self._trace.add("llm", start, duration, model=model, input_tokens=usage["input"],
+                            output_tokens=usage["output"], tokens_estimated=estimated)
+            self._trace.add_tokens(usage["input"], usage["output"], estimated)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        run = self._llm_runs.pop(run_id, None)
+        if run is not None and self._trace is not None:
+            self._trace.add("llm", run[0], time.perf_counter() - run[0], model=run[1], error=str(error)[:200])
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._tool_runs[run_id] = (time.perf_counter(), (serialized or {}).get("name", "unknown"))
+
+    def _end_tool(self, run_id: UUID, **attributes):
+        run = self._tool_runs.pop(run_id, None)
+        if run is None:
+            return
+        start, tool = run
+        duration = time.perf_counter() - start
+        metrics.observe("tool_call_duration_seconds", duration, tool=tool)
+        if self._trace is not None:
+            self._trace.add(f"tool:{tool}", start, duration, **attributes)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id, error=str(output).startswith("Error:"))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id, error=True)
@@ -0,0 +1 @@
+"""Offline performance benchmarks for the employee database query app."""
@@ -0,0 +1,103 @@
+"""
+Benchmark SQL execution latency for the agent's database engines.
+
+Compares three setups on the same representative queries:
+  * per-request: a default engine created for every query (the old behaviour)
+  * default:     one default SQLAlchemy engine reused across queries
+  * read-only:   the tuned, pooled, read-only engine from app/database.py
+
+Usage:
+    python -m benchmarks.engine_latency [--db PATH] [--iterations N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from sqlalchemy import create_engine, text
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from database import DB_PATH, create_db_engine  # noqa: E402
+from benchmarks.report import percentile  # noqa: E402
+
+QUERIES = {
+    "department join": """
+        SELECT e.first_name, e.last_name, d.name
+        FROM employees e JOIN departments d ON e.department_id = d.id
+        WHERE d.name = 'Engineering'
+    """,
+    "skill + proficiency": """
+        SELECT e.first_name, e.last_name, s.name, es.proficiency_level
+        FROM employees e
+        JOIN employee_skills es ON e.id = es.employee_id
+        JOIN skills s ON es.skill_id = s.id
+        WHERE s.name = 'Python' AND es.proficiency_level IN ('Advanced', 'Expert')
+    """,
+    "salary by level": """
+        SELECT eh.level, COUNT(*), AVG(e.salary)
+        FROM employee_hierarchy eh JOIN employees e ON eh.employee_id = e.id
+        GROUP BY eh.level
+    """,
+    "reports of managers": """
+        SELECT m.first_name, m.last_name, COUNT(*)
+        FROM employee_hierarchy eh JOIN employees m ON eh.manager_id = m.id
+        GROUP BY eh.manager_id ORDER BY COUNT(*) DESC
+    """,
+}
+
+
+def _run(engine, sql):
+    with engine.connect() as connection:
+        return connection.execute(text(sql)).fetchall()
+
+
+def measure(runners, iterations):
+    """
+    Time every runner on every query and return latencies in ms.
+
+    Runners are interleaved within each iteration so that background noise
+    affects all of them equally.
+    """
+    results = {label: {name: [] for name in QUERIES} for label in runners}
+    for name, sql in QUERIES.items():
+        for run in runners.values():
+            run(sql)  # warm up
+        for _ in range(iterations):
+            for label, run in runners.items():
+                start = time.perf_counter()
+                run(sql)
+                results[label][name].append((time.perf_counter() - start) * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database to benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="Runs per query")
+    args = parser.parse_args()
+
+    default_engine = create_engine(f"sqlite:///{args.db}")
+    readonly_engine = create_db_engine(args.db)
+
+    results = measure({
+        "per-request": lambda sql: _run(create_engine(f"sqlite:///{args.db}"), sql),
+        "default": lambda sql: _run(default_engine, sql),
+        "read-only": lambda sql: _run(readonly_engine, sql),
+    }, args.iterations)
+
+    print(f"\n{'Query':<22} {'Engine':<12} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    print("-" * 65)
+    for name in QUERIES:
+        for label, by_query in results.items():
+            samples = by_query[name]
+            print(f"{name:<22} {label:<12} {statistics.mean(samples):>9.3f} "
+                  f"{percentile(samples, 50):>9.3f} {percentile(samples, 95):>9.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Scripted stand-in for the Gemini chat model, so the app can be driven offline.
+
+The model recognises the question in the prompt ("User query: ..." in both
+the agent and the single-shot prompts) and replays a script for it:
+
+  * agent (ReAct) prompts: list tables, read the schema of the question's
+    tables, run its SQL, then give the title as the final answer. The step
+    is the number of observations already in the agent scratchpad.
+  * single-shot prompts: "TITLE: ...\\nSQL:\\n..." in one response.
+
+A corpus entry may also carry its own "steps" (raw ReAct responses) to
+script longer or wrong agent runs. Unknown questions get a final answer
+straight away.
+
+Usage:
+    from agent_registry import registry
+    registry.set_llm_factory(scripted_llm_factory(load_corpus()))
+"""
+
+import os
+import re
+import sys
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from answer_cache import normalize_question  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.json")
+
+_USER_QUERY = re.compile(r"User query:\s*(.+)")
+# Marker of the single-shot response format, see app/text_to_sql.py
+_SINGLE_SHOT_MARKER = "TITLE: <"
+_FINAL_ANSWER = "Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, Any]]:
+    """
+    Load a question corpus.
+
+    Args:
+        path: JSON file with a list of {question, title, tables, sql[, steps]} entries
+
+    Returns:
+        List of corpus entries
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def agent_steps(entry: Dict[str, Any]) -> List[str]:
+    """
+    Return the ReAct responses the stand-in gives for a corpus entry.
+
+    Args:
+        entry: Corpus entry
+
+    Returns:
+        One raw LLM response per agent step, the last being the final answer
+    """
+    if entry.get("steps"):
+        return list(entry["steps"])
+    return [
+        "Thought: I should look at the tables in the database to see what I can query.\n"
+        "Action: sql_db_list_tables\nAction Input: ",
+        "Thought: I should query the schema of the most relevant tables.\n"
+        f"Action: sql_db_schema\nAction Input: {', '.join(entry['tables'])}",
+        "Thought: I can now write the query.\n"
+        f"Action: sql_db_query\nAction Input: {entry['sql']}",
+        _FINAL_ANSWER.format(answer=entry["title"]),
+    ]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that replays scripted responses for known questions.
+
+    Attributes:
+        scripts: Corpus entries keyed by normalized question
+        latency_seconds: Sleep per call, to stand in for network and model time
+    """
+
+    scripts: Dict[str, Dict[str, Any]]
+    latency_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": "scripted"}
+
+    def respond(self, prompt: str) -> str:
+        """
+        Return the scripted response to a prompt.
+
+        Args:
+            prompt: Full prompt text, including any agent scratchpad
+
+        Returns:
+            Raw model response
+        """
+        match = _USER_QUERY.search(prompt)
+        entry = self.scripts.get(normalize_question(match.group(1))) if match else None
+        if entry is None:
+            return _FINAL_ANSWER.format(answer="I don't know how to answer that question.")
+
+        if _SINGLE_SHOT_MARKER in prompt:
+            return f"TITLE: {entry['title']}\nSQL:\n{entry['sql']}"
+
+        # Observations after the question are the steps already taken
+        step = prompt[match.end():].count("\nObservation:")
+        steps = agent_steps(entry)
+        return steps[min(step, len(steps) - 1)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        prompt = "\n".join(str(message.content) for message in messages)
+        message = AIMessage(content=self.respond(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def scripted_llm_factory(corpus: List[Dict[str, Any]], latency_seconds: float = 0.0):
+    """
+    Build an LLM factory for AgentRegistry.set_llm_factory that ignores model and API key.
+
+    Args:
+        corpus: Corpus entries to script
+        latency_seconds: Simulated latency per LLM call
+
+    Returns:
+        Callable taking (model, api_key) and returning a ScriptedChatModel
+    """
+    scripts = {normalize_question(entry["question"]): entry for entry in corpus}
+
+    def factory(model: str, api_key: str) -> ScriptedChatModel:
+        return ScriptedChatModel(scripts=scripts, latency_seconds=latency_seconds)
+
+    return factory
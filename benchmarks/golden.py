@@ -0,0 +1,253 @@
+"""
+Golden-question accuracy and cost harness.
+
+Runs every question in benchmarks/golden.json through query_database(),
+executes the SQL that answered it and compares the rows with those of the
+question's reference SQL. Each question reports its answer route,
+correctness, LLM iterations, tool calls, tokens in/out and wall time.
+
+The LLM is pluggable:
+  * scripted (default): the deterministic stand-in from benchmarks.fake_llm,
+    replaying each question's scripted_sql (or reference_sql) and steps, so
+    the harness runs in CI without network
+  * gemini: the app's Gemini model (needs --api-key or GOOGLE_API_KEY)
+  * package.module:factory: any callable taking (model, api_key)
+
+Rows are compared as unordered multisets, with floats rounded to
+FLOAT_DIGITS places. An answer with extra columns still counts as correct
+when every reference column is present by name (a "projected" match).
+The answer and plan caches are cleared before every question.
+
+Usage:
+    python -m benchmarks.golden [--llm scripted|gemini|module:factory] [--engine agent|single_shot]
+                                [--golden PATH] [--api-key KEY] [--output PATH] [--min-accuracy X]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from benchmarks.fake_llm import scripted_llm_factory
+
+# benchmarks.fake_llm has put app/ on sys.path
+from agent_registry import gemini_llm_factory, registry
+from answer_cache import answer_cache
+from plan_cache import plan_cache
+from sql_agent import ENGINES, query_database
+from sql_runner import execute_sql
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden.json")
+
+# Decimal places floats are rounded to before rows are compared
+FLOAT_DIGITS = 2
+
+
+def load_golden(path: str = GOLDEN_PATH) -> List[Dict[str, Any]]:
+    """
+    Load the golden questions.
+
+    Args:
+        path: JSON file with a list of {id, question, reference_sql, tables[, scripted_sql, steps]}
+
+    Returns:
+        List of golden entries
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def scripted_corpus(golden: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn golden entries into the corpus format the scripted stand-in replays."""
+    return [
+        {
+            "question": entry["question"],
+            "title": entry.get("title", entry["question"]),
+            "tables": entry["tables"],
+            "sql": entry.get("scripted_sql", entry["reference_sql"]),
+            "steps": entry.get("steps"),
+        }
+        for entry in golden
+    ]
+
+
+def resolve_llm_factory(spec: str, golden: List[Dict[str, Any]]):
+    """
+    Return the LLM factory named on the command line.
+
+    Args:
+        spec: "scripted", "gemini" or "package.module:callable"
+        golden: Golden entries, used to script the stand-in
+
+    Returns:
+        Callable taking (model, api_key) and returning a LangChain LLM
+    """
+    if spec == "scripted":
+        return scripted_llm_factory(scripted_corpus(golden))
+    if spec == "gemini":
+        return gemini_llm_factory
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Expected 'scripted', 'gemini' or 'module:factory', got '{spec}'")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, float):
+        value = round(value, FLOAT_DIGITS)
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def _row_counter(rows: Sequence[Sequence[Any]]) -> Counter:
+    return Counter(tuple(_normalize_value(value) for value in row) for row in rows)
+
+
+def compare_results(reference_columns: List[str], reference_rows: Sequence[Sequence[Any]],
+                    columns: List[str], rows: Sequence[Sequence[Any]]) -> Optional[str]:
+    """
+    Compare an answer's rows with the reference rows, ignoring row order.
+
+    Args:
+        reference_columns: Column names of the reference result
+        reference_rows: Rows of the reference result
+        columns: Column names of the answer
+        rows: Rows of the answer
+
+    Returns:
+        "exact" if the rows match, "projected" if they match after keeping only
+        the reference columns, or None if the answer is wrong
+    """
+    expected = _row_counter(reference_rows)
+    if _row_counter(rows) == expected:
+        return "exact"
+
+    lookup = {name.lower(): index for index, name in enumerate(columns)}
+    indexes = [lookup.get(name.lower()) for name in reference_columns]
+    if len(indexes) < len(columns) and None not in indexes:
+        if _row_counter([[row[index] for index in indexes] for row in rows]) == expected:
+            return "projected"
+    return None
+
+
+def evaluate(entry: Dict[str, Any], api_key: str, engine: str) -> Dict[str, Any]:
+    """
+    Answer one golden question and score it.
+
+    Args:
+        entry: Golden entry
+        api_key: API key passed to the LLM factory
+        engine: "agent" or "single_shot"
+
+    Returns:
+        Dictionary with id, route, correct, match, iterations, tool_calls,
+        input/output tokens, wall_ms, sql and error
+    """
+    answer_cache.clear()
+    plan_cache.clear()
+    reference_columns, reference_rows = execute_sql(registry.engine, entry["reference_sql"])
+
+    start = time.perf_counter()
+    response = query_database(entry["question"], api_key, structured=True, engine=engine, timings=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    stages = response["timings"]["stages"]
+    tokens = response["timings"]["tokens"]
+    outcome = {
+        "id": entry["id"],
+        "route": response.get("route", "error"),
+        "correct": False,
+        "match": None,
+        "iterations": stages.get("llm", {}).get("count", 0),
+        "tool_calls": sum(stage["count"] for name, stage in stages.items() if name.startswith("tool:")),
+        "input_tokens": tokens["input"],
+        "output_tokens": tokens["output"],
+        "tokens_estimated": tokens["estimated"],
+        "wall_ms": round(wall_ms, 1),
+        "sql": response.get("sql"),
+        "error": response.get("error"),
+    }
+    if not response["success"]:
+        return outcome
+    if not outcome["sql"]:
+        outcome["error"] = "The answer ran no SQL"
+        return outcome
+
+    try:
+        columns, rows = execute_sql(registry.engine, outcome["sql"], params=response.get("params"))
+    except Exception as e:
+        outcome["error"] = str(e).splitlines()[0]
+        return outcome
+    outcome["match"] = compare_results(reference_columns, reference_rows, columns, rows)
+    outcome["correct"] = outcome["match"] is not None
+    return outcome
+
+
+def display_results(results: List[Dict[str, Any]]):
+    """Print the per-question table and the totals."""
+    print("\n" + "=" * 70)
+    print("GOLDEN QUESTIONS")
+    print("=" * 70)
+    print(f"{'Question':<22} {'Route':<12} {'Correct':<10} {'Iters':>5} {'Tools':>5} "
+          f"{'Tok in':>8} {'Tok out':>8} {'Wall ms':>9}")
+    print("-" * 86)
+    for r in results:
+        correct = r["match"] or ("no" if r["error"] is None else "error")
+        print(f"{r['id']:<22} {r['route']:<12} {correct:<10} {r['iterations']:>5} {r['tool_calls']:>5} "
+              f"{r['input_tokens']:>8} {r['output_tokens']:>8} {r['wall_ms']:>9.1f}")
+
+    total = len(results)
+    correct = sum(1 for r in results if r["correct"])
+    print("-" * 86)
+    print(f"Accuracy: {correct}/{total} ({correct / total:.0%})")
+    print(f"LLM iterations: {sum(r['iterations'] for r in results)} "
+          f"(mean {sum(r['iterations'] for r in results) / total:.2f} per question)")
+    estimated = " (estimated)" if any(r["tokens_estimated"] for r in results) else ""
+    print(f"Tokens{estimated}: {sum(r['input_tokens'] for r in results)} in, "
+          f"{sum(r['output_tokens'] for r in results)} out")
+    print(f"Wall time: {sum(r['wall_ms'] for r in results) / 1000:.2f} s total")
+
+    for r in results:
+        if r["error"]:
+            print(f"  ❌ {r['id']}: {r['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", default="scripted", help="scripted, gemini or package.module:factory")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINES[0], help="LLM engine to evaluate")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden questions file")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY", "golden"),
+                        help="API key for the LLM factory (default: $GOOGLE_API_KEY)")
+    parser.add_argument("--output", help="Write per-question results as JSON to this file")
+    parser.add_argument("--min-accuracy", type=float, default=0.0,
+                        help="Exit with status 1 if accuracy is below this fraction")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    golden = load_golden(args.golden)
+    registry.set_llm_factory(resolve_llm_factory(args.llm, golden))
+    # Build the agent up front so the first question's wall time is comparable
+    registry.get(args.api_key)
+    results = [evaluate(entry, args.api_key, args.engine) for entry in golden]
+    display_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+    accuracy = sum(1 for r in results if r["correct"]) / len(results)
+    sys.exit(1 if accuracy < args.min_accuracy else 0)
+
+
+if __name__ == "__main__":
+    main()
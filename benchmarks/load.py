@@ -0,0 +1,179 @@
+"""
+Offline load test of the query path with the scripted stand-in LLM.
+
+Drives query_database() directly, or the Flask /api/query endpoint through
+the test client, at one or more concurrency levels. Reports latency
+percentiles and throughput for every level, overall and per answer route
+(router, answer_cache, plan_cache, agent, single_shot).
+
+By default the answer and plan caches are cleared before every request, so
+questions the intent router does not handle go through the LLM engine each
+time; --warm keeps them. --llm-latency-ms adds a sleep to every LLM call to
+stand in for Gemini's response time.
+
+Usage:
+    python -m benchmarks.load [--mode direct|http] [--concurrency 1,4,8] [--requests N]
+                              [--engine agent|single_shot] [--format json|markdown] [--warm]
+                              [--llm-latency-ms MS] [--corpus PATH] [--output PATH]
+                              [--check] [--thresholds PATH]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_llm import CORPUS_PATH, load_corpus, scripted_llm_factory
+from benchmarks.report import check_thresholds, format_table, load_thresholds, summarize
+
+# benchmarks.fake_llm has put app/ on sys.path
+from agent_registry import registry
+from answer_cache import answer_cache
+from plan_cache import plan_cache
+from sql_agent import ENGINES, query_database
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+# Any non-empty key works with the scripted LLM
+API_KEY = "benchmark"
+
+
+def direct_runner(engine: str, structured: bool):
+    """Return a runner that calls query_database() in-process."""
+    def run(question):
+        result = query_database(question, API_KEY, structured=structured, engine=engine)
+        return result["success"], result.get("route") or "error"
+    return run
+
+
+def http_runner(engine: str, structured: bool):
+    """Return a runner that posts to /api/query through Flask's test client."""
+    import app as app_module
+    from settings_store import SettingsStore
+
+    # Keep the benchmark API key out of the real app/settings.json
+    settings_dir = tempfile.mkdtemp(prefix="benchmark-settings-")
+    app_module.settings_store = SettingsStore(os.path.join(settings_dir, "settings.json"))
+    app_module.settings_store.update({"api_key": API_KEY})
+
+    clients = threading.local()
+    body = {"format": "json" if structured else "markdown", "engine": engine}
+
+    def run(question):
+        if not hasattr(clients, "client"):
+            clients.client = app_module.app.test_client()
+        response = clients.client.post("/api/query", json=dict(body, query=question))
+        payload = response.get_json() or {}
+        return response.status_code == 200, payload.get("route") or "error"
+    return run
+
+
+def run_batch(run, questions, concurrency: int, warm: bool):
+    """
+    Send every question once, concurrency at a time.
+
+    Returns:
+        Tuple of ([(latency_ms, success, route)], wall-clock seconds)
+    """
+    def one(question):
+        if not warm:
+            answer_cache.clear()
+            plan_cache.clear()
+        start = time.perf_counter()
+        try:
+            success, route = run(question)
+        except Exception:
+            success, route = False, "error"
+        return (time.perf_counter() - start) * 1000, success, route
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, questions))
+    return samples, time.perf_counter() - start
+
+
+def summarize_batch(samples, wall_seconds):
+    """Overall and per-route summaries of one batch."""
+    by_route = defaultdict(list)
+    for latency, success, route in samples:
+        by_route[route].append((latency, success))
+    return {
+        "overall": summarize([s[0] for s in samples], wall_seconds, sum(1 for s in samples if not s[1])),
+        "routes": {
+            route: summarize([s[0] for s in items], wall_seconds, sum(1 for s in items if not s[1]))
+            for route, items in sorted(by_route.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("direct", "http"), default="direct",
+                        help="Call query_database() or POST /api/query")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINES[0], help="LLM engine to benchmark")
+    parser.add_argument("--format", choices=("json", "markdown"), default="json", help="Response format")
+    parser.add_argument("--warm", action="store_true", help="Keep the answer and plan caches between requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per LLM call")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="Question corpus with scripted SQL")
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a threshold is exceeded")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH, help="Regression thresholds file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    corpus = load_corpus(args.corpus)
+    registry.set_llm_factory(scripted_llm_factory(corpus, args.llm_latency_ms / 1000))
+    structured = args.format == "json"
+    run = (http_runner if args.mode == "http" else direct_runner)(args.engine, structured)
+
+    # Build the agent and reflect the schema before measuring
+    for entry in corpus:
+        run(entry["question"])
+
+    questions = [corpus[i % len(corpus)]["question"] for i in range(args.requests)]
+    report = {"config": vars(args), "runs": []}
+    rows = []
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        samples, wall_seconds = run_batch(run, questions, concurrency, args.warm)
+        summary = summarize_batch(samples, wall_seconds)
+        report["runs"].append(dict(summary, concurrency=concurrency))
+        rows.append(dict(summary["overall"], label=f"c={concurrency} all"))
+        rows.extend(dict(s, label=f"c={concurrency} {route}") for route, s in summary["routes"].items())
+
+    print("\n" + "=" * 70)
+    print(f"LOAD TEST: mode={args.mode} engine={args.engine} format={args.format} "
+          f"{'warm' if args.warm else 'cold'} caches, {args.llm_latency_ms:g} ms per LLM call")
+    print("=" * 70)
+    print(format_table(rows))
+
+    violations = []
+    if args.check:
+        limits = load_thresholds(args.thresholds).get(args.mode, {})
+        for run_summary in report["runs"]:
+            violations.extend(f"c={run_summary['concurrency']}: {violation}"
+                              for violation in check_thresholds(run_summary["overall"], limits))
+        report["violations"] = violations
+        print("\n" + ("❌ Threshold violations:\n  " + "\n  ".join(violations) if violations
+                      else "✅ All runs within thresholds"))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Latency percentiles, throughput summaries and regression thresholds for benchmark runs."""
+
+import json
+import statistics
+from typing import Any, Dict, List, Sequence
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies_ms: Sequence[float], wall_seconds: float, errors: int = 0) -> Dict[str, Any]:
+    """
+    Summarize one batch of requests.
+
+    Args:
+        latencies_ms: Per-request latencies in milliseconds
+        wall_seconds: Wall-clock time the whole batch took
+        errors: Number of failed requests
+
+    Returns:
+        Dictionary with requests, errors, error_rate, throughput_rps, mean/max and pNN latencies in ms
+    """
+    requests = len(latencies_ms)
+    summary = {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(requests / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+    if requests:
+        summary["mean_ms"] = round(statistics.mean(latencies_ms), 3)
+        summary["max_ms"] = round(max(latencies_ms), 3)
+        for pct in PERCENTILES:
+            summary[f"p{pct}_ms"] = round(percentile(latencies_ms, pct), 3)
+    return summary
+
+
+def format_table(rows: List[Dict[str, Any]], label: str = "Run") -> str:
+    """
+    Render summaries as a fixed-width text table.
+
+    Args:
+        rows: Summaries, each with a "label" key
+        label: Header of the label column
+
+    Returns:
+        Table text
+    """
+    header = (f"{label:<28} {'Reqs':>6} {'Errs':>5} {'RPS':>8} {'Mean ms':>9} "
+              + " ".join(f"{'p' + str(pct) + ' ms':>9}" for pct in PERCENTILES))
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        line = (f"{row['label']:<28} {row['requests']:>6} {row['errors']:>5} {row['throughput_rps']:>8.2f} "
+                f"{row.get('mean_ms', 0):>9.2f} "
+                + " ".join(f"{row.get(f'p{pct}_ms', 0):>9.2f}" for pct in PERCENTILES))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load_thresholds(path: str) -> Dict[str, Dict[str, float]]:
+    """Load a thresholds file: {mode: {metric: limit}}."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def check_thresholds(summary: Dict[str, Any], limits: Dict[str, float]) -> List[str]:
+    """
+    Compare a summary with regression limits.
+
+    Limits named "min_<metric>" are lower bounds, every other limit is an
+    upper bound on the metric of the same name.
+
+    Args:
+        summary: Output of summarize()
+        limits: e.g. {"p95_ms": 500, "min_throughput_rps": 20, "error_rate": 0}
+
+    Returns:
+        Human-readable violations, empty if the summary is within limits
+    """
+    violations = []
+    for name, limit in limits.items():
+        if name.startswith("min_"):
+            metric = name[len("min_"):]
+            value = summary.get(metric)
+            if value is not None and value < limit:
+                violations.append(f"{metric} {value} is below the minimum of {limit}")
+        else:
+            value = summary.get(name)
+            if value is not None and value > limit:
+                violations.append(f"{name} {value} is above the limit of {limit}")
+    return violations
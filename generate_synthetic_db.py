@@ -0,0 +1,399 @@
+"""
+Generate a synthetic employee database at benchmark scale (100k to 10M employees).
+
+The schema matches employee_database.db after all add_*.py scripts have run:
+a CEO -> VP -> Director -> Manager -> IC hierarchy with level-based salaries
+and job titles, @datamint.app emails, skills and project assignments.
+
+Names come from Faker pools drawn once up front, per-row values from one
+seeded random.Random, and rows are streamed into batched executemany calls
+with one transaction per table and bulk-load pragmas. The same --seed and
+--scale always produce the same database.
+
+Usage:
+    python generate_synthetic_db.py --scale 1m --seed 42 --output synthetic_employee_database.db
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from collections import Counter
+from datetime import date, timedelta
+
+from faker import Faker
+
+from add_emails import email_local_part
+from add_hierarchy import SALARY_RANGES, create_closure_table, create_hierarchy_table, refresh_closure
+from add_indexes import create_indexes
+from add_job_titles import JOB_TITLES
+from add_skills import PROFICIENCY_LEVELS, SKILLS
+from add_summaries import create_summary_tables, create_summary_triggers, refresh_summaries
+
+DEFAULT_OUTPUT = "synthetic_employee_database.db"
+DEFAULT_SCALE = 100_000
+DEFAULT_SEED = 42
+MIN_SCALE = 100
+
+# Rows per executemany call
+BATCH_SIZE = 50_000
+
+# Pragmas for the duration of the load: no journal, no fsync, big page cache
+BULK_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "temp_store": "MEMORY",
+    "cache_size": -262144,  # 256 MB (negative means KiB)
+}
+
+# Same ids and names as create_employee_db.py
+DEPARTMENTS = ["Human Resources", "Engineering", "Sales", "Marketing"]
+
+# Span of control: employees per director and per manager within a department
+EMPLOYEES_PER_DIRECTOR = 1000
+EMPLOYEES_PER_MANAGER = 10
+
+# Distinct names drawn from Faker; combinations are picked at random per row
+NAME_POOL_DRAWS = 5000
+
+HIRE_DATE_START = date(2015, 1, 1)
+HIRE_DATE_DAYS = 11 * 365
+
+EMPLOYEES_PER_PROJECT = 50
+PROJECT_SHARE = 0.3  # fraction of employees assigned to projects
+PROJECT_AREAS = ["Website Redesign", "Mobile App Development", "Data Analytics Platform", "Customer Portal",
+                 "Cloud Migration", "Billing Platform", "Security Audit", "Internal Tools"]
+PROJECT_ROLES = {
+    "Human Resources": ["Coordinator", "Data Analyst", "Project Manager"],
+    "Engineering": ["Developer", "Lead Developer", "QA Engineer", "Designer"],
+    "Sales": ["Sales Lead", "Sales Associate", "Account Manager"],
+    "Marketing": ["Marketing Specialist", "Designer", "Content Writer"],
+}
+
+def parse_scale(value):
+    """Parse an employee count such as 250000, 100k or 2.5M"""
+    text = value.strip().lower().replace("_", "")
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    try:
+        scale = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid scale '{value}'")
+    if scale < MIN_SCALE:
+        raise argparse.ArgumentTypeError(f"scale must be at least {MIN_SCALE}")
+    return scale
+
+class OrgLayout:
+    """
+    Closed-form org chart, so employees can be generated as a stream.
+
+    Ids are laid out top-down: the CEO is 1, followed by one VP per
+    department, the directors, the managers and finally the individual
+    contributors. Leaders are interleaved by department; each IC reports to
+    a random manager of their own department.
+    """
+
+    def __init__(self, employees, departments=len(DEPARTMENTS)):
+        self.departments = departments
+        per_department = employees // departments
+        self.directors = max(1, per_department // EMPLOYEES_PER_DIRECTOR)
+        self.managers = max(self.directors, per_department // EMPLOYEES_PER_MANAGER)
+        self.director_start = 2 + departments
+        self.manager_start = self.director_start + departments * self.directors
+        self.ic_start = self.manager_start + departments * self.managers
+
+    def level_sql(self, column="id"):
+        """SQL expression giving the level of the employee whose id is in column"""
+        return (f"CASE WHEN {column} = 1 THEN 'CEO' "
+                f"WHEN {column} < {self.director_start} THEN 'VP' "
+                f"WHEN {column} < {self.manager_start} THEN 'Director' "
+                f"WHEN {column} < {self.ic_start} THEN 'Manager' ELSE 'IC' END")
+
+    def department(self, employee_id):
+        """Department index of an employee id"""
+        if employee_id == 1:
+            return DEPARTMENTS.index("Engineering")
+        if employee_id < self.director_start:
+            return employee_id - 2
+        if employee_id < self.manager_start:
+            return (employee_id - self.director_start) % self.departments
+        if employee_id < self.ic_start:
+            return (employee_id - self.manager_start) % self.departments
+        return (employee_id - self.ic_start) % self.departments
+
+    def position(self, employee_id, rng):
+        """Return (level, department index, manager id) for an employee id"""
+        d = self.departments
+        department = self.department(employee_id)
+        if employee_id == 1:
+            return "CEO", department, None
+        if employee_id < self.director_start:
+            return "VP", department, 1
+        if employee_id < self.manager_start:
+            return "Director", department, 2 + department
+        if employee_id < self.ic_start:
+            slot = (employee_id - self.manager_start) // d
+            return "Manager", department, self.director_start + (slot % self.directors) * d + department
+        return "IC", department, self.manager_start + rng.randrange(self.managers) * d + department
+
+def apply_bulk_pragmas(conn):
+    """Switch the connection to bulk-load settings"""
+    for name, value in BULK_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    print("⚙️  Bulk-load pragmas: " + ", ".join(f"{k}={v}" for k, v in BULK_PRAGMAS.items()))
+
+def create_schema(conn):
+    """Create the base tables with the columns the add_*.py scripts add"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE departments (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            hire_date DATE,
+            department_id INTEGER,
+            manager_id INTEGER, salary REAL, job_title TEXT,
+            FOREIGN KEY (department_id) REFERENCES departments (id),
+            FOREIGN KEY (manager_id) REFERENCES employees (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE projects (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            start_date DATE,
+            end_date DATE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE employee_projects (
+            employee_id INTEGER,
+            project_id INTEGER,
+            role TEXT,
+            PRIMARY KEY (employee_id, project_id),
+            FOREIGN KEY (employee_id) REFERENCES employees (id),
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE skills (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE employee_skills (
+            employee_id INTEGER,
+            skill_id INTEGER,
+            proficiency_level TEXT CHECK(proficiency_level IN ('Beginner', 'Intermediate', 'Advanced', 'Expert')),
+            PRIMARY KEY (employee_id, skill_id),
+            FOREIGN KEY (employee_id) REFERENCES employees (id),
+            FOREIGN KEY (skill_id) REFERENCES skills (id)
+        )
+    """)
+    create_hierarchy_table(conn)
+    cursor.executemany("INSERT INTO departments (id, name) VALUES (?, ?)", list(enumerate(DEPARTMENTS, 1)))
+    cursor.executemany("INSERT INTO skills (id, name) VALUES (?, ?)", list(enumerate(SKILLS, 1)))
+    conn.commit()
+    print("✅ Created schema, departments and skills")
+
+def name_pools(seed):
+    """Draw the first and last names rows are built from"""
+    fake = Faker()
+    Faker.seed(seed)
+    first_names = sorted({fake.first_name() for _ in range(NAME_POOL_DRAWS)})
+    last_names = sorted({fake.last_name() for _ in range(NAME_POOL_DRAWS)})
+    return first_names, last_names
+
+def insert_batched(conn, sql, rows, label):
+    """Stream rows into executemany calls of BATCH_SIZE inside one transaction"""
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+    if batch:
+        cursor.executemany(sql, batch)
+        total += len(batch)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Inserted {total:,} {label} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total
+
+def generate_employees(scale, layout, first_names, last_names, rng):
+    """Yield employee rows in id order"""
+    seen_names = Counter()
+    choice, randrange, randint = rng.choice, rng.randrange, rng.randint
+    for employee_id in range(1, scale + 1):
+        level, department, manager_id = layout.position(employee_id, rng)
+        department_name = DEPARTMENTS[department]
+        first_name, last_name = choice(first_names), choice(last_names)
+
+        # Same scheme as add_emails.py: the first holder of a name gets the plain address
+        local_part = email_local_part(first_name, last_name)
+        seen_names[local_part] += 1
+        if seen_names[local_part] > 1:
+            local_part = f"{local_part}.{employee_id}"
+
+        titles = JOB_TITLES[level] if level == "CEO" else JOB_TITLES[level][department_name]
+        yield (
+            employee_id, first_name, last_name, f"{local_part}@datamint.app",
+            (HIRE_DATE_START + timedelta(days=randrange(HIRE_DATE_DAYS))).isoformat(),
+            department + 1, manager_id, randint(*SALARY_RANGES[level]), choice(titles),
+        )
+
+def generate_employee_skills(scale, rng):
+    """Yield 1-4 distinct skills with a proficiency for every employee"""
+    skill_ids = range(1, len(SKILLS) + 1)
+    sample, randint, choice = rng.sample, rng.randint, rng.choice
+    for employee_id in range(1, scale + 1):
+        for skill_id in sample(skill_ids, randint(1, 4)):
+            yield employee_id, skill_id, choice(PROFICIENCY_LEVELS)
+
+def generate_projects(count, rng):
+    """Yield project rows with names cycling through PROJECT_AREAS"""
+    for index in range(count):
+        area = PROJECT_AREAS[index % len(PROJECT_AREAS)]
+        name = area if index < len(PROJECT_AREAS) else f"{area} {index // len(PROJECT_AREAS) + 1}"
+        start = HIRE_DATE_START + timedelta(days=rng.randrange(HIRE_DATE_DAYS))
+        yield index + 1, name, start.isoformat(), (start + timedelta(days=rng.randint(60, 540))).isoformat()
+
+def generate_employee_projects(scale, layout, project_count, rng):
+    """Yield project assignments for PROJECT_SHARE of the employees, one or two projects each"""
+    random_value, sample, choice = rng.random, rng.sample, rng.choice
+    projects = range(1, project_count + 1)
+    for employee_id in range(1, scale + 1):
+        if random_value() >= PROJECT_SHARE:
+            continue
+        department = DEPARTMENTS[layout.department(employee_id)]
+        for project_id in sample(projects, 1 if random_value() < 0.7 else 2):
+            yield employee_id, project_id, choice(PROJECT_ROLES[department])
+
+def populate(conn, scale, seed):
+    """Generate every table for the given number of employees"""
+    rng = random.Random(seed)
+    layout = OrgLayout(scale)
+    print(f"🏢 Org layout per department: 1 VP, {layout.directors:,} directors, "
+          f"{layout.managers:,} managers, ~{(scale - layout.ic_start + 1) // len(DEPARTMENTS):,} ICs")
+
+    first_names, last_names = name_pools(seed)
+    print(f"✅ Drew {len(first_names):,} first names and {len(last_names):,} last names")
+
+    insert_batched(conn, """
+        INSERT INTO employees (id, first_name, last_name, email, hire_date, department_id,
+                               manager_id, salary, job_title)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, generate_employees(scale, layout, first_names, last_names, rng), "employees")
+
+    # The hierarchy follows from the id layout and the manager links just written
+    start = time.perf_counter()
+    conn.execute(f"""
+        INSERT INTO employee_hierarchy (employee_id, level, manager_id)
+        SELECT id, {layout.level_sql()}, manager_id FROM employees
+    """)
+    conn.commit()
+    print(f"✅ Derived employee_hierarchy in {time.perf_counter() - start:.1f}s")
+
+    insert_batched(conn, "INSERT INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, ?, ?)",
+                   generate_employee_skills(scale, rng), "employee skills")
+
+    project_count = max(len(PROJECT_AREAS), scale // EMPLOYEES_PER_PROJECT)
+    insert_batched(conn, "INSERT INTO projects (id, name, start_date, end_date) VALUES (?, ?, ?, ?)",
+                   generate_projects(project_count, rng), "projects")
+    insert_batched(conn, "INSERT INTO employee_projects (employee_id, project_id, role) VALUES (?, ?, ?)",
+                   generate_employee_projects(scale, layout, project_count, rng), "project assignments")
+
+def display_synthetic_summary(conn, elapsed):
+    """Display row counts of the generated database"""
+    cursor = conn.cursor()
+
+    print("\n" + "="*70)
+    print("📊 SYNTHETIC DATABASE SUMMARY")
+    print("="*70)
+
+    print(f"\n{'Table':<32} {'Rows':>15}")
+    print("-" * 50)
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    for (table,) in cursor.fetchall():
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        print(f"{table:<32} {cursor.fetchone()[0]:>15,}")
+
+    print(f"\n{'Level':<15} {'Count':>12}")
+    print("-" * 30)
+    cursor.execute("SELECT level, COUNT(*) FROM employee_hierarchy GROUP BY level ORDER BY COUNT(*)")
+    for level, count in cursor.fetchall():
+        print(f"{level:<15} {count:>12,}")
+
+    print(f"\n⏱️  Generated in {elapsed:.1f}s")
+    print("\n" + "="*70)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=parse_scale, default=DEFAULT_SCALE,
+                        help=f"Number of employees, e.g. 100k, 1m, 10m (default {DEFAULT_SCALE:,})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed for reproducible data")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Database file to create")
+    parser.add_argument("--force", action="store_true", help="Overwrite the output file if it exists")
+    parser.add_argument("--closure", action="store_true", help="Also build employee_hierarchy_closure")
+    parser.add_argument("--summaries", action="store_true", help="Also build the add_summaries.py tables")
+    parser.add_argument("--no-indexes", action="store_true", help="Skip the add_indexes.py indexes")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        if not args.force:
+            print(f"❌ {args.output} already exists, pass --force to overwrite it")
+            sys.exit(1)
+        os.remove(args.output)
+
+    print(f"🚀 Generating {args.scale:,} employees (seed {args.seed}) into {args.output}...")
+    start = time.perf_counter()
+    conn = sqlite3.connect(args.output)
+
+    try:
+        apply_bulk_pragmas(conn)
+        create_schema(conn)
+        populate(conn, args.scale, args.seed)
+
+        if not args.no_indexes:
+            create_indexes(conn)
+        if args.closure:
+            create_closure_table(conn)
+            refresh_closure(conn)
+            conn.commit()
+        if args.summaries:
+            create_summary_tables(conn)
+            create_summary_triggers(conn)
+            refresh_summaries(conn)
+
+        conn.execute("PRAGMA journal_mode = DELETE")
+        display_synthetic_summary(conn, time.perf_counter() - start)
+
+        print("\n✅ Synthetic database generated successfully!")
+        print(f"📁 Database location: {args.output}")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Versioned, idempotent migrations for the employee database.
+
+Replaces running create_employee_db.py, add_skills.py, add_hierarchy.py,
+add_job_titles.py, add_emails.py, add_indexes.py and add_summaries.py by
+hand in the right order. Applied versions are recorded in the
+schema_migrations table and only pending ones run. Every migration is
+written to be safe on a database the old scripts already built, so the
+first run simply adopts it.
+
+After the migrations the database is switched to WAL mode, which the
+app expects but never sets itself. Then the incremental data steps bring
+derived data up to date for new or changed employees only: skills for
+employees without any, hierarchy rows and salaries for new hires and
+reports of removed employees, job titles that are missing or stale, and
+emails that are missing or no longer match the name.
+
+Each migration and each data step runs in its own transaction with
+bulk-load pragmas; a failing step is rolled back and stops the run.
+
+Usage:
+    python migrate.py [--db PATH] [--status] [--no-data]
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+from add_emails import populate_new_emails
+from add_hierarchy import (add_salary_column, create_closure_table, create_hierarchy_bulk,
+                           create_hierarchy_table, update_hierarchy_incremental)
+from add_indexes import create_indexes, table_exists
+from add_job_titles import add_job_title_column, populate_missing_job_titles
+from add_skills import SKILLS, assign_skills_bulk
+from add_summaries import create_summary_tables, create_summary_triggers, refresh_summaries
+from create_employee_db import create_tables, seed_sample_data
+
+DB_PATH = "employee_database.db"
+
+# The rollback journal stays on so a failed step can be undone
+MIGRATION_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -262144,  # 256 MB (negative means KiB)
+}
+
+class MigrationConnection(sqlite3.Connection):
+    """Connection whose commit() is deferred while a step runs, so each step is one transaction"""
+    in_step = False
+
+    def commit(self):
+        if not self.in_step:
+            super().commit()
+
+def column_exists(conn, table, column):
+    """Check whether a table has a column"""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+def table_is_empty(conn, table):
+    """Check whether a table has no rows"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table})")
+    return bool(cursor.fetchone()[0])
+
+def migrate_base_tables(conn):
+    """Departments, employees, projects and skills tables plus the lookup rows"""
+    create_tables(conn)
+    conn.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(name,) for name in SKILLS])
+
+def migrate_sample_data(conn):
+    """Sample employees, projects and skills, for a new database only"""
+    if table_is_empty(conn, "employees"):
+        seed_sample_data(conn)
+    else:
+        print("ℹ️  Employees already present, skipping sample data")
+
+def migrate_hierarchy(conn):
+    """Salary column, hierarchy and closure tables, and the initial org chart"""
+    if not column_exists(conn, "employees", "salary"):
+        add_salary_column(conn)
+    create_hierarchy_table(conn)
+    create_closure_table(conn)
+    if table_is_empty(conn, "employee_hierarchy") and not table_is_empty(conn, "employees"):
+        create_hierarchy_bulk(conn)
+
+def migrate_job_titles(conn):
+    """job_title column, filled in by the job_titles data step"""
+    if not column_exists(conn, "employees", "job_title"):
+        add_job_title_column(conn)
+
+def migrate_summaries(conn):
+    """Trigger-maintained summary tables; existing triggers are recreated and the tables resynced"""
+    create_summary_tables(conn)
+    create_summary_triggers(conn)
+    refresh_summaries(conn)
+
+# (version, name, function); append new migrations, never renumber or edit applied ones
+MIGRATIONS = [
+    (1, "base_tables", migrate_base_tables),
+    (2, "sample_data", migrate_sample_data),
+    (3, "hierarchy", migrate_hierarchy),
+    (4, "job_titles", migrate_job_titles),
+    (5, "indexes", create_indexes),
+    (6, "summaries", migrate_summaries),
+]
+
+# (name, function) run after every migration; each only touches new or changed employees
+DATA_STEPS = [
+    ("skills", assign_skills_bulk),
+    ("hierarchy", update_hierarchy_incremental),
+    ("job_titles", populate_missing_job_titles),
+    ("emails", populate_new_emails),
+]
+
+def enable_wal(conn):
+    """
+    Switch the database to write-ahead logging so the app's readers never block on writers.
+
+    The journal mode is stored in the database file, so this is a one-time
+    change; it cannot run inside a transaction and is not a numbered migration.
+    """
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    print(f"📝 Journal mode: {mode}")
+    return mode
+
+def connect(db_path=DB_PATH):
+    """Open a MigrationConnection with the bulk pragmas applied"""
+    conn = sqlite3.connect(db_path, factory=MigrationConnection)
+    for name, value in MIGRATION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def create_migrations_table(conn):
+    """Create schema_migrations if not exists"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+def applied_versions(conn):
+    """Get {version: applied_at} for the recorded migrations"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+def run_step(conn, label, function, version=None, name=None):
+    """
+    Run one migration or data step in its own transaction.
+
+    Commits made by the step's functions are deferred to the end of the
+    step; on error the whole step is rolled back and the error re-raised.
+
+    Args:
+        conn: MigrationConnection
+        label: Name shown in the progress output
+        function: Callable taking the connection
+        version: Migration version to record in schema_migrations, None for data steps
+        name: Migration name to record
+
+    Returns:
+        Step duration in milliseconds
+    """
+    print(f"\n▶️  {label}")
+    start = time.perf_counter()
+    conn.execute("BEGIN")
+    conn.in_step = True
+    try:
+        function(conn)
+        elapsed = (time.perf_counter() - start) * 1000
+        if version is not None:
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                (version, name, datetime.now().isoformat(timespec="seconds"), round(elapsed, 1)),
+            )
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.in_step = False
+    conn.commit()
+    print(f"✅ {label} [{elapsed:.0f} ms]")
+    return elapsed
+
+def migrate(conn, data=True):
+    """
+    Apply the pending migrations, then the incremental data steps.
+
+    Args:
+        conn: MigrationConnection
+        data: Whether to run the data steps
+
+    Returns:
+        Number of migrations applied
+    """
+    create_migrations_table(conn)
+    applied = applied_versions(conn)
+    pending = [m for m in MIGRATIONS if m[0] not in applied]
+    if not pending:
+        print("ℹ️  Schema is up to date")
+    for version, name, function in pending:
+        run_step(conn, f"Migration {version:03d} {name}", function, version, name)
+    enable_wal(conn)
+
+    if data:
+        if table_exists(conn, "employee_hierarchy"):
+            for name, function in DATA_STEPS:
+                run_step(conn, f"Data step {name}", function)
+        else:
+            print("ℹ️  Skipping data steps until the hierarchy migration is applied")
+    return len(pending)
+
+def display_status(conn):
+    """Display applied and pending migrations"""
+    create_migrations_table(conn)
+    applied = applied_versions(conn)
+
+    print("\n" + "="*70)
+    print("📜 SCHEMA MIGRATIONS")
+    print("="*70)
+
+    print(f"\n{'Version':<10} {'Name':<25} {'Applied':<25}")
+    print("-" * 70)
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:03d}{'':<7} {name:<25} {applied.get(version, 'pending'):<25}")
+
+    print("\n" + "="*70)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations and refresh derived data")
+    parser.add_argument("--db", default=DB_PATH, help="Database file to migrate")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    parser.add_argument("--no-data", action="store_true", help="Skip the incremental data steps")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+
+    try:
+        if args.status:
+            display_status(conn)
+            return
+        start = time.perf_counter()
+        applied = migrate(conn, data=not args.no_data)
+        print(f"\n✅ Applied {applied} migrations in {time.perf_counter() - start:.2f}s")
+        print(f"📁 Database location: {args.db}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+        # Let deploy scripts and CI see that the database was not fully migrated
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Shared fixtures: a sample employee database built once per test session with migrate.py."""
+
+import os
+import sys
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+# The app modules import each other by bare name, like app/app.py does
+for path in (ROOT, APP_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from migrate import connect, migrate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def template_db(tmp_path_factory):
+    """Fully migrated sample database; read-only tests may use it directly."""
+    path = str(tmp_path_factory.mktemp("template") / "employee_database.db")
+    conn = connect(path)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+    return path
+
+
+@pytest.fixture
+def db_path(template_db, tmp_path):
+    """Private copy of the sample database that a test may modify."""
+    path = str(tmp_path / "employee_database.db")
+    shutil.copy(template_db, path)
+    return path
@@ -0,0 +1,75 @@
+"""Reuse and invalidation of agent bundles in the AgentRegistry."""
+
+import sqlite3
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+import agent_registry
+from agent_registry import AgentRegistry
+from schema_cache import SchemaCache
+
+
+@pytest.fixture
+def built():
+    """(model, api_key) of every LLM the registry builds."""
+    return []
+
+
+@pytest.fixture
+def registry(db_path, built, monkeypatch):
+    # Keep snapshots in memory, away from the snapshot file of the real database
+    monkeypatch.setattr(agent_registry, "schema_cache", SchemaCache(persist=False))
+
+    def llm_factory(model, api_key):
+        built.append((model, api_key))
+        return FakeListChatModel(responses=["Final Answer: done"])
+
+    registry = AgentRegistry(db_path=db_path, llm_factory=llm_factory)
+    yield registry
+    registry.engine.dispose()
+
+
+def test_same_model_and_key_reuse_the_bundle(registry, built):
+    bundle = registry.get("key-1")
+    assert registry.get("key-1") is bundle
+    assert registry.get("key-1", model="other-model") is not bundle
+    assert registry.get("key-2") is not bundle
+    assert built == [(agent_registry.DEFAULT_MODEL, "key-1"), ("other-model", "key-1"),
+                     (agent_registry.DEFAULT_MODEL, "key-2")]
+
+
+def test_schema_change_rebuilds_the_bundle(registry, db_path):
+    bundle = registry.get("key-1")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE offices (id INTEGER PRIMARY KEY, city TEXT)")
+    conn.commit()
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    conn.close()
+
+    rebuilt = registry.get("key-1")
+    assert rebuilt is not bundle
+    assert rebuilt.schema_version == schema_version != bundle.schema_version
+    assert "offices" in rebuilt.snapshot.table_info
+    assert registry.get("key-1") is rebuilt
+
+
+def test_invalidate_drops_only_that_keys_agents(registry):
+    first = registry.get("key-1")
+    first_other_model = registry.get("key-1", model="other-model")
+    second = registry.get("key-2")
+
+    registry.invalidate("key-1")
+
+    assert registry.get("key-2") is second
+    assert registry.get("key-1") is not first
+    assert registry.get("key-1", model="other-model") is not first_other_model
+
+
+def test_invalidate_everything(registry):
+    first = registry.get("key-1")
+    second = registry.get("key-2")
+    registry.invalidate()
+    assert registry.get("key-1") is not first
+    assert registry.get("key-2") is not second
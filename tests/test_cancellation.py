@@ -0,0 +1,57 @@
+"""Helper threads of run_cancellable."""
+
+import threading
+
+import pytest
+
+import cancellation
+from cancellation import CancelToken, QueryCancelled, run_cancellable
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    """Allow a single helper thread, so a slot still held is visible to the next caller."""
+    monkeypatch.setattr(cancellation, "_thread_slots", threading.BoundedSemaphore(1))
+
+
+def _helpers():
+    return [thread for thread in threading.enumerate() if thread.name == "cancellable-query"]
+
+
+def test_returns_the_result_and_raises_errors(one_slot):
+    assert run_cancellable(CancelToken(), lambda a, b=0: a + b, 1, b=2) == 3
+    with pytest.raises(ZeroDivisionError):
+        run_cancellable(CancelToken(), lambda: 1 / 0)
+    assert run_cancellable(CancelToken(), lambda: "slot released") == "slot released"
+
+
+def test_cancelled_caller_returns_while_the_helper_holds_its_slot(one_slot):
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(10)
+        return "late"
+
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    with pytest.raises(QueryCancelled):
+        run_cancellable(token, work)
+    assert started.is_set()
+    helpers = _helpers()
+    assert len(helpers) == 1
+
+    # The detached helper still counts: the next caller waits until its own deadline
+    ran = threading.Event()
+    with pytest.raises(QueryCancelled) as cancelled:
+        run_cancellable(CancelToken(timeout=0.3), ran.set)
+    assert cancelled.value.reason == "timed out"
+    assert not ran.is_set()
+
+    # Once the work has stopped, the thread is gone and its slot is free again
+    release.set()
+    helpers[0].join(5)
+    assert not _helpers()
+    assert run_cancellable(CancelToken(timeout=1), lambda: "ok") == "ok"
+
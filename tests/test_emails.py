@@ -0,0 +1,51 @@
+"""Email addresses built by the per-row, bulk and migration paths of add_emails.py."""
+
+import sqlite3
+
+import pytest
+
+from add_emails import populate_emails, populate_emails_bulk, populate_new_emails
+
+# SQLite's lower() leaves É and Ö alone, Python folds them
+NAMES = [("ÉMILE", "Öztürk"), ("émile", "öztürk")]
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def ids(conn):
+    """Ids of the NAMES employees, added with placeholder addresses."""
+    ids = []
+    for index, (first_name, last_name) in enumerate(NAMES):
+        cursor = conn.execute("INSERT INTO employees (first_name, last_name, email, hire_date, department_id) "
+                              "VALUES (?, ?, ?, '2024-01-15', 1)",
+                              (first_name, last_name, f"placeholder{index}@example.com"))
+        ids.append(cursor.lastrowid)
+    conn.commit()
+    return ids
+
+
+def _emails(conn, ids):
+    return [conn.execute("SELECT email FROM employees WHERE id = ?", (emp_id,)).fetchone()[0]
+            for emp_id in ids]
+
+
+def test_every_path_gives_non_ascii_names_the_same_addresses(conn, ids):
+    expected = ["émile.öztürk@datamint.app", f"émile.öztürk.{ids[1]}@datamint.app"]
+
+    populate_new_emails(conn)
+    conn.commit()
+    assert _emails(conn, ids) == expected
+
+    populate_emails_bulk(conn)
+    assert _emails(conn, ids) == expected
+
+    conn.execute("UPDATE employees SET email = 'placeholder' || id WHERE id IN (?, ?)", ids)
+    conn.commit()
+    populate_emails(conn)
+    assert _emails(conn, ids) == expected
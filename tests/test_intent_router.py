@@ -0,0 +1,69 @@
+"""Hire-date slots of the intent router."""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from database import create_db_engine
+from intent_router import IntentRouter
+
+TODAY = date(2024, 6, 1)
+
+
+@pytest.fixture(scope="module")
+def engine(template_db):
+    engine = create_db_engine(template_db)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("question, hired_from, hired_to", [
+    # "after X" starts the day after X ends
+    ("employees hired after 2020", "2021-01-01", None),
+    ("employees hired after 2020-02", "2020-03-01", None),
+    ("employees hired after 2020-02-15", "2020-02-16", None),
+    # "since X" includes X
+    ("employees hired since 2020", "2020-01-01", None),
+    ("employees hired since 2020-02", "2020-02-01", None),
+    # "before X" ends the day before X starts
+    ("employees hired before 2020", None, "2019-12-31"),
+    ("employees hired before 2020-03", None, "2020-02-29"),
+    ("employees hired before 2021-03", None, "2021-02-28"),
+    ("employees hired before 2020-03-15", None, "2020-03-14"),
+    # Closed ranges cover whole periods, including the real month end
+    ("employees hired in 2020-02", "2020-02-01", "2020-02-29"),
+    ("employees hired between 2019 and 2020-04", "2019-01-01", "2020-04-30"),
+])
+def test_hire_date_bounds(engine, question, hired_from, hired_to):
+    routed = IntentRouter().route(question, engine, "v1", today=TODAY)
+    assert routed is not None
+    assert routed.params.get("hired_from") == hired_from
+    assert routed.params.get("hired_to") == hired_to
+
+
+def test_hired_in_the_last_months(engine):
+    routed = IntentRouter().route("employees hired in the last 6 months", engine, "v1", today=TODAY)
+    assert routed.params["hired_from"] == "2023-12-01"
+    assert "hired_to" not in routed.params
+
+
+@pytest.mark.parametrize("question", [
+    "employees hired after 2020-13",
+    "employees hired before 2020-02-30",
+])
+def test_invalid_dates_fall_through(engine, question):
+    assert IntentRouter().route(question, engine, "v1", today=TODAY) is None
+
+
+@pytest.mark.parametrize("question, excluded", [
+    ("employees hired after 2022", lambda hired: hired <= "2022-12-31"),
+    ("employees hired since 2022", lambda hired: hired < "2022-01-01"),
+    ("employees hired before 2023", lambda hired: hired >= "2023-01-01"),
+])
+def test_routed_sql_applies_the_bounds(engine, question, excluded):
+    routed = IntentRouter().route(question, engine, "v1", today=TODAY)
+    with engine.connect() as connection:
+        hire_dates = [str(row.hire_date) for row in connection.execute(text(routed.sql), routed.params)]
+    assert hire_dates
+    assert not [hired for hired in hire_dates if excluded(hired)]
@@ -0,0 +1,17 @@
+"""Prometheus text exposition of the metrics registry."""
+
+import metrics
+
+
+def test_label_values_are_escaped():
+    metrics.increment("test_escaped_labels_total", error='bad "quote" \\ and\nnewline')
+    lines = [line for line in metrics.render_prometheus().splitlines()
+             if line.startswith("test_escaped_labels_total")]
+    assert lines == ['test_escaped_labels_total{error="bad \\"quote\\" \\\\ and\\nnewline"} 1']
+
+
+def test_histogram_lines_share_the_escaped_labels():
+    metrics.observe("test_escaped_seconds", 0.01, stage='say "hi"')
+    lines = [line for line in metrics.render_prometheus().splitlines()
+             if line.startswith("test_escaped_seconds_count")]
+    assert lines == ['test_escaped_seconds_count{stage="say \\"hi\\""} 1']
@@ -0,0 +1,73 @@
+"""Re-running migrate.py on an up-to-date database."""
+
+import sys
+
+import pytest
+
+import migrate as migrate_module
+from migrate import MIGRATIONS, applied_versions, connect, migrate
+
+
+def _dump(conn):
+    return list(conn.iterdump())
+
+
+def test_new_database_gets_every_migration(tmp_path):
+    conn = connect(str(tmp_path / "new.db"))
+    try:
+        assert migrate(conn) == len(MIGRATIONS)
+        assert sorted(applied_versions(conn)) == [version for version, _, _ in MIGRATIONS]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+
+def test_second_run_changes_nothing(db_path):
+    conn = connect(db_path)
+    try:
+        before = _dump(conn)
+        assert migrate(conn) == 0
+        assert _dump(conn) == before
+        assert migrate(conn) == 0
+        assert _dump(conn) == before
+    finally:
+        conn.close()
+
+
+def test_data_steps_only_touch_new_employees(db_path):
+    conn = connect(db_path)
+    try:
+        conn.execute("INSERT INTO employees (first_name, last_name, email, hire_date, department_id, manager_id) "
+                     "VALUES ('New', 'Hire', 'placeholder@example.com', '2024-01-15', 2, 1)")
+        conn.commit()
+        new_id = conn.execute("SELECT MAX(id) FROM employees").fetchone()[0]
+        assert migrate(conn) == 0
+
+        assert conn.execute("SELECT COUNT(*) FROM employee_hierarchy WHERE employee_id = ?",
+                            (new_id,)).fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM employee_skills WHERE employee_id = ?",
+                            (new_id,)).fetchone()[0] > 0
+        after_first = _dump(conn)
+        assert migrate(conn) == 0
+        assert _dump(conn) == after_first
+    finally:
+        conn.close()
+
+
+def test_failed_step_rolls_back_and_exits_non_zero(db_path, monkeypatch):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS + [(len(MIGRATIONS) + 1, "broken", broken)])
+    monkeypatch.setattr(sys, "argv", ["migrate.py", "--db", db_path, "--no-data"])
+    with pytest.raises(SystemExit) as exited:
+        migrate_module.main()
+    assert exited.value.code == 1
+
+    conn = connect(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
+        assert len(MIGRATIONS) + 1 not in applied_versions(conn)
+    finally:
+        conn.close()
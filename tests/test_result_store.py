@@ -0,0 +1,98 @@
+"""Keyset paging over materialized result sets."""
+
+import sqlite3
+
+import pytest
+
+from database import create_db_engine
+from result_store import ResultSetExpired, ResultStore
+
+SQL = "SELECT id, first_name, hire_date FROM employees ORDER BY hire_date"
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_db_engine(db_path)
+    yield engine
+    engine.dispose()
+
+
+def _all_pages(store, engine, result_set, after=0, limit=100):
+    rows = []
+    while True:
+        page = store.fetch_page(engine, result_set, after=after, limit=limit)
+        rows += page["rows"]
+        after = page["next_after"]
+        if not page["has_more"]:
+            return rows
+
+
+def test_pages_cover_every_row_once(engine):
+    store = ResultStore()
+    result_set = store.create(SQL, None, "v1")
+    rows = _all_pages(store, engine, result_set, limit=97)
+    with engine.connect() as connection:
+        count = connection.exec_driver_sql("SELECT COUNT(*) FROM employees").scalar()
+    ids = [row[0] for row in rows]
+    assert len(ids) == count
+    assert len(set(ids)) == count
+
+
+def test_refetching_a_page_returns_the_same_rows(engine):
+    store = ResultStore()
+    result_set = store.create(SQL, None, "v1")
+    first = store.fetch_page(engine, result_set, limit=50)
+    again = store.fetch_page(engine, result_set, after=first["next_after"], limit=50)
+    assert again == store.fetch_page(engine, result_set, after=first["next_after"], limit=50)
+    assert first["next_after"] == 50
+    assert again["next_after"] == 100
+
+
+def test_pages_do_not_shift_when_the_data_changes(engine, db_path):
+    store = ResultStore()
+    result_set = store.create(SQL, None, "v1")
+    first = store.fetch_page(engine, result_set, limit=100)
+    expected = first["rows"] + _all_pages(store, engine, result_set, after=first["next_after"])
+
+    # Rows removed or added ahead of the current page must not move later pages
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM employees WHERE id IN (SELECT id FROM employees ORDER BY hire_date LIMIT 150)")
+    conn.execute("INSERT INTO employees (first_name, last_name, email, hire_date, department_id) "
+                 "VALUES ('Early', 'Hire', 'early.hire@example.com', '1990-01-01', 1)")
+    conn.commit()
+    conn.close()
+
+    rows = first["rows"] + _all_pages(store, engine, result_set, after=first["next_after"])
+    assert rows == expected
+
+
+def test_pages_expire_with_the_data_version(engine):
+    store = ResultStore()
+    result_set = store.create(SQL, None, "v1")
+    store.fetch_page(engine, result_set, data_version="v1")
+    with pytest.raises(ResultSetExpired):
+        store.fetch_page(engine, result_set, data_version="v2")
+
+
+def test_rows_past_max_rows_are_dropped(engine):
+    store = ResultStore(max_rows=120)
+    result_set = store.create(SQL, None, "v1")
+    first = store.fetch_page(engine, result_set, limit=50)
+    # The cut-off is reported from the first page on
+    assert first["truncated"] is True
+    assert first["row_count"] == 120
+    rows = _all_pages(store, engine, result_set, limit=50)
+    last = store.fetch_page(engine, result_set, after=100, limit=50)
+    assert len(rows) == 120
+    assert last["truncated"] is True
+    assert not last["has_more"]
+
+
+def test_untruncated_result_reports_its_size(engine):
+    store = ResultStore()
+    result_set = store.create("SELECT name FROM departments", None, "v1")
+    page = store.fetch_page(engine, result_set, limit=2)
+    with engine.connect() as connection:
+        count = connection.exec_driver_sql("SELECT COUNT(*) FROM departments").scalar()
+    assert page["row_count"] == count
+    assert page["truncated"] is False
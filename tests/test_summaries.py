@@ -0,0 +1,74 @@
+"""Trigger-maintained summary tables against a full refresh_summaries."""
+
+import sqlite3
+
+import pytest
+
+from add_summaries import SUMMARY_TABLES, refresh_summaries, resume_summaries, suspend_summaries
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _summaries(conn):
+    """Every summary row, with floats rounded so AVG() and running sums compare equal."""
+    return {
+        table: sorted(
+            tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in conn.execute(f"SELECT * FROM {table}")
+        )
+        for table in SUMMARY_TABLES
+    }
+
+
+def _change_base_tables(conn):
+    """Inserts, updates and deletes on every table the triggers watch."""
+    conn.execute("INSERT INTO employees (first_name, last_name, email, hire_date, department_id, salary) "
+                 "VALUES ('Summary', 'Test', 'summary.test@example.com', '2024-02-01', 2, 1234567)")
+    new_id = conn.execute("SELECT MAX(id) FROM employees").fetchone()[0]
+    conn.execute("INSERT INTO employee_hierarchy (employee_id, level, manager_id) VALUES (?, 'Director', 1)",
+                 (new_id,))
+    conn.execute("INSERT INTO employee_skills (employee_id, skill_id, proficiency_level) VALUES (?, 1, 'Expert')",
+                 (new_id,))
+
+    # Salary and department changes, including the current department maximum
+    conn.execute("UPDATE employees SET salary = salary * 1.1 WHERE id % 7 = 0")
+    conn.execute("UPDATE employees SET department_id = 3 WHERE id % 11 = 0")
+    conn.execute("UPDATE employees SET salary = 1 WHERE id = (SELECT id FROM employees "
+                 "WHERE department_id = 1 ORDER BY salary DESC LIMIT 1)")
+    conn.execute("UPDATE employee_hierarchy SET level = 'Manager' WHERE employee_id % 13 = 0 AND level = 'IC'")
+    conn.execute("UPDATE employee_skills SET proficiency_level = 'Beginner' WHERE employee_id % 5 = 0")
+
+    # Removed employees, hierarchy rows and skills
+    removed = [row[0] for row in conn.execute("SELECT id FROM employees WHERE id % 17 = 0")]
+    conn.executemany("DELETE FROM employee_skills WHERE employee_id = ?", [(i,) for i in removed])
+    conn.executemany("DELETE FROM employee_hierarchy WHERE employee_id = ?", [(i,) for i in removed])
+    conn.executemany("DELETE FROM employees WHERE id = ?", [(i,) for i in removed])
+    conn.commit()
+
+
+def test_triggers_match_refresh(conn):
+    initial = _summaries(conn)
+    _change_base_tables(conn)
+    maintained = _summaries(conn)
+    assert maintained != initial
+
+    refresh_summaries(conn)
+    assert _summaries(conn) == maintained
+
+
+def test_suspended_maintenance_catches_up_on_resume(conn):
+    initial = _summaries(conn)
+    suspend_summaries(conn)
+    _change_base_tables(conn)
+    assert _summaries(conn) == initial
+
+    resume_summaries(conn)
+    refreshed = _summaries(conn)
+    assert refreshed != initial
+    refresh_summaries(conn)
+    assert _summaries(conn) == refreshed
@@ -0,0 +1,55 @@
+"""Repair round and compact schema of the single-shot text-to-SQL engine."""
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from database import create_db_engine
+from schema_cache import SchemaSnapshot, build_snapshot
+from sql_runner import execute_sql
+from text_to_sql import SQLGenerationError, compact_schema, generate_sql
+
+# Prepares fine, fails only when SQLite evaluates it
+FAILS_AT_RUNTIME = "SELECT abs(-9223372036854775808) AS overflow FROM departments"
+WORKING = "SELECT name FROM departments ORDER BY id"
+
+
+@pytest.fixture(scope="module")
+def engine(template_db):
+    engine = create_db_engine(template_db)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def snapshot(engine, template_db):
+    return build_snapshot(engine, template_db)
+
+
+def _llm(*statements):
+    return FakeListChatModel(responses=[f"TITLE: Departments\nSQL:\n{sql}" for sql in statements])
+
+
+def test_execution_error_gets_a_repair_round(engine, snapshot):
+    generated = generate_sql(_llm(FAILS_AT_RUNTIME, WORKING), engine, snapshot, "list departments",
+                             execute=lambda sql, title: execute_sql(engine, sql))
+    assert generated.sql == WORKING
+    assert generated.llm_calls == 2
+    columns, rows = generated.result
+    assert columns == ["name"]
+    assert rows
+
+
+def test_repair_budget_is_shared_with_validation(engine, snapshot):
+    with pytest.raises(SQLGenerationError):
+        generate_sql(_llm("SELECT nope FROM departments", FAILS_AT_RUNTIME), engine, snapshot,
+                     "list departments", execute=lambda sql, title: execute_sql(engine, sql))
+
+
+def test_compact_schema_is_per_database(snapshot):
+    other = SchemaSnapshot(schema_version=snapshot.schema_version,
+                           table_info={"offices": "CREATE TABLE offices (id INTEGER PRIMARY KEY, city TEXT)"},
+                           columns={"offices": ["id", "city"]}, db_path="/elsewhere/other.db",
+                           schema_hash="other")
+    assert compact_schema(other) == "offices(id, city)"
+    assert "employees(" in compact_schema(snapshot)
+    assert compact_schema(other) == "offices(id, city)"